@@ -1,5 +1,8 @@
 import reflex as rx
 import logging
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 from app.pages.home import home_page
 from app.pages.shops import shop_list_page
 from app.pages.products import products_page
@@ -17,6 +20,23 @@ from app.pages.auth.login import login_page
 from app.pages.auth.register import register_page
 from app.states.auth_state import AuthState
 from app.utils.db_seed import seed_database
+from app.utils.database import (
+    archive_lifespan,
+    db_lifespan,
+    get_db,
+    rollup_lifespan,
+    run_blocking,
+)
+from app.utils.dispatch import dispatch_lifespan
+from app.utils.metrics import render_metrics
+from app.utils.order_feed import order_feed_lifespan
+
+
+async def metrics_endpoint(request) -> PlainTextResponse:
+    """Prometheus scrape target for data-layer histograms and pool gauges."""
+    body = await run_blocking(lambda: render_metrics(get_db().pool_metrics()))
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 
 app = rx.App(
     theme=rx.theme(appearance="light"),
@@ -28,7 +48,13 @@ app = rx.App(
             rel="stylesheet",
         ),
     ],
+    api_transformer=Starlette(routes=[Route("/metrics", metrics_endpoint)]),
 )
+app.register_lifespan_task(db_lifespan)
+app.register_lifespan_task(rollup_lifespan)
+app.register_lifespan_task(archive_lifespan)
+app.register_lifespan_task(order_feed_lifespan)
+app.register_lifespan_task(dispatch_lifespan)
 app.add_page(home_page, route="/", on_load=[AuthState.check_auth, AppState.on_mount])
 app.add_page(
     shop_list_page, route="/shops", on_load=[AuthState.check_auth, AppState.on_mount]
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.append(os.getcwd())
+from app.utils.database import DatabaseManager
+
+INSERT_ORDER_SQL = """
+    INSERT INTO orders (id, subtotal, delivery_fee, total_amount, status, date, time,
+                        delivery_address, payment_method, shop_id, user_id)
+    VALUES (:id, :subtotal, :delivery_fee, :total_amount, :status, :date, :time,
+            :delivery_address, :payment_method, :shop_id, :user_id)
+"""
+INSERT_ITEMS_SQL = """
+    INSERT INTO order_items (order_id, product_id, name, price, quantity, image_url)
+    SELECT order_id, product_id, name, price, quantity, image_url
+    FROM jsonb_to_recordset(CAST(:items AS JSONB)) AS i(
+        order_id TEXT, product_id INTEGER, name TEXT, price NUMERIC,
+        quantity INTEGER, image_url TEXT)
+"""
+
+
+def build_cart(shop_ids: list[int], items_per_shop: int) -> list[dict]:
+    orders = []
+    for shop_id in shop_ids:
+        items = [
+            {
+                "product_id": None,
+                "name": f"Bench item {n}",
+                "price": 10.0,
+                "quantity": 1,
+                "image_url": "",
+            }
+            for n in range(items_per_shop)
+        ]
+        orders.append(
+            {
+                "id": f"BENCH-{uuid.uuid4().hex[:12]}",
+                "subtotal": 10.0 * items_per_shop,
+                "delivery_fee": 15.0,
+                "total_amount": 10.0 * items_per_shop + 15.0,
+                "status": "Confirmed",
+                "date": "2024-01-01",
+                "time": "12:00",
+                "delivery_address": "Benchmark St",
+                "payment_method": "COD",
+                "shop_id": shop_id,
+                "user_id": "bench",
+                "items": items,
+            }
+        )
+    return orders
+
+
+async def round_trip(rtt: float):
+    if rtt:
+        await asyncio.sleep(rtt)
+
+
+async def sequential_checkout(db: DatabaseManager, orders: list[dict], rtt: float):
+    """The previous path: create_order then create_order_items for each shop."""
+    for order in orders:
+        order_data = {k: v for k, v in order.items() if k != "items"}
+        await round_trip(rtt)
+        await db.execute_query(INSERT_ORDER_SQL, order_data)
+        items = [{**i, "order_id": order["id"]} for i in order["items"]]
+        await round_trip(rtt)
+        await db.execute_query(INSERT_ITEMS_SQL, {"items": json.dumps(items)})
+
+
+async def batched_checkout(db: DatabaseManager, orders: list[dict], rtt: float):
+    await round_trip(rtt)
+    await db.place_orders(orders)
+
+
+async def main(args):
+    db = DatabaseManager()
+    if not db.engine:
+        print("❌ REFLEX_DB_URL must point at a database with the Mini Drop schema.")
+        return
+    shops = await db.execute_query("SELECT id FROM shops ORDER BY id")
+    shop_ids = [row["id"] for row in shops]
+    if not shop_ids:
+        print("❌ No shops found. Seed the database first.")
+        return
+    rtt = args.rtt_ms / 1000
+    print(f"{'Shops':>5} | {'Sequential ms':>13} | {'Batched ms':>10} | {'Speedup':>7}")
+    print("-" * 46)
+    try:
+        for n_shops in args.shops:
+            cart_shops = [shop_ids[i % len(shop_ids)] for i in range(n_shops)]
+            timings = {"sequential": [], "batched": []}
+            for _ in range(args.trials):
+                for mode, checkout in (
+                    ("sequential", sequential_checkout),
+                    ("batched", batched_checkout),
+                ):
+                    orders = build_cart(cart_shops, args.items)
+                    start = time.perf_counter()
+                    await checkout(db, orders, rtt)
+                    timings[mode].append((time.perf_counter() - start) * 1000)
+            seq = statistics.median(timings["sequential"])
+            bat = statistics.median(timings["batched"])
+            print(f"{n_shops:>5} | {seq:>13.1f} | {bat:>10.1f} | {seq / bat:>6.1f}x")
+    finally:
+        await db.execute_query("DELETE FROM order_items WHERE order_id LIKE 'BENCH-%'")
+        await db.execute_query("DELETE FROM orders WHERE id LIKE 'BENCH-%'")
+        await db.execute_query("DELETE FROM order_ids WHERE id LIKE 'BENCH-%'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare checkout latency of per-shop inserts and place_orders."
+    )
+    parser.add_argument("--shops", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--items", type=int, default=3, help="Items per shop.")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument(
+        "--rtt-ms",
+        type=float,
+        default=0.0,
+        help="Extra latency added per round trip to model the PostgREST hop.",
+    )
+    asyncio.run(main(parser.parse_args()))
\ No newline at end of file
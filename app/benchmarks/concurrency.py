@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.getcwd())
+from app.utils.database import DatabaseManager
+
+
+class LatencyQuery:
+    """Stand-in for a PostgREST query builder whose execute() blocks like HTTP."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.latency)
+        return SimpleNamespace(data=[], count=0)
+
+
+class LatencyClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def table(self, name: str) -> LatencyQuery:
+        return LatencyQuery(self.latency)
+
+
+async def storefront_handler(db: DatabaseManager) -> float:
+    """Mimic the queries AppState.on_mount issues for a single session."""
+    start = time.perf_counter()
+    await db.get_categories()
+    await db.get_shops()
+    await db.get_products()
+    return time.perf_counter() - start
+
+
+async def run_sessions(db: DatabaseManager, sessions: int) -> dict:
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(storefront_handler(db) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latencies)
+    return {
+        "sessions": sessions,
+        "wall_s": round(elapsed, 3),
+        "handlers_per_s": round(sessions / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def make_blocking(db: DatabaseManager) -> DatabaseManager:
+    """Reproduce the old behaviour: execute() called directly on the loop."""
+
+    async def inline_execute(query):
+        return query.execute()
+
+    db._execute = inline_execute
+    return db
+
+
+async def main(args):
+    results = []
+    for mode in ("blocking", "executor"):
+        db = DatabaseManager()
+        if not args.live:
+            db.supabase = LatencyClient(args.latency_ms / 1000)
+        if not args.cache:
+            # Cache hits never reach execute(), so they would hide the
+            # blocking this benchmark exists to show.
+            db.catalog_cache.ttl = 0
+        if mode == "blocking":
+            make_blocking(db)
+        stats = await run_sessions(db, args.sessions)
+        stats["mode"] = mode
+        results.append(stats)
+    print(
+        f"{'Mode':<10} | {'Sessions':>8} | {'Wall s':>8} | {'Handlers/s':>10} | "
+        f"{'p50 ms':>8} | {'p95 ms':>8}"
+    )
+    print("-" * 68)
+    for r in results:
+        print(
+            f"{r['mode']:<10} | {r['sessions']:>8} | {r['wall_s']:>8} | "
+            f"{r['handlers_per_s']:>10} | {r['p50_ms']:>8} | {r['p95_ms']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure storefront handler throughput under concurrent sessions."
+    )
+    parser.add_argument("--sessions", type=int, default=150)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=20.0,
+        help="Simulated round-trip time per query when not using --live.",
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Run against the configured Supabase project instead of a stand-in.",
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Keep the catalog cache on."
+    )
+    asyncio.run(main(parser.parse_args()))
\ No newline at end of file
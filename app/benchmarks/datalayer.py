@@ -0,0 +1,740 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Optional
+
+sys.path.append(os.getcwd())
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+import app.utils.database as database
+from app.utils.database import DatabaseManager
+from app.utils.manage_db import SCALE_PRESETS, generate_scale_data
+from app.utils.metrics import measure_result
+from app.utils.migrate_db import migrate
+
+FILTER_OPS = {"eq": "=", "neq": "<>", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+
+class SqlQuery:
+    """Stand-in for a PostgREST query builder that runs the query on Postgres.
+
+    It understands the subset of the builder API DatabaseManager uses, and
+    translates embedded ``order_items(...)`` selects (optionally aliased, as
+    in ``order_items:order_items_archive(...)``) into a correlated
+    ``json_agg``, so every method can be measured without a PostgREST server.
+    ``rtt`` is slept once per execute() to model the HTTP hop.
+    """
+
+    def __init__(self, engine, table: str, rtt: float = 0.0):
+        self.engine = engine
+        self.table = table
+        self.rtt = rtt
+        self.action = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.where: list[str] = []
+        self.params: dict[str, Any] = {}
+        self.order_by: list[str] = []
+        self.limit_rows: Optional[int] = None
+
+    def _param(self, value: Any) -> str:
+        name = f"p{len(self.params)}"
+        self.params[name] = value
+        return f":{name}"
+
+    def select(self, columns: str = "*", **kwargs):
+        self.columns = columns
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def update(self, payload: dict):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def _filter(self, column: str, op: str, value: Any):
+        self.where.append(f"{column} {FILTER_OPS[op]} {self._param(value)}")
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "lt", value)
+
+    def is_(self, column: str, value: Any):
+        self.where.append(
+            f"{column} IS NULL" if value in (None, "null") else f"{column} IS {value}"
+        )
+        return self
+
+    def in_(self, column: str, values: list):
+        self.where.append(f"{column} = ANY({self._param(list(values))})")
+        return self
+
+    def _parse_or(self, expression: str) -> str:
+        terms, depth, current = [], 0, ""
+        for char in expression:
+            if char == "," and depth == 0:
+                terms.append(current)
+                current = ""
+                continue
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            current += char
+        terms.append(current)
+        sql = []
+        for term in terms:
+            if term.startswith("and("):
+                inner = self._parse_or(term[4:-1]).replace(" OR ", " AND ")
+                sql.append(f"({inner})")
+                continue
+            column, op, value = re.match(r"(\w+)\.(\w+)\.(.*)", term).groups()
+            placeholder = self._param(value.strip('"'))
+            sql.append(f"{column} {FILTER_OPS[op]} {placeholder}")
+        return " OR ".join(sql)
+
+    def or_(self, expression: str):
+        self.where.append(f"({self._parse_or(expression)})")
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.order_by.append(f"{column} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, rows: int):
+        self.limit_rows = rows
+        return self
+
+    def _select_list(self) -> str:
+        parts = []
+        for part in re.split(r",\s*(?![^()]*\))", self.columns):
+            part = part.strip()
+            embed = re.match(r"(?:(\w+):)?(\w+)\((.*)\)", part)
+            if not embed:
+                parts.append(part)
+                continue
+            alias, child, columns = embed.groups()
+            if columns.strip() == "*":
+                body = "json_agg(c ORDER BY c.id)"
+            else:
+                fields = ", ".join(
+                    f"'{c.strip()}', c.{c.strip()}" for c in columns.split(",")
+                )
+                body = f"json_agg(json_build_object({fields}) ORDER BY c.id)"
+            parts.append(
+                f"(SELECT COALESCE({body}, '[]'::json) FROM {child} c "
+                f"WHERE c.order_id = {self.table}.id) AS {alias or child}"
+            )
+        return ", ".join(f"{self.table}.*" if p == "*" else p for p in parts)
+
+    def _sql(self) -> tuple[str, list[dict] | dict]:
+        where = f" WHERE {' AND '.join(self.where)}" if self.where else ""
+        if self.action == "insert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            columns = list(rows[0])
+            values = ", ".join(f":{c}" for c in columns)
+            sql = f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({values}) RETURNING *"
+            return sql, rows
+        if self.action == "update":
+            sets = ", ".join(f"{c} = {self._param(v)}" for c, v in self.payload.items())
+            return f"UPDATE {self.table} SET {sets}{where} RETURNING *", self.params
+        if self.action == "delete":
+            return f"DELETE FROM {self.table}{where} RETURNING *", self.params
+        sql = f"SELECT {self._select_list()} FROM {self.table}{where}"
+        if self.order_by:
+            sql += f" ORDER BY {', '.join(self.order_by)}"
+        if self.limit_rows is not None:
+            sql += f" LIMIT {int(self.limit_rows)}"
+        return sql, self.params
+
+    def execute(self):
+        if self.rtt:
+            time.sleep(self.rtt)
+        sql, params = self._sql()
+        with self.engine.begin() as connection:
+            if isinstance(params, list):
+                rows = [
+                    DatabaseManager._row_to_dict(connection.execute(text(sql), p).one())
+                    for p in params
+                ]
+            else:
+                rows = [
+                    DatabaseManager._row_to_dict(row)
+                    for row in connection.execute(text(sql), params)
+                ]
+        return SimpleNamespace(data=rows, count=len(rows))
+
+
+class SqlRpc:
+    def __init__(self, engine, function: str, params: dict, rtt: float):
+        self.engine, self.function, self.params, self.rtt = (
+            engine,
+            function,
+            params,
+            rtt,
+        )
+
+    def execute(self):
+        if self.rtt:
+            time.sleep(self.rtt)
+        args, values = [], {}
+        for name, value in self.params.items():
+            if isinstance(value, (dict, list)):
+                args.append(f"{name} => CAST(:{name} AS JSONB)")
+                values[name] = json.dumps(value)
+            else:
+                args.append(f"{name} => :{name}")
+                values[name] = value
+        sql = f"SELECT * FROM {self.function}({', '.join(args)})"
+        with self.engine.begin() as connection:
+            result = connection.execute(text(sql), values)
+            keys = list(result.keys())
+            rows = [DatabaseManager._row_to_dict(row) for row in result]
+        if keys == [self.function]:
+            return SimpleNamespace(data=rows[0][self.function] if rows else None)
+        return SimpleNamespace(data=rows)
+
+
+class SqlClient:
+    def __init__(self, engine, rtt: float = 0.0):
+        self.engine = engine
+        self.rtt = rtt
+
+    def table(self, name: str) -> SqlQuery:
+        return SqlQuery(self.engine, name, self.rtt)
+
+    def rpc(self, function: str, params: dict) -> SqlRpc:
+        return SqlRpc(self.engine, function, params, self.rtt)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(
+        int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1
+    )
+    return sorted_values[index]
+
+
+class Fixtures:
+    """Ids sampled from the seeded database for use as call arguments."""
+
+    def __init__(self, engine, seed: int = 7):
+        self.rng = random.Random(seed)
+        with engine.connect() as conn:
+
+            def sample(sql: str) -> list:
+                return [row[0] for row in conn.execute(text(sql))]
+
+            self.shop_ids = sample("SELECT id FROM shops ORDER BY random() LIMIT 200")
+            self.product_ids = sample(
+                "SELECT id FROM products ORDER BY random() LIMIT 500"
+            )
+            self.user_ids = sample(
+                "SELECT user_id FROM orders WHERE user_id IS NOT NULL "
+                "GROUP BY user_id ORDER BY random() LIMIT 200"
+            ) or ["bench-user"]
+            self.emails = sample("SELECT email FROM users ORDER BY random() LIMIT 200")
+            self.rider_ids = sample("SELECT id FROM riders ORDER BY random() LIMIT 200")
+            self.slugs = sample("SELECT slug FROM categories")
+            self.counts = dict(
+                conn.execute(
+                    text(
+                        "SELECT relname, GREATEST(reltuples, 0)::BIGINT FROM pg_class "
+                        "WHERE relname IN ('orders', 'products', 'order_items')"
+                    )
+                ).all()
+            )
+
+    def pick(self, values: list):
+        return self.rng.choice(values) if values else None
+
+
+def bench_order(shop_id: int, items: int = 3) -> dict:
+    now = datetime.datetime.now()
+    return {
+        "id": f"BENCH-{uuid.uuid4().hex[:16]}",
+        "subtotal": 10.0 * items,
+        "delivery_fee": 15.0,
+        "total_amount": 10.0 * items + 15.0,
+        "status": "Ready",
+        "date": now.strftime("%Y-%m-%d"),
+        "time": now.strftime("%H:%M"),
+        "delivery_address": "Benchmark St",
+        "payment_method": "COD",
+        "shop_id": shop_id,
+        "user_id": "bench-user",
+    }
+
+
+def build_cases(
+    db: DatabaseManager, fx: Fixtures
+) -> list[tuple[str, bool, Callable[[], Awaitable]]]:
+    """(name, unbounded, call factory) for every DatabaseManager method.
+
+    Unbounded cases return every matching row and are skipped on large
+    datasets unless --include-unbounded is given.
+    """
+
+    async def create_order_with_items():
+        order = bench_order(fx.pick(fx.shop_ids))
+        created = await db.create_order(order)
+        await db.create_order_items(
+            [
+                {
+                    "order_id": order["id"],
+                    "product_id": fx.pick(fx.product_ids),
+                    "name": "Bench item",
+                    "price": 10.0,
+                    "quantity": 1,
+                }
+                for _ in range(3)
+            ]
+        )
+        return created
+
+    async def place_orders():
+        orders = []
+        for shop_id in (fx.pick(fx.shop_ids), fx.pick(fx.shop_ids)):
+            order = bench_order(shop_id)
+            order["items"] = [
+                {
+                    "product_id": fx.pick(fx.product_ids),
+                    "name": "Bench item",
+                    "price": 10.0,
+                    "quantity": 1,
+                    "image_url": "",
+                }
+                for _ in range(3)
+            ]
+            orders.append(order)
+        return await db.place_orders(orders)
+
+    async def category_round_trip():
+        slug = f"bench-{uuid.uuid4().hex[:8]}"
+        created = await db.create_category({"name": "Bench", "slug": slug})
+        if created:
+            await db.update_category(created["id"], {"name": "Bench 2"})
+            await db.delete_category(created["id"])
+        return created
+
+    async def shop_round_trip():
+        created = await db.create_shop(
+            {"name": "Bench shop", "category_slug": fx.pick(fx.slugs)}
+        )
+        if created:
+            await db.update_shop(created["id"], {"name": "Bench shop 2"})
+            await db.delete_shop(created["id"])
+        return created
+
+    async def product_round_trip():
+        created = await db.create_product(
+            {"shop_id": fx.pick(fx.shop_ids), "name": "Bench product", "price": 1.0}
+        )
+        if created:
+            await db.update_product(created["id"], {"price": 2.0})
+            await db.toggle_product_stock(created["id"], False)
+            await db.execute_query(
+                "DELETE FROM products WHERE id = :id", {"id": created["id"]}
+            )
+        return created
+
+    async def rider_status():
+        rider_id = fx.pick(fx.rider_ids)
+        return await db.toggle_rider_status(
+            rider_id, fx.rng.choice(["Online", "Offline"])
+        )
+
+    async def assign_order():
+        order = await db.create_order(bench_order(fx.pick(fx.shop_ids)))
+        return await db.assign_order_to_rider(order["id"], fx.pick(fx.rider_ids))
+
+    return [
+        ("get_user_by_email", False, lambda: db.get_user_by_email(fx.pick(fx.emails))),
+        ("get_user_by_id", False, lambda: db.get_user_by_id(fx.pick(fx.user_ids))),
+        (
+            "create_user",
+            False,
+            lambda: db.create_user(
+                {
+                    "id": f"bench_{uuid.uuid4().hex[:12]}",
+                    "name": "Bench",
+                    "email": f"{uuid.uuid4().hex}@bench.minidrop",
+                    "password_hash": "x",
+                }
+            ),
+        ),
+        ("get_shops[card]", False, lambda: db.get_shops(view="card")),
+        (
+            "get_shops[category]",
+            False,
+            lambda: db.get_shops(fx.pick(fx.slugs), view="card"),
+        ),
+        (
+            "get_products[shop,card]",
+            False,
+            lambda: db.get_products(fx.pick(fx.shop_ids), view="card"),
+        ),
+        ("get_products[all,card]", True, lambda: db.get_products(view="card")),
+        (
+            "get_products_by_ids",
+            False,
+            lambda: db.get_products_by_ids(
+                fx.rng.sample(fx.product_ids, min(5, len(fx.product_ids)))
+            ),
+        ),
+        ("get_categories", False, lambda: db.get_categories()),
+        ("get_storefront_bootstrap", True, lambda: db.get_storefront_bootstrap()),
+        ("category create/update/delete", False, category_round_trip),
+        ("create_order+items", False, create_order_with_items),
+        ("place_orders[2 shops]", False, place_orders),
+        (
+            "get_orders_by_user",
+            True,
+            lambda: db.get_orders_by_user(fx.pick(fx.user_ids), view="card"),
+        ),
+        (
+            "get_orders_by_shop",
+            True,
+            lambda: db.get_orders_by_shop(fx.pick(fx.shop_ids), view="card"),
+        ),
+        ("get_all_orders", True, lambda: db.get_all_orders(view="row")),
+        ("get_all_orders_page", False, lambda: db.get_all_orders_page(view="row")),
+        (
+            "get_orders_by_shop_page",
+            False,
+            lambda: db.get_orders_by_shop_page(fx.pick(fx.shop_ids), view="card"),
+        ),
+        (
+            "get_orders_by_user_page",
+            False,
+            lambda: db.get_orders_by_user_page(fx.pick(fx.user_ids), view="card"),
+        ),
+        (
+            "get_orders_by_user_page[history]",
+            False,
+            lambda: db.get_orders_by_user_page(
+                fx.pick(fx.user_ids), view="card", include_history=True
+            ),
+        ),
+        (
+            "get_rider_orders_page",
+            False,
+            lambda: db.get_rider_orders_page(fx.pick(fx.rider_ids), view="card"),
+        ),
+        (
+            "update_order_status",
+            False,
+            lambda: db.update_order_status(
+                f"SYN-{fx.rng.randrange(max(fx.counts.get('orders', 1), 1)):010d}",
+                "Delivered",
+            ),
+        ),
+        ("get_available_orders", True, lambda: db.get_available_orders(view="card")),
+        (
+            "get_rider_orders",
+            True,
+            lambda: db.get_rider_orders(fx.pick(fx.rider_ids), view="card"),
+        ),
+        ("assign_order_to_rider", False, assign_order),
+        ("get_rider_by_id", False, lambda: db.get_rider_by_id(fx.pick(fx.rider_ids))),
+        (
+            "update_rider_earnings",
+            False,
+            lambda: db.update_rider_earnings(fx.pick(fx.rider_ids), 40.0),
+        ),
+        (
+            "settle_rider_deliveries[10]",
+            False,
+            lambda: db.settle_rider_deliveries(
+                [{"rider_id": fx.pick(fx.rider_ids), "amount": 40.0} for _ in range(10)]
+            ),
+        ),
+        ("toggle_rider_status", False, rider_status),
+        ("get_riders", True, lambda: db.get_riders()),
+        ("get_coupons", False, lambda: db.get_coupons()),
+        (
+            "get_daily_stats",
+            False,
+            lambda: db.get_daily_stats(datetime.date.today().isoformat()),
+        ),
+        (
+            "get_revenue_rollups[30 days]",
+            False,
+            lambda: db.get_revenue_rollups(
+                (datetime.date.today() - datetime.timedelta(days=30)).isoformat(),
+                datetime.date.today().isoformat(),
+            ),
+        ),
+        ("refresh_revenue_rollups", False, lambda: db.refresh_revenue_rollups()),
+        ("shop create/update/delete", False, shop_round_trip),
+        (
+            "create_rider",
+            False,
+            lambda: db.create_rider(
+                {
+                    "id": f"bench_r{uuid.uuid4().hex[:10]}",
+                    "name": "Bench rider",
+                    "status": "Offline",
+                }
+            ),
+        ),
+        ("product create/update/toggle", False, product_round_trip),
+    ]
+
+
+async def run_case(
+    call: Callable[[], Awaitable], iterations: int, warmup: int, concurrency: int
+) -> dict:
+    for _ in range(warmup):
+        await call()
+    latencies, rows, payload = [], 0, 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = await call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        rows, payload = measure_result(result)
+    latencies.sort()
+
+    remaining = iterations
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "rows": rows,
+        "payload_bytes": payload,
+        "concurrency": concurrency,
+        "ops_per_s": round(iterations / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def prepare_database(base_url: str, size: str, reseed: bool) -> str:
+    """Create, migrate and seed one database per dataset size."""
+    url = make_url(base_url)
+    name = f"minidrop_bench_{size}"
+    admin = create_engine(url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name}
+        ).scalar()
+        if exists and reseed:
+            conn.execute(text(f'DROP DATABASE "{name}" WITH (FORCE)'))
+            exists = False
+        if not exists:
+            conn.execute(text(f'CREATE DATABASE "{name}"'))
+    admin.dispose()
+    bench_url = url.set(database=name).render_as_string(hide_password=False)
+    # Existing databases are migrated too, so they keep up with the schema.
+    engine = create_engine(bench_url)
+    migrate(engine)
+    engine.dispose()
+    if not exists:
+        print(f"🌱 Seeding {name} ({size})")
+        generate_scale_data(bench_url, **SCALE_PRESETS[size])
+    return bench_url
+
+
+def cleanup(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM order_items WHERE order_id LIKE 'BENCH-%'"))
+        conn.execute(text("DELETE FROM orders WHERE id LIKE 'BENCH-%'"))
+        conn.execute(text("DELETE FROM order_ids WHERE id LIKE 'BENCH-%'"))
+        conn.execute(text("DELETE FROM users WHERE id LIKE 'bench\\_%'"))
+        conn.execute(text("DELETE FROM riders WHERE id LIKE 'bench\\_r%'"))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_suite(args) -> list[dict]:
+    base_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+    results = []
+    targets = (
+        [("current", base_url)]
+        if args.no_seed
+        else [
+            (size, prepare_database(base_url, size, args.reseed)) for size in args.sizes
+        ]
+    )
+    for size, url in targets:
+        os.environ["REFLEX_DB_URL"] = url
+        for backend in args.backends:
+            database.DB_BACKEND = "sql" if backend == "sql" else "supabase"
+            db = DatabaseManager()
+            db.supabase = SqlClient(db.engine, args.rtt_ms / 1000)
+            if not args.cache:
+                db.catalog_cache.ttl = 0
+            fx = Fixtures(db.engine)
+            large = max(fx.counts.values() or [0]) > args.unbounded_limit
+            pattern = re.compile(args.filter) if args.filter else None
+            for name, unbounded, call in build_cases(db, fx):
+                if pattern and not pattern.search(name):
+                    continue
+                record = {"size": size, "backend": backend, "method": name}
+                if unbounded and large and not args.include_unbounded:
+                    results.append(
+                        {**record, "skipped": "unbounded on a large dataset"}
+                    )
+                    continue
+                try:
+                    stats = await run_case(
+                        call, args.iterations, args.warmup, args.concurrency
+                    )
+                except Exception as e:
+                    results.append({**record, "error": repr(e)})
+                    continue
+                results.append({**record, **stats})
+                print_row(results[-1])
+            cleanup(db.engine)
+            db.close()
+    return results
+
+
+HEADER = (
+    f"{'Size':<8} {'Backend':<9} {'Method':<32} {'p50 ms':>8} {'p95 ms':>8} "
+    f"{'p99 ms':>8} {'Rows':>7} {'Bytes':>10} {'Ops/s':>8}"
+)
+
+
+def print_row(r: dict):
+    if "p50_ms" not in r:
+        print(
+            f"{r['size']:<8} {r['backend']:<9} {r['method']:<32} {r.get('skipped') or r.get('error')}"
+        )
+        return
+    print(
+        f"{r['size']:<8} {r['backend']:<9} {r['method']:<32} {r['p50_ms']:>8.2f} "
+        f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['rows']:>7} "
+        f"{r['payload_bytes']:>10} {r['ops_per_s']:>8}"
+    )
+
+
+def compare(baseline_path: str, results: list[dict]):
+    """Print the p50/p95 ratio of this run against a saved run."""
+    with open(baseline_path) as f:
+        baseline = {
+            (r["size"], r["backend"], r["method"]): r
+            for r in json.load(f)["results"]
+            if "p50_ms" in r
+        }
+    print(f"\nCompared with {baseline_path} (ratio < 1.00 is faster):")
+    for r in results:
+        before = baseline.get((r["size"], r["backend"], r["method"]))
+        if before and "p50_ms" in r and before["p50_ms"] and before["p95_ms"]:
+            print(
+                f"{r['size']:<8} {r['backend']:<9} {r['method']:<32} "
+                f"p50 x{r['p50_ms'] / before['p50_ms']:.2f}  "
+                f"p95 x{r['p95_ms'] / before['p95_ms']:.2f}"
+            )
+
+
+async def main(args) -> Optional[list[dict]]:
+    if not (os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")):
+        print("❌ REFLEX_DB_URL must point at a local Postgres server.")
+        return None
+    print(HEADER)
+    print("-" * len(HEADER))
+    return await run_suite(args)
+
+
+def report(args, results: list[dict]):
+    """Write and compare results once the event loop has finished."""
+    if args.json:
+        document = {
+            "revision": git_revision(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "args": {
+                k: v for k, v in vars(args).items() if k not in ("json", "compare")
+            },
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"\n📄 Wrote {len(results)} results to {args.json}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure every DatabaseManager method against local Postgres."
+    )
+    parser.add_argument("--sizes", nargs="+", choices=SCALE_PRESETS, default=["small"])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=["postgrest", "sql"],
+        default=["postgrest", "sql"],
+        help="postgrest: the query-builder path via a SQL stand-in; sql: DB_BACKEND=sql.",
+    )
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--rtt-ms", type=float, default=0.0, help="Latency added per PostgREST call."
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Keep the catalog cache on."
+    )
+    parser.add_argument("--filter", help="Only run methods matching this regex.")
+    parser.add_argument("--unbounded-limit", type=int, default=200_000)
+    parser.add_argument("--include-unbounded", action="store_true")
+    parser.add_argument(
+        "--no-seed",
+        action="store_true",
+        help="Benchmark REFLEX_DB_URL as-is instead of per-size bench databases.",
+    )
+    parser.add_argument(
+        "--reseed", action="store_true", help="Recreate bench databases."
+    )
+    parser.add_argument("--json", help="Write machine-readable results to this file.")
+    parser.add_argument("--compare", help="Compare against a previous --json file.")
+    args = parser.parse_args()
+    results = asyncio.run(main(args))
+    if results is not None:
+        report(args, results)
\ No newline at end of file
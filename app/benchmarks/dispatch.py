@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import collections
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.getcwd())
+import app.utils.database as database
+from app.benchmarks.datalayer import SqlClient, bench_order, cleanup, percentile
+from app.utils.database import DatabaseManager
+
+# The previous assignment: update by id only, so the last rider to accept wins
+# while every rider is told they got the order.
+UNCONDITIONAL_ASSIGN_SQL = """
+    UPDATE orders SET rider_id = :rider_id, status = 'Out for Delivery'
+    WHERE id = :id RETURNING id
+"""
+
+
+async def unconditional_assign(db: DatabaseManager, order_id: str, rider_id: str):
+    rows = await db.execute_query(
+        UNCONDITIONAL_ASSIGN_SQL, {"id": order_id, "rider_id": rider_id}
+    )
+    return bool(rows)
+
+
+async def conditional_assign(db: DatabaseManager, order_id: str, rider_id: str):
+    return await db.assign_order_to_rider(order_id, rider_id) is not None
+
+
+async def run_burst(db: DatabaseManager, args, assign, rng: random.Random) -> dict:
+    """Release a burst of Ready orders and let every rider race for one.
+
+    Each rider works from the same snapshot of available orders, as if they
+    had all loaded the list just before the burst, and tries orders in a
+    random order until one accept succeeds or the list runs out.
+    """
+    shops = await db.execute_query("SELECT id FROM shops ORDER BY id LIMIT 50")
+    shop_ids = [row["id"] for row in shops]
+    orders = [bench_order(rng.choice(shop_ids), items=1) for _ in range(args.orders)]
+    for order in orders:
+        order["items"] = []
+    await db.place_orders(orders)
+    order_ids = [order["id"] for order in orders]
+    riders = [f"BENCH-R{n:04d}" for n in range(args.riders)]
+    winners: dict[str, list[str]] = collections.defaultdict(list)
+    latencies: list[float] = []
+    lost = 0
+
+    async def rider(rider_id: str):
+        nonlocal lost
+        candidates = order_ids[:]
+        rng.shuffle(candidates)
+        for order_id in candidates:
+            start = time.perf_counter()
+            accepted = await assign(db, order_id, rider_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if accepted:
+                winners[order_id].append(rider_id)
+                return
+            lost += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(rider(r) for r in riders))
+    elapsed = time.perf_counter() - start
+    final = await db.execute_query(
+        "SELECT id, rider_id FROM orders WHERE id = ANY(:ids)", {"ids": order_ids}
+    )
+    stored = {row["id"]: row["rider_id"] for row in final}
+    latencies.sort()
+    return {
+        "accepted": sum(len(w) for w in winners.values()),
+        "assigned": sum(1 for r in stored.values() if r),
+        "double_booked": sum(1 for w in winners.values() if len(w) > 1),
+        # Riders told they won whose assignment was overwritten by another.
+        "phantom": sum(1 for o, w in winners.items() for r in w if stored.get(o) != r),
+        "lost_races": lost,
+        "attempts": len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "wall_s": elapsed,
+    }
+
+
+async def main(args):
+    if not (os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")):
+        print("❌ REFLEX_DB_URL must point at a database with the Mini Drop schema.")
+        return
+    database.DB_BACKEND = "sql" if args.backend == "sql" else "supabase"
+    db = DatabaseManager()
+    if not db.engine:
+        print("❌ Could not connect to REFLEX_DB_URL.")
+        return
+    db.supabase = SqlClient(db.engine, args.rtt_ms / 1000)
+    rng = random.Random(args.seed)
+    print(
+        f"🏍️  {args.riders} riders racing for {args.orders} orders "
+        f"({args.backend}, {args.trials} trials)"
+    )
+    header = (
+        f"{'Mode':<13} | {'Accepted':>8} | {'Assigned':>8} | {'Double':>6} | "
+        f"{'Phantom':>7} | {'Lost':>6} | {'p50 ms':>7} | {'p95 ms':>7} | {'Wall s':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    try:
+        for mode, assign in (
+            ("unconditional", unconditional_assign),
+            ("conditional", conditional_assign),
+        ):
+            runs = []
+            for _ in range(args.trials):
+                runs.append(await run_burst(db, args, assign, rng))
+                cleanup(db.engine)
+            med = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+            print(
+                f"{mode:<13} | {med['accepted']:>8.0f} | {med['assigned']:>8.0f} | "
+                f"{med['double_booked']:>6.0f} | {med['phantom']:>7.0f} | "
+                f"{med['lost_races']:>6.0f} | {med['p50_ms']:>7.1f} | "
+                f"{med['p95_ms']:>7.1f} | {med['wall_s']:>6.2f}"
+            )
+    finally:
+        cleanup(db.engine)
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simulate riders competing to accept a burst of Ready orders."
+    )
+    parser.add_argument("--riders", type=int, default=300)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument(
+        "--backend",
+        choices=["postgrest", "sql"],
+        default="postgrest",
+        help="postgrest: the query-builder path via a SQL stand-in; sql: DB_BACKEND=sql.",
+    )
+    parser.add_argument(
+        "--rtt-ms", type=float, default=0.0, help="Latency added per PostgREST call."
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
\ No newline at end of file
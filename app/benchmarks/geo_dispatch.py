@@ -0,0 +1,130 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.getcwd())
+from app.benchmarks.datalayer import percentile
+from app.utils.dispatch import (
+    DISPATCH_CELL_KM,
+    DISPATCH_OFFER_SIZE,
+    DISPATCH_RADIUS_KM,
+    DispatchEngine,
+    haversine_km,
+)
+from app.utils.manage_db import SCALE_PRESETS, _random_point
+
+
+def brute_force_nearest(
+    riders: dict[str, tuple[float, float]],
+    lat: float,
+    lon: float,
+    k: int,
+    radius_km: float,
+) -> list[tuple[float, str]]:
+    """What finding riders without an index costs: score every idle rider."""
+    scored = []
+    for rider_id, (rlat, rlon) in riders.items():
+        distance = haversine_km(lat, lon, rlat, rlon)
+        if distance <= radius_km:
+            scored.append((distance, rider_id))
+    return sorted(scored)[:k]
+
+
+def timed(samples: list[float], fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    engine = DispatchEngine(
+        offer_size=args.offer_size, radius_km=args.radius_km, cell_km=args.cell_km
+    )
+    positions = {f"syn_r{i}": _random_point(rng) for i in range(args.riders)}
+    shops = [_random_point(rng) for _ in range(args.shops)]
+    for shop_id, (lat, lon) in enumerate(shops, 1):
+        engine.set_shop(shop_id, lat, lon)
+
+    start = time.perf_counter()
+    for rider_id, (lat, lon) in positions.items():
+        engine.update_rider(rider_id, "Online", lat, lon)
+    build_s = time.perf_counter() - start
+    print(
+        f"🛵 {args.riders:,} online riders, {args.shops:,} shops, "
+        f"{args.cell_km:g} km cells, offers of {args.offer_size} "
+        f"within {args.radius_km:g} km"
+    )
+    print(f"Index build: {build_s:.2f}s ({args.riders / build_s:,.0f} riders/s)")
+
+    # Location pings: riders drift up to ~200 m between reports.
+    moved = list(positions)
+    rng.shuffle(moved)
+    moved = moved[: args.pings]
+    start = time.perf_counter()
+    for rider_id in moved:
+        lat, lon = positions[rider_id]
+        lat += rng.uniform(-0.002, 0.002)
+        lon += rng.uniform(-0.002, 0.002)
+        positions[rider_id] = (lat, lon)
+        engine.update_rider(rider_id, latitude=lat, longitude=lon)
+    ping_s = time.perf_counter() - start
+    print(f"Location pings: {len(moved) / ping_s:,.0f}/s")
+
+    grid_ms: list[float] = []
+    scan_ms: list[float] = []
+    mismatches = 0
+    for n in range(args.orders):
+        shop_id = rng.randrange(1, args.shops + 1)
+        lat, lon = shops[shop_id - 1]
+        offered = timed(grid_ms, engine.offer, f"BENCH-{n}", shop_id)
+        expected = timed(
+            scan_ms,
+            brute_force_nearest,
+            positions,
+            lat,
+            lon,
+            args.offer_size,
+            args.radius_km,
+        )
+        if offered != [rider_id for _, rider_id in expected]:
+            mismatches += 1
+        engine._withdraw(f"BENCH-{n}")
+    grid_ms.sort()
+    scan_ms.sort()
+
+    header = f"{'Nearest riders':<14} | {'p50 ms':>8} | {'p99 ms':>8} | {'Offers/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, samples in (("grid", grid_ms), ("full scan", scan_ms)):
+        per_second = len(samples) / (sum(samples) / 1000)
+        print(
+            f"{name:<14} | {percentile(samples, 50):>8.3f} | "
+            f"{percentile(samples, 99):>8.3f} | {per_second:>9,.0f}"
+        )
+    if mismatches:
+        print(f"❌ {mismatches} of {args.orders} offers differ from the full scan")
+    else:
+        print(f"✅ All {args.orders} offers match the full scan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure nearest-rider lookups on the dispatch grid."
+    )
+    parser.add_argument(
+        "--riders", type=int, default=SCALE_PRESETS["production"]["riders"]
+    )
+    parser.add_argument(
+        "--shops", type=int, default=SCALE_PRESETS["production"]["shops"]
+    )
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--pings", type=int, default=100_000)
+    parser.add_argument("--offer-size", type=int, default=DISPATCH_OFFER_SIZE)
+    parser.add_argument("--radius-km", type=float, default=DISPATCH_RADIUS_KM)
+    parser.add_argument("--cell-km", type=float, default=DISPATCH_CELL_KM)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
\ No newline at end of file
@@ -23,6 +23,8 @@ class ShopDict(TypedDict):
     address: str
     is_featured: bool
     commission_rate: float
+    latitude: float
+    longitude: float
 
 
 class ProductDict(TypedDict):
@@ -71,12 +73,20 @@ class WeeklyStatDict(TypedDict):
     day: str
     revenue: float
     orders: int
+    commission: float
+    delivery_fees: float
+
+
+class HourlyStatDict(TypedDict):
+    hour: str
+    revenue: float
+    orders: int
 
 
 class PayoutDict(TypedDict):
     id: str
     date: str
-    order_id: str
+    orders_count: int
     order_amount: float
     commission: float
     payout_amount: float
@@ -91,6 +101,8 @@ class RiderDict(TypedDict):
     status: str
     earnings: float
     completed_orders: int
+    latitude: float
+    longitude: float
 
 
 class CouponDict(TypedDict):
@@ -213,6 +225,8 @@ SHOPS: list[ShopDict] = [
         "image_url": "https://images.unsplash.com/photo-1542838132-92c53300491e?auto=format&fit=crop&w=400&q=80",
         "address": "12 Main St",
         "is_featured": True,
+        "latitude": 12.977,
+        "longitude": 77.599,
     },
     {
         "id": 2,
@@ -224,6 +238,8 @@ SHOPS: list[ShopDict] = [
         "image_url": "https://images.unsplash.com/photo-1585435557343-3b092031a831?auto=format&fit=crop&w=400&q=80",
         "address": "45 Park Ave",
         "is_featured": True,
+        "latitude": 12.969,
+        "longitude": 77.5985,
     },
     {
         "id": 3,
@@ -235,6 +251,8 @@ SHOPS: list[ShopDict] = [
         "image_url": "https://images.unsplash.com/photo-1628088062854-d1870b4553da?auto=format&fit=crop&w=400&q=80",
         "address": "88 Market Rd",
         "is_featured": False,
+        "latitude": 12.973,
+        "longitude": 77.593,
     },
     {
         "id": 4,
@@ -246,6 +264,8 @@ SHOPS: list[ShopDict] = [
         "image_url": "https://images.unsplash.com/photo-1550399105-c4db5fb85c18?auto=format&fit=crop&w=400&q=80",
         "address": "University Sq",
         "is_featured": False,
+        "latitude": 12.959,
+        "longitude": 77.588,
     },
     {
         "id": 5,
@@ -257,6 +277,8 @@ SHOPS: list[ShopDict] = [
         "image_url": "https://images.unsplash.com/photo-1509440159596-0249088772ff?auto=format&fit=crop&w=400&q=80",
         "address": "Baker St",
         "is_featured": True,
+        "latitude": 12.981,
+        "longitude": 77.588,
     },
 ]
 PRODUCTS: list[ProductDict] = [
@@ -369,6 +391,8 @@ RIDERS: list[RiderDict] = [
         "status": "Online",
         "earnings": 1250.0,
         "completed_orders": 45,
+        "latitude": 12.975,
+        "longitude": 77.596,
     },
     {
         "id": "r2",
@@ -378,6 +402,8 @@ RIDERS: list[RiderDict] = [
         "status": "Offline",
         "earnings": 890.0,
         "completed_orders": 32,
+        "latitude": 12.965,
+        "longitude": 77.59,
     },
 ]
 COUPONS: list[CouponDict] = [
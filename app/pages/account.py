@@ -96,6 +96,22 @@ def account_page() -> rx.Component:
                             )
                         ),
                     ),
+                    rx.cond(
+                        AppState.has_more_orders,
+                        rx.el.button(
+                            "Load more orders",
+                            on_click=AppState.load_more_orders,
+                            class_name="w-full py-2 text-sm font-bold text-[#6200EA] bg-purple-50 rounded-xl hover:bg-purple-100",
+                        ),
+                        rx.cond(
+                            ~AppState.include_order_history,
+                            rx.el.button(
+                                "Show older orders",
+                                on_click=AppState.show_order_history,
+                                class_name="w-full py-2 text-sm font-medium text-gray-500 hover:text-[#6200EA]",
+                            ),
+                        ),
+                    ),
                 ),
                 class_name="max-w-2xl mx-auto",
             ),
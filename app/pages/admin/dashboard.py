@@ -91,8 +91,8 @@ def dashboard_content() -> rx.Component:
             ),
             rx.el.div(
                 stat_card(
-                    "Total Earnings",
-                    f"₹{AdminState.total_earnings}",
+                    "Revenue Today",
+                    f"₹{AdminState.revenue_today}",
                     "wallet",
                     "+15.3%",
                     True,
@@ -140,6 +140,17 @@ def orders_page() -> rx.Component:
                     ),
                     class_name="bg-white rounded-2xl shadow-sm border border-gray-100 overflow-hidden",
                 ),
+                rx.cond(
+                    AdminState.has_more_orders,
+                    rx.el.div(
+                        rx.el.button(
+                            "Load more orders",
+                            on_click=AdminState.load_more_orders,
+                            class_name="px-4 py-2 text-sm font-bold text-[#6200EA] bg-purple-50 rounded-xl hover:bg-purple-100",
+                        ),
+                        class_name="flex justify-center mt-6",
+                    ),
+                ),
                 clear_orders_confirmation(),
             )
         )
@@ -8,9 +8,20 @@ def reports_page() -> rx.Component:
     return protected_admin(
         admin_layout(
             rx.el.div(
-                rx.el.h1(
-                    "Analytics & Reports",
-                    class_name="text-2xl font-bold text-gray-900 mb-6",
+                rx.el.div(
+                    rx.el.h1(
+                        "Analytics & Reports",
+                        class_name="text-2xl font-bold text-gray-900",
+                    ),
+                    rx.el.select(
+                        rx.el.option("Last 7 days", value="7"),
+                        rx.el.option("Last 30 days", value="30"),
+                        rx.el.option("Last 90 days", value="90"),
+                        value=AdminState.report_days.to_string(),
+                        on_change=AdminState.set_report_days,
+                        class_name="rounded-lg border border-gray-300 px-3 py-2 text-sm focus:ring-[#6200EA] focus:border-[#6200EA]",
+                    ),
+                    class_name="flex items-center justify-between mb-6",
                 ),
                 rx.el.div(
                     rx.el.div(
@@ -32,6 +43,13 @@ def reports_page() -> rx.Component:
                                     radius=[4, 4, 0, 0],
                                     bar_size=40,
                                 ),
+                                rx.recharts.bar(
+                                    data_key="commission",
+                                    fill="#00C853",
+                                    radius=[4, 4, 0, 0],
+                                    bar_size=40,
+                                ),
+                                rx.recharts.legend(),
                                 rx.recharts.x_axis(
                                     data_key="day",
                                     axis_line=False,
@@ -92,6 +110,45 @@ def reports_page() -> rx.Component:
                             ),
                             class_name="w-full",
                         ),
+                        class_name="bg-white p-6 rounded-2xl shadow-sm border border-gray-100 mb-6",
+                    ),
+                    rx.el.div(
+                        rx.el.h3(
+                            "Today by Hour",
+                            class_name="text-lg font-bold text-gray-900 mb-6",
+                        ),
+                        rx.el.div(
+                            rx.recharts.bar_chart(
+                                rx.recharts.cartesian_grid(
+                                    horizontal=True,
+                                    vertical=False,
+                                    class_name="opacity-25",
+                                ),
+                                rx.recharts.graphing_tooltip(),
+                                rx.recharts.bar(
+                                    data_key="revenue",
+                                    fill="#6200EA",
+                                    radius=[4, 4, 0, 0],
+                                ),
+                                rx.recharts.x_axis(
+                                    data_key="hour",
+                                    axis_line=False,
+                                    tick_line=False,
+                                    tick_size=10,
+                                    custom_attrs={"fontSize": "12px"},
+                                ),
+                                rx.recharts.y_axis(
+                                    axis_line=False,
+                                    tick_line=False,
+                                    tick_size=10,
+                                    custom_attrs={"fontSize": "12px"},
+                                ),
+                                data=AdminState.hourly_stats,
+                                width="100%",
+                                height=300,
+                            ),
+                            class_name="w-full",
+                        ),
                         class_name="bg-white p-6 rounded-2xl shadow-sm border border-gray-100",
                     ),
                 ),
@@ -88,6 +88,17 @@ def earnings_page() -> rx.Component:
                         ),
                         class_name="bg-white rounded-2xl shadow-sm border border-gray-100 overflow-hidden",
                     ),
+                    rx.cond(
+                        ~RiderState.include_order_history,
+                        rx.el.div(
+                            rx.el.button(
+                                "Show older deliveries",
+                                on_click=RiderState.show_order_history,
+                                class_name="px-4 py-2 text-sm font-medium text-gray-500 hover:text-[#6200EA]",
+                            ),
+                            class_name="flex justify-center mt-6",
+                        ),
+                    ),
                 ),
             )
         )
@@ -146,6 +146,48 @@ def orders_page() -> rx.Component:
                                 class_name="py-8 text-center bg-white rounded-xl border border-dashed border-gray-200",
                             ),
                         ),
+                        class_name="mb-8",
+                    ),
+                    rx.el.div(
+                        rx.el.h2(
+                            "History", class_name="text-lg font-bold text-gray-800 mb-4"
+                        ),
+                        rx.cond(
+                            ShopOwnerState.orders.length() > 0,
+                            rx.el.div(
+                                rx.foreach(ShopOwnerState.orders, order_card),
+                                class_name="grid grid-cols-1 lg:grid-cols-2 gap-4",
+                            ),
+                            rx.el.div(
+                                rx.el.p(
+                                    "No past orders",
+                                    class_name="text-gray-400 text-sm italic",
+                                ),
+                                class_name="py-8 text-center bg-white rounded-xl border border-dashed border-gray-200",
+                            ),
+                        ),
+                    ),
+                    rx.cond(
+                        ShopOwnerState.has_more_orders,
+                        rx.el.div(
+                            rx.el.button(
+                                "Load older orders",
+                                on_click=ShopOwnerState.load_more_orders,
+                                class_name="px-4 py-2 text-sm font-bold text-[#6200EA] bg-purple-50 rounded-lg hover:bg-purple-100",
+                            ),
+                            class_name="flex justify-center mt-6",
+                        ),
+                        rx.cond(
+                            ~ShopOwnerState.include_order_history,
+                            rx.el.div(
+                                rx.el.button(
+                                    "Show older orders",
+                                    on_click=ShopOwnerState.show_order_history,
+                                    class_name="px-4 py-2 text-sm font-medium text-gray-500 hover:text-[#6200EA]",
+                                ),
+                                class_name="flex justify-center mt-6",
+                            ),
+                        ),
                     ),
                 ),
             )
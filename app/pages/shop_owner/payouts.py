@@ -12,7 +12,9 @@ def payout_row(payout: PayoutDict) -> rx.Component:
             class_name="px-6 py-4 whitespace-nowrap",
         ),
         rx.el.td(
-            rx.el.span(f"#{payout['order_id']}", class_name="text-sm text-gray-500"),
+            rx.el.span(
+                f"{payout['orders_count']} orders", class_name="text-sm text-gray-500"
+            ),
             class_name="px-6 py-4 whitespace-nowrap",
         ),
         rx.el.td(
@@ -81,7 +83,7 @@ def payouts_page() -> rx.Component:
                                         class_name="px-6 py-3 text-left text-xs font-bold text-gray-500 uppercase tracking-wider",
                                     ),
                                     rx.el.th(
-                                        "Order ID",
+                                        "Orders",
                                         class_name="px-6 py-3 text-left text-xs font-bold text-gray-500 uppercase tracking-wider",
                                     ),
                                     rx.el.th(
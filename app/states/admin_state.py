@@ -5,15 +5,21 @@ from app.data import (
     RiderDict,
     CouponDict,
     WeeklyStatDict,
+    HourlyStatDict,
     CategoryDict,
 )
 import app.data as data
-from app.utils.database import DatabaseManager
+from app.utils.database import DB_LOAD_TIMEOUT, fan_out, get_db
+from app.utils.order_feed import follow_orders
 from app.utils.auth import hash_password
+from app.utils.reports import daily_series, hourly_series, report_window
+import datetime
 import logging
 import random
 import uuid
 
+ADMIN_ORDER_LISTS = {"orders": "orders_cursor"}
+
 
 class AdminState(rx.State):
     shops: list[ShopDict] = []
@@ -22,15 +28,9 @@ class AdminState(rx.State):
     riders: list[RiderDict] = []
     pricing_config: data.PricingConfigDict = data.PRICING_CONFIG
     coupons: list[CouponDict] = []
-    revenue_stats: list[WeeklyStatDict] = [
-        {"day": "Mon", "revenue": 0, "orders": 0},
-        {"day": "Tue", "revenue": 0, "orders": 0},
-        {"day": "Wed", "revenue": 0, "orders": 0},
-        {"day": "Thu", "revenue": 0, "orders": 0},
-        {"day": "Fri", "revenue": 0, "orders": 0},
-        {"day": "Sat", "revenue": 0, "orders": 0},
-        {"day": "Sun", "revenue": 0, "orders": 0},
-    ]
+    revenue_stats: list[WeeklyStatDict] = []
+    hourly_stats: list[HourlyStatDict] = []
+    report_days: int = 7
     is_shop_dialog_open: bool = False
     editing_shop_id: int = 0
     shop_form_name: str = ""
@@ -53,39 +53,117 @@ class AdminState(rx.State):
     category_form_slug: str = ""
     category_form_icon: str = "circle"
     category_form_color: str = "bg-gray-100"
+    load_timings: dict[str, float] = {}
+    orders_cursor: str = ""
+    total_orders_today: int = 0
+    revenue_today: float = 0.0
 
     @rx.event
     async def on_mount(self):
         await self.fetch_data()
+        return AdminState.watch_orders
+
+    @rx.event(background=True)
+    async def watch_orders(self):
+        """Push every new order and status change into the listing."""
+        await follow_orders(
+            self, ADMIN_ORDER_LISTS, view="row", on_change=self._refresh_today
+        )
+
+    def _order_placement(self, order: dict) -> str | None:
+        return "orders"
+
+    async def _reload_orders(self):
+        db_orders, next_cursor = await get_db().get_all_orders_page(view="row")
+        for o in db_orders:
+            o["items"] = o.pop("order_items", [])
+        self.orders = db_orders
+        self.orders_cursor = next_cursor or ""
+
+    async def _refresh_today(self):
+        today = await get_db().get_daily_stats(datetime.date.today().isoformat())
+        self.total_orders_today = int(today["orders_count"])
+        self.revenue_today = round(float(today["revenue"]), 2)
+
+    async def _reload(self, *collections: str):
+        """Reload only the collections a write touched."""
+        db = get_db()
+        loaders = {
+            "shops": db.get_shops,
+            "riders": db.get_riders,
+            "categories": lambda: db.get_categories(include_inactive=True),
+        }
+        results, self.load_timings = await fan_out(
+            {name: loaders[name]() for name in collections}, timeout=DB_LOAD_TIMEOUT
+        )
+        for name, rows in results.items():
+            setattr(self, name, rows)
 
     @rx.event
     async def fetch_data(self):
-        db = DatabaseManager()
-        if db.supabase:
-            self.shops = await db.get_shops()
-            self.riders = await db.get_riders()
-            self.coupons = await db.get_coupons()
-            self.categories = await db.get_categories(include_inactive=True)
-            db_orders = await db.get_all_orders()
+        db = get_db()
+        first, start, end = report_window(self.report_days)
+        today = datetime.date.today().isoformat()
+        results, self.load_timings = await fan_out(
+            {
+                "shops": db.get_shops(),
+                "riders": db.get_riders(),
+                "coupons": db.get_coupons(),
+                "categories": db.get_categories(include_inactive=True),
+                "orders": db.get_all_orders_page(view="row"),
+                "today": db.get_daily_stats(today),
+                "revenue": db.get_revenue_rollups(start, end),
+                "hourly": db.get_revenue_rollups(today, end, granularity="hour"),
+            },
+            timeout=DB_LOAD_TIMEOUT,
+        )
+        self.shops = results.get("shops", self.shops)
+        self.riders = results.get("riders", self.riders)
+        self.coupons = results.get("coupons", self.coupons)
+        self.categories = results.get("categories", self.categories)
+        if "revenue" in results:
+            self.revenue_stats = daily_series(
+                results["revenue"], first, self.report_days
+            )
+        if "hourly" in results:
+            self.hourly_stats = hourly_series(results["hourly"])
+        if "today" in results:
+            self.total_orders_today = int(results["today"]["orders_count"])
+            self.revenue_today = round(float(results["today"]["revenue"]), 2)
+        if "orders" in results:
+            db_orders, next_cursor = results["orders"]
             processed_orders = []
             for o in db_orders:
                 o["items"] = o.pop("order_items", [])
                 processed_orders.append(o)
             self.orders = processed_orders
-        else:
-            self.shops = data.SHOPS
-            self.riders = data.RIDERS
-            self.coupons = data.COUPONS
-            self.categories = data.CATEGORIES
-            self.orders = data.ORDERS
+            self.orders_cursor = next_cursor or ""
 
-    @rx.var
-    def total_orders_today(self) -> int:
-        return 256
+    @rx.event
+    async def load_more_orders(self):
+        """Append the next page of orders to the admin listing."""
+        if not self.orders_cursor:
+            return
+        db = get_db()
+        db_orders, next_cursor = await db.get_all_orders_page(
+            cursor=self.orders_cursor, view="row"
+        )
+        for o in db_orders:
+            o["items"] = o.pop("order_items", [])
+            self.orders.append(o)
+        self.orders_cursor = next_cursor or ""
+
+    @rx.event
+    async def set_report_days(self, days: str):
+        """Reload the revenue charts for the last ``days`` days."""
+        self.report_days = int(days)
+        first, start, end = report_window(self.report_days)
+        rows = await get_db().get_revenue_rollups(start, end)
+        self.revenue_stats = daily_series(rows, first, self.report_days)
 
     @rx.var
-    def total_earnings(self) -> float:
-        return 15400.0
+    def has_more_orders(self) -> bool:
+        return self.orders_cursor != ""
 
     @rx.var
     def active_riders_count(self) -> int:
@@ -129,19 +207,13 @@ class AdminState(rx.State):
     async def delete_shop(self):
         if self.shop_id_to_delete == 0:
             return
-        db = DatabaseManager()
-        if db.supabase:
-            success = await db.delete_shop(self.shop_id_to_delete)
-            if success:
-                await self.fetch_data()
-                self.is_delete_shop_alert_open = False
-                return rx.toast("Shop and associated data deleted successfully")
-            else:
-                self.is_delete_shop_alert_open = False
-                return rx.toast.error("Failed to delete shop")
-        else:
-            self.is_delete_shop_alert_open = False
-            return rx.toast.error("Database connection required")
+        db = get_db()
+        success = await db.delete_shop(self.shop_id_to_delete)
+        self.is_delete_shop_alert_open = False
+        if success:
+            await self.fetch_data()
+            return rx.toast("Shop and associated data deleted successfully")
+        return rx.toast.error("Failed to delete shop")
 
     @rx.event
     def confirm_clear_orders(self):
@@ -153,19 +225,19 @@ class AdminState(rx.State):
 
     @rx.event
     async def clear_all_orders(self):
-        db = DatabaseManager()
-        if db.supabase:
-            success = await db.delete_all_orders()
-            if success:
-                await self.fetch_data()
-                self.is_clear_orders_alert_open = False
-                return rx.toast("All orders cleared successfully")
-            else:
-                self.is_clear_orders_alert_open = False
-                return rx.toast.error("Failed to clear orders")
-        else:
-            self.is_clear_orders_alert_open = False
-            return rx.toast.error("Database connection required")
+        db = get_db()
+        success = await db.delete_all_orders()
+        self.is_clear_orders_alert_open = False
+        if success:
+            self.orders = []
+            self.orders_cursor = ""
+            self.total_orders_today = 0
+            self.revenue_today = 0.0
+            first, _, _ = report_window(self.report_days)
+            self.revenue_stats = daily_series([], first, self.report_days)
+            self.hourly_stats = hourly_series([])
+            return rx.toast("All orders cleared successfully")
+        return rx.toast.error("Failed to clear orders")
 
     @rx.event
     def close_shop_dialog(self):
@@ -177,7 +249,7 @@ class AdminState(rx.State):
 
     @rx.event
     async def save_shop(self):
-        db = DatabaseManager()
+        db = get_db()
         try:
             commission = float(self.shop_form_commission)
         except ValueError as e:
@@ -222,7 +294,7 @@ class AdminState(rx.State):
             await db.update_shop(self.editing_shop_id, updates)
             rx.toast("Shop updated successfully")
         self.is_shop_dialog_open = False
-        await self.fetch_data()
+        await self._reload("shops")
 
     @rx.event
     def open_add_rider_dialog(self):
@@ -237,7 +309,7 @@ class AdminState(rx.State):
 
     @rx.event
     async def save_rider(self):
-        db = DatabaseManager()
+        db = get_db()
         new_rider = {
             "id": f"r{random.randint(1000, 9999)}",
             "name": self.rider_form_name,
@@ -249,12 +321,12 @@ class AdminState(rx.State):
         }
         await db.create_rider(new_rider)
         self.is_rider_dialog_open = False
-        await self.fetch_data()
+        await self._reload("riders")
         return rx.toast("Rider added successfully")
 
     @rx.event
     async def toggle_rider_status(self, rider_id: str):
-        await self.fetch_data()
+        await self._reload("riders")
 
     @rx.event
     def update_delivery_base(self, value: str):
@@ -377,7 +449,7 @@ class AdminState(rx.State):
 
     @rx.event
     async def save_category(self):
-        db = DatabaseManager()
+        db = get_db()
         category_data = {
             "name": self.category_form_name,
             "slug": self.category_form_slug,
@@ -386,44 +458,30 @@ class AdminState(rx.State):
             "is_active": True,
         }
         if self.editing_category_id == 0:
-            if db.supabase:
-                await db.create_category(category_data)
-            else:
-                new_id = len(data.CATEGORIES) + 1
-                category_data["id"] = new_id
-                data.CATEGORIES.append(category_data)
-        elif db.supabase:
-            await db.update_category(self.editing_category_id, category_data)
+            await db.create_category(category_data)
         else:
-            for cat in data.CATEGORIES:
-                if cat["id"] == self.editing_category_id:
-                    cat.update(category_data)
-                    break
+            await db.update_category(self.editing_category_id, category_data)
         self.is_category_dialog_open = False
-        await self.fetch_data()
+        await self._reload("categories")
         return rx.toast("Category saved successfully")
 
     @rx.event
     async def toggle_category_status(self, category_id: int):
-        db = DatabaseManager()
-        if db.supabase:
-            current_status = True
-            for c in self.categories:
-                if c["id"] == category_id:
-                    current_status = c.get("is_active", True)
-                    break
-            await db.update_category(category_id, {"is_active": not current_status})
-            await self.fetch_data()
-            return rx.toast(
-                f"Category {('deactivated' if current_status else 'activated')}"
-            )
+        db = get_db()
+        current_status = True
+        for c in self.categories:
+            if c["id"] == category_id:
+                current_status = c.get("is_active", True)
+                break
+        await db.update_category(category_id, {"is_active": not current_status})
+        await self._reload("categories")
+        return rx.toast(
+            f"Category {('deactivated' if current_status else 'activated')}"
+        )
 
     @rx.event
     async def delete_category(self, category_id: int):
-        db = DatabaseManager()
-        if db.supabase:
-            await db.delete_category(category_id)
-        else:
-            data.CATEGORIES = [c for c in data.CATEGORIES if c["id"] != category_id]
-        await self.fetch_data()
+        db = get_db()
+        await db.delete_category(category_id)
+        await self._reload("categories")
         return rx.toast("Category deleted")
\ No newline at end of file
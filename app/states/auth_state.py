@@ -1,8 +1,8 @@
 import reflex as rx
 from typing import Optional
 from app.data import UserDict
-import app.data as data
 from app.utils.auth import hash_password, verify_password
+from app.utils.database import get_db
 from app.utils.supabase_client import get_supabase
 import logging
 from reflex_google_auth import GoogleAuthState
@@ -82,7 +82,7 @@ class AuthState(GoogleAuthState):
             return
         supabase = get_supabase()
         if not supabase:
-            user = next((u for u in data.USERS if u["email"] == self.login_email), None)
+            user = await get_db().get_user_by_email(self.login_email)
             if user and verify_password(self.login_password, user["password_hash"]):
                 self.current_user = {
                     "id": str(user["id"]),
@@ -162,14 +162,13 @@ class AuthState(GoogleAuthState):
             return
         supabase = get_supabase()
         if not supabase:
-            existing_user = next(
-                (u for u in data.USERS if u["email"] == self.register_email), None
-            )
+            db = get_db()
+            existing_user = await db.get_user_by_email(self.register_email)
             if existing_user:
                 self.error_message = "Email already registered"
                 self.is_checking_auth = False
                 return
-            new_id = f"user_{len(data.USERS) + 100}"
+            new_id = f"user_{uuid.uuid4().hex[:8]}"
             new_user = {
                 "id": new_id,
                 "name": self.register_name,
@@ -178,7 +177,7 @@ class AuthState(GoogleAuthState):
                 "role": "customer",
                 "password_hash": hash_password(self.register_password),
             }
-            data.USERS.append(new_user)
+            await db.create_user(new_user)
             self.current_user = {
                 "id": new_id,
                 "name": self.register_name,
@@ -272,11 +271,8 @@ class AuthState(GoogleAuthState):
                             user_found = True
                     except Exception as e:
                         logging.exception(f"Error checking auth from Supabase: {e}")
-                if not user_found:
-                    user = next(
-                        (u for u in data.USERS if str(u["id"]) == self.user_id_cookie),
-                        None,
-                    )
+                if not user_found and not supabase:
+                    user = await get_db().get_user_by_id(self.user_id_cookie)
                     if user:
                         self.current_user = {
                             "id": str(user["id"]),
@@ -10,10 +10,13 @@ from app.data import (
 )
 import app.data as data
 from app.states.auth_state import AuthState
-from app.utils.database import DatabaseManager
+from app.utils.database import DB_LOAD_TIMEOUT, fan_out, get_db
+from app.utils.ids import new_order_id
+from app.utils.order_feed import follow_orders
 import datetime
 import logging
-import random
+
+USER_ORDER_LISTS = {"orders": "orders_cursor"}
 
 
 class AppState(rx.State):
@@ -35,30 +38,118 @@ class AppState(rx.State):
     promo_code_input: str = ""
     applied_coupon: CouponDict | None = None
     coupon_error: str = ""
+    load_timings: dict[str, float] = {}
+    catalog_version: str = ""
+    orders_cursor: str = ""
+    include_order_history: bool = False
+    _orders_user_id: str = ""
 
     @rx.event
     async def on_mount(self):
-        """Fetch initial data from database or mock data."""
-        db = DatabaseManager()
-        if db.supabase:
-            self.categories = await db.get_categories()
-            self.shops = await db.get_shops()
-            self.products = await db.get_products()
-        else:
-            self.categories = data.CATEGORIES
-            self.shops = data.SHOPS
-            self.products = data.PRODUCTS
+        """Fetch the storefront catalog and the user's recent orders."""
+        db = get_db()
         auth_state = await self.get_state(AuthState)
+        loads = {"catalog": db.get_storefront_bootstrap(self.catalog_version)}
         if auth_state.is_authenticated and auth_state.user_id_cookie:
-            if db.supabase:
-                db_orders = await db.get_orders_by_user(auth_state.user_id_cookie)
-                processed_orders = []
-                for o in db_orders:
-                    o["items"] = o.pop("order_items", [])
-                    processed_orders.append(o)
-                self.orders = processed_orders
-            else:
-                pass
+            self._orders_user_id = auth_state.user_id_cookie
+            loads["orders"] = db.get_orders_by_user_page(
+                auth_state.user_id_cookie,
+                view="card",
+                include_history=self.include_order_history,
+            )
+        results, self.load_timings = await fan_out(loads, timeout=DB_LOAD_TIMEOUT)
+        catalog = results.get("catalog")
+        if catalog:
+            if not catalog.get("unchanged"):
+                self.categories = catalog["categories"]
+                self.shops = catalog["shops"]
+                self.products = catalog["products"]
+            self.catalog_version = catalog["version"]
+        else:
+            fallback, timings = await fan_out(
+                {
+                    "categories": db.get_categories(),
+                    "shops": db.get_shops(view="card"),
+                    "products": db.get_products(view="card"),
+                },
+                timeout=DB_LOAD_TIMEOUT,
+            )
+            self.load_timings = {**self.load_timings, **timings}
+            self.categories = fallback.get("categories", self.categories)
+            self.shops = fallback.get("shops", self.shops)
+            self.products = fallback.get("products", self.products)
+        if "orders" in results:
+            db_orders, next_cursor = results["orders"]
+            processed_orders = []
+            for o in db_orders:
+                o["items"] = o.pop("order_items", [])
+                processed_orders.append(o)
+            self.orders = processed_orders
+            self.orders_cursor = next_cursor or ""
+            return AppState.watch_orders
+
+    @rx.event(background=True)
+    async def watch_orders(self):
+        """Push status changes of the user's orders in, e.g. on the tracking page."""
+        await follow_orders(self, USER_ORDER_LISTS, view="card")
+
+    def _order_placement(self, order: dict) -> str | None:
+        if self._orders_user_id and order.get("user_id") == self._orders_user_id:
+            return "orders"
+        return None
+
+    async def _reload_orders(self):
+        if not self._orders_user_id:
+            return
+        db_orders, next_cursor = await get_db().get_orders_by_user_page(
+            self._orders_user_id,
+            view="card",
+            include_history=self.include_order_history,
+        )
+        for o in db_orders:
+            o["items"] = o.pop("order_items", [])
+        self.orders = db_orders
+        self.orders_cursor = next_cursor or ""
+
+    @rx.var
+    def has_more_orders(self) -> bool:
+        return self.orders_cursor != ""
+
+    @rx.event
+    async def load_more_orders(self):
+        """Append the next page of the user's orders."""
+        if not self.orders_cursor:
+            return
+        auth_state = await self.get_state(AuthState)
+        if not auth_state.user_id_cookie:
+            return
+        db = get_db()
+        db_orders, next_cursor = await db.get_orders_by_user_page(
+            auth_state.user_id_cookie,
+            cursor=self.orders_cursor,
+            view="card",
+            include_history=self.include_order_history,
+        )
+        for o in db_orders:
+            o["items"] = o.pop("order_items", [])
+            self.orders.append(o)
+        self.orders_cursor = next_cursor or ""
+
+    @rx.event
+    async def show_order_history(self):
+        """Reload the order list including archived and older orders."""
+        auth_state = await self.get_state(AuthState)
+        if not auth_state.user_id_cookie:
+            return
+        self.include_order_history = True
+        db = get_db()
+        db_orders, next_cursor = await db.get_orders_by_user_page(
+            auth_state.user_id_cookie, view="card", include_history=True
+        )
+        for o in db_orders:
+            o["items"] = o.pop("order_items", [])
+        self.orders = db_orders
+        self.orders_cursor = next_cursor or ""
 
     @rx.var
     async def user_name(self) -> str:
@@ -160,12 +251,8 @@ class AppState(rx.State):
         if not self.promo_code_input:
             self.coupon_error = "Please enter a code"
             return
-        db = DatabaseManager()
-        coupons = []
-        if db.supabase:
-            coupons = await db.get_coupons()
-        else:
-            coupons = data.COUPONS
+        db = get_db()
+        coupons = await db.get_coupons()
         code_to_check = self.promo_code_input.strip().upper()
         coupon = next(
             (c for c in coupons if str(c["code"]).upper() == code_to_check), None
@@ -193,12 +280,44 @@ class AppState(rx.State):
         self.coupon_error = ""
         return rx.toast("Coupon removed")
 
+    async def _validate_cart(self, db) -> str:
+        """Check cart items against current availability and prices."""
+        current = {
+            p["id"]: p
+            for p in await db.get_products_by_ids(
+                [int(pid) for pid in self.cart], view="checkout"
+            )
+        }
+        if not current:
+            logging.warning("Cart validation skipped: product lookup returned no rows")
+            return ""
+        unavailable = [
+            item["name"]
+            for item in self.cart_items_details
+            if not current.get(item["product_id"], {}).get("is_available", False)
+        ]
+        if unavailable:
+            return f"No longer available: {', '.join(unavailable)}"
+        repriced = False
+        for p in self.products:
+            latest = current.get(p["id"])
+            if latest and float(latest["price"]) != float(p["price"]):
+                p["price"] = float(latest["price"])
+                repriced = True
+        if repriced:
+            return "Some prices have changed. Please review your cart."
+        return ""
+
     @rx.event
     async def place_order(self):
         if not self.checkout_address:
             return rx.window_alert("Please enter a delivery address.")
         auth_state = await self.get_state(AuthState)
         user_id = auth_state.user_id_cookie if auth_state.user_id_cookie else "guest"
+        db = get_db()
+        error = await self._validate_cart(db)
+        if error:
+            return rx.window_alert(error)
         shop_items = {}
         for item in self.cart_items_details:
             prod = next(
@@ -211,8 +330,8 @@ class AppState(rx.State):
                 shop_items[sid].append(item)
         total_cart_subtotal = self.cart_total
         global_discount_amount = self.coupon_discount_amount
-        created_order_ids = []
-        db = DatabaseManager()
+        new_orders = []
+        now = datetime.datetime.now()
         for shop_id, items in shop_items.items():
             subtotal = sum((i["price"] * i["quantity"] for i in items))
             shop_discount = 0.0
@@ -220,43 +339,28 @@ class AppState(rx.State):
                 shop_discount = subtotal / total_cart_subtotal * global_discount_amount
             delivery = 15.0
             total = max(subtotal + delivery - shop_discount, 0.0)
-            now = datetime.datetime.now()
-            order_id = f"ORD-{random.randint(10000, 99999)}"
-            order_data = {
-                "id": order_id,
-                "subtotal": subtotal,
-                "delivery_fee": delivery,
-                "total_amount": total,
-                "status": "Confirmed",
-                "date": now.strftime("%Y-%m-%d"),
-                "time": now.strftime("%H:%M"),
-                "delivery_address": self.checkout_address,
-                "payment_method": self.checkout_payment_method,
-                "shop_id": shop_id,
-                "user_id": user_id,
-            }
-            created_order = await db.create_order(order_data)
-            if created_order:
-                order_items_data = []
-                for i in items:
-                    order_items_data.append(
-                        {
-                            "order_id": order_id,
-                            "product_id": i["product_id"],
-                            "name": i["name"],
-                            "price": i["price"],
-                            "quantity": i["quantity"],
-                            "image_url": i["image_url"],
-                        }
-                    )
-                await db.create_order_items(order_items_data)
-                new_order_full = order_data.copy()
-                new_order_full["items"] = items
-                self.orders.insert(0, new_order_full)
-                created_order_ids.append(order_id)
-            else:
-                data.ORDERS.append(order_data)
-                created_order_ids.append(order_id)
+            order_id = new_order_id()
+            new_orders.append(
+                {
+                    "id": order_id,
+                    "subtotal": subtotal,
+                    "delivery_fee": delivery,
+                    "total_amount": total,
+                    "status": "Confirmed",
+                    "date": now.strftime("%Y-%m-%d"),
+                    "time": now.strftime("%H:%M"),
+                    "delivery_address": self.checkout_address,
+                    "payment_method": self.checkout_payment_method,
+                    "shop_id": shop_id,
+                    "user_id": user_id,
+                    "items": items,
+                }
+            )
+        created_order_ids = await db.place_orders(new_orders)
+        if not created_order_ids:
+            return rx.window_alert("Could not place your order. Please try again.")
+        for order in reversed(new_orders):
+            self.orders.insert(0, order)
         self.cart = {}
         self.applied_coupon = None
         if created_order_ids:
@@ -1,16 +1,35 @@
 import reflex as rx
 from app.data import OrderDict, RiderDict
-import app.data as data
-from app.utils.database import DatabaseManager
+from app.utils.database import get_db
+from app.utils.dispatch import dispatcher
+from app.utils.order_feed import follow_orders, patch_order
 from app.states.auth_state import AuthState
 import logging
 
+# The rider's order lists, none of them paged.
+RIDER_ORDER_LISTS = {
+    "available_orders": None,
+    "assigned_orders": None,
+    "completed_orders_history": None,
+}
+# Flat payout credited to a rider per delivered order.
+DELIVERY_FEE = 40.0
+# Resolves to [latitude, longitude], or null when the browser has no fix or
+# the rider declined location access.
+GEOLOCATION_SCRIPT = """new Promise((resolve) => navigator.geolocation
+  ? navigator.geolocation.getCurrentPosition(
+      (p) => resolve([p.coords.latitude, p.coords.longitude]),
+      () => resolve(null),
+      {enableHighAccuracy: true, timeout: 10000, maximumAge: 30000})
+  : resolve(null))"""
+
 
 class RiderState(rx.State):
     rider: dict = {}
     available_orders: list[OrderDict] = []
     assigned_orders: list[OrderDict] = []
     completed_orders_history: list[OrderDict] = []
+    include_order_history: bool = False
     today_earnings: float = 0.0
     today_orders_count: int = 0
 
@@ -28,6 +47,30 @@ class RiderState(rx.State):
     async def on_mount(self):
         await self.fetch_rider_profile()
         await self.fetch_orders()
+        if self.is_online:
+            return [RiderState.watch_orders, RiderState.report_location]
+        return RiderState.watch_orders
+
+    @rx.event(background=True)
+    async def watch_orders(self):
+        """Push order changes into the rider's lists as they happen."""
+        await follow_orders(self, RIDER_ORDER_LISTS, view="card")
+
+    def _order_placement(self, order: dict) -> str | None:
+        if order.get("status") == "Ready" and not order.get("rider_id"):
+            if dispatcher.visible_to(order, self.rider_id):
+                return "available_orders"
+            return None
+        if not self.rider_id or order.get("rider_id") != self.rider_id:
+            return None
+        if order.get("status") == "Out for Delivery":
+            return "assigned_orders"
+        if order.get("status") in ["Delivered", "Completed"]:
+            return "completed_orders_history"
+        return None
+
+    async def _reload_orders(self):
+        await self.fetch_orders()
 
     @rx.event
     async def fetch_rider_profile(self):
@@ -41,81 +84,124 @@ class RiderState(rx.State):
             rider_id = user_id.replace("rider_", "")
         if not rider_id:
             return
-        db = DatabaseManager()
-        if db.supabase:
-            rider_data = await db.get_rider_by_id(rider_id)
-            if rider_data:
-                self.rider = rider_data
-                self.today_earnings = rider_data.get("earnings", 0.0)
-                self.today_orders_count = rider_data.get("completed_orders", 0)
-            else:
-                logging.warning(f"Rider profile not found for ID: {rider_id}")
-                self.rider = {}
+        db = get_db()
+        rider_data = await db.get_rider_by_id(rider_id)
+        if rider_data:
+            self.rider = rider_data
+            self.today_earnings = rider_data.get("earnings", 0.0)
+            self.today_orders_count = rider_data.get("completed_orders", 0)
         else:
-            self.rider = next((r for r in data.RIDERS if r["id"] == rider_id), {})
+            logging.warning(f"Rider profile not found for ID: {rider_id}")
+            self.rider = {}
 
     @rx.event
     async def fetch_orders(self):
-        db = DatabaseManager()
-        if db.supabase:
-            self.available_orders = await db.get_available_orders()
-            if self.rider_id:
-                all_my_orders = await db.get_rider_orders(self.rider_id)
-                self.assigned_orders = [
-                    o for o in all_my_orders if o["status"] == "Out for Delivery"
-                ]
-                self.completed_orders_history = [
-                    o
-                    for o in all_my_orders
-                    if o["status"] in ["Delivered", "Completed"]
-                ]
-        else:
-            self.available_orders = [o for o in data.ORDERS if o["status"] == "Ready"]
-            self.assigned_orders = []
-            self.completed_orders_history = []
+        db = get_db()
+        self.available_orders = [
+            o
+            for o in await db.get_available_orders(view="card")
+            if dispatcher.visible_to(o, self.rider_id)
+        ]
+        if self.rider_id:
+            all_my_orders = await db.get_rider_orders(
+                self.rider_id,
+                view="card",
+                include_history=self.include_order_history,
+            )
+            self.assigned_orders = [
+                o for o in all_my_orders if o["status"] == "Out for Delivery"
+            ]
+            self.completed_orders_history = [
+                o for o in all_my_orders if o["status"] in ["Delivered", "Completed"]
+            ]
+
+    @rx.event
+    async def show_order_history(self):
+        """Reload the delivery history including archived and older orders."""
+        self.include_order_history = True
+        await self.fetch_orders()
 
     @rx.event
     async def toggle_status(self):
         new_status = "Offline" if self.is_online else "Online"
-        db = DatabaseManager()
-        if self.rider_id and db.supabase:
+        db = get_db()
+        if self.rider_id:
             success = await db.toggle_rider_status(self.rider_id, new_status)
             if success:
                 self.rider["status"] = new_status
-                rx.toast(f"You are now {new_status}")
-            else:
-                rx.toast.error("Failed to update status")
+                toast = rx.toast(f"You are now {new_status}")
+                if new_status == "Online":
+                    return [toast, RiderState.report_location]
+                return toast
+            return rx.toast.error("Failed to update status")
         else:
             self.rider["status"] = new_status
 
+    @rx.event
+    def report_location(self):
+        """Ask the browser for the rider's position for dispatch."""
+        return rx.call_script(GEOLOCATION_SCRIPT, callback=RiderState.update_location)
+
+    @rx.event
+    async def update_location(self, coords: list | None):
+        if not coords or not self.rider_id:
+            return
+        latitude, longitude = float(coords[0]), float(coords[1])
+        if await get_db().update_rider_location(self.rider_id, latitude, longitude):
+            self.rider = {**self.rider, "latitude": latitude, "longitude": longitude}
+
     @rx.event
     async def accept_order(self, order_id: str):
         if not self.is_online:
             return rx.window_alert("Please go online to accept orders")
-        db = DatabaseManager()
-        if self.rider_id and db.supabase:
-            success = await db.assign_order_to_rider(order_id, self.rider_id)
-            if success:
-                rx.toast("Order accepted! 🚀")
-                await self.fetch_orders()
-                return rx.redirect("/rider/deliveries")
-            else:
-                rx.toast.error("Failed to accept order")
+        db = get_db()
+        if self.rider_id:
+            order = await db.assign_order_to_rider(order_id, self.rider_id)
+            if order:
+                if not patch_order(
+                    self,
+                    RIDER_ORDER_LISTS,
+                    order_id,
+                    status="Out for Delivery",
+                    rider_id=self.rider_id,
+                ):
+                    await self.fetch_orders()
+                return [
+                    rx.toast("Order accepted! 🚀"),
+                    rx.redirect("/rider/deliveries"),
+                ]
+            current = await db.get_order(order_id, view="row")
+            if current and current["status"] == "Ready" and not current["rider_id"]:
+                return rx.toast.error("Failed to accept order")
+            # Lost the race: someone else claimed it, or it is no longer Ready.
+            self.available_orders = [
+                o for o in self.available_orders if o["id"] != order_id
+            ]
+            if current and current["rider_id"]:
+                return rx.toast.error("Another rider just took this order")
+            return rx.toast.error("This order is no longer available")
         else:
-            rx.toast("Demo: Order accepted")
+            return rx.toast("Demo: Order accepted")
 
     @rx.event
     async def mark_delivered(self, order_id: str):
-        db = DatabaseManager()
-        if db.supabase:
-            success = await db.update_order_status(order_id, "Delivered")
-            if success:
-                earnings = 40.0
-                await db.update_rider_earnings(self.rider_id, earnings)
-                rx.toast(f"Order delivered! Earned ₹{earnings}")
-                await self.fetch_orders()
-                await self.fetch_rider_profile()
-            else:
-                rx.toast.error("Failed to update status")
-        else:
-            rx.toast("Demo: Order delivered")
\ No newline at end of file
+        db = get_db()
+        # Delivery and payout happen together, and only for an order that is
+        # still out with this rider, so a double click cannot pay twice.
+        rows = await db.deliver_orders(
+            [{"order_id": order_id, "rider_id": self.rider_id, "amount": DELIVERY_FEE}]
+        )
+        if not rows:
+            await self.fetch_orders()
+            return rx.toast.error("This order is no longer out for delivery")
+        if not patch_order(self, RIDER_ORDER_LISTS, order_id, status="Delivered"):
+            await self.fetch_orders()
+        rider_data = rows[0]
+        self.rider = {
+            **self.rider,
+            "earnings": rider_data["earnings"],
+            "completed_orders": rider_data["completed_orders"],
+        }
+        self.today_earnings = float(rider_data["earnings"] or 0.0)
+        self.today_orders_count = rider_data["completed_orders"] or 0
+        return rx.toast(f"Order delivered! Earned ₹{DELIVERY_FEE}")
\ No newline at end of file
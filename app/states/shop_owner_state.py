@@ -1,24 +1,24 @@
+import asyncio
 import reflex as rx
 from app.data import ProductDict, OrderDict, WeeklyStatDict, PayoutDict
-import app.data as data
-from app.utils.database import DatabaseManager
+from app.utils.database import CLOSED_ORDER_STATUSES, OPEN_ORDER_STATUSES, get_db
+from app.utils.order_feed import follow_orders, patch_order
+from app.utils.reports import daily_series, report_window
+import datetime
 import logging
 
+# Open orders are the shop's action queue and are loaded in full; closed
+# orders are paged history.
+SHOP_ORDER_LISTS = {"open_orders": None, "orders": "orders_cursor"}
+
 
 class ShopOwnerState(rx.State):
     shop_id: int = 1
     shop_name: str = "Fresh Mart Grocery"
     products: list[ProductDict] = []
+    open_orders: list[OrderDict] = []
     orders: list[OrderDict] = []
-    weekly_stats: list[WeeklyStatDict] = [
-        {"day": "Mon", "revenue": 1200, "orders": 12},
-        {"day": "Tue", "revenue": 1500, "orders": 15},
-        {"day": "Wed", "revenue": 1100, "orders": 10},
-        {"day": "Thu", "revenue": 1800, "orders": 18},
-        {"day": "Fri", "revenue": 2200, "orders": 22},
-        {"day": "Sat", "revenue": 2800, "orders": 25},
-        {"day": "Sun", "revenue": 2500, "orders": 20},
-    ]
+    weekly_stats: list[WeeklyStatDict] = []
     payouts: list[PayoutDict] = []
     is_product_dialog_open: bool = False
     editing_product_id: int = 0
@@ -27,10 +27,77 @@ class ShopOwnerState(rx.State):
     form_unit: str = ""
     form_image_url: str = ""
     form_description: str = ""
+    orders_cursor: str = ""
+    include_order_history: bool = False
+    total_orders_today: int = 0
+    total_revenue_today: float = 0.0
+    total_earnings: float = 0.0
+    _commission_rate: float = 10.0
 
     @rx.event
     async def on_mount(self):
         await self.fetch_data()
+        return ShopOwnerState.watch_orders
+
+    @rx.event(background=True)
+    async def watch_orders(self):
+        """Push this shop's new orders and status changes in as they happen."""
+        await follow_orders(
+            self, SHOP_ORDER_LISTS, view="card", on_change=self._refresh_totals
+        )
+
+    def _order_placement(self, order: dict) -> str | None:
+        if order.get("shop_id") != self.shop_id:
+            return None
+        return "open_orders" if order.get("status") in OPEN_ORDER_STATUSES else "orders"
+
+    async def _reload_orders(self):
+        db = get_db()
+        open_orders, (db_orders, next_cursor) = await asyncio.gather(
+            db.get_open_orders_by_shop(self.shop_id, view="card"),
+            db.get_orders_by_shop_page(
+                self.shop_id,
+                view="card",
+                statuses=CLOSED_ORDER_STATUSES,
+                include_history=self.include_order_history,
+            ),
+        )
+        for o in open_orders + db_orders:
+            o["items"] = o.pop("order_items", [])
+        self.open_orders = open_orders
+        self.orders = db_orders
+        self.orders_cursor = next_cursor or ""
+
+    async def _refresh_totals(self):
+        """Recompute today's counters, earnings and payouts after an order change.
+
+        All of them come from the shop_daily_stats counters, so they cover
+        every delivered order rather than the loaded page of history.
+        """
+        db = get_db()
+        today, lifetime, payout_days = await asyncio.gather(
+            db.get_daily_stats(datetime.date.today().isoformat(), self.shop_id),
+            db.get_daily_stats(None, self.shop_id),
+            db.get_payout_days(self.shop_id),
+        )
+        self.total_orders_today = int(today["orders_count"])
+        self.total_revenue_today = round(float(today["revenue"]), 2)
+        delivered = float(lifetime["delivered_revenue"])
+        self.total_earnings = round(delivered * (1 - self._commission_rate / 100), 2)
+        self.payouts = [self._payout(row) for row in payout_days]
+
+    def _payout(self, row: dict) -> PayoutDict:
+        amount = round(float(row["delivered_revenue"]), 2)
+        commission = round(amount * self._commission_rate / 100, 2)
+        return {
+            "id": f"PAY-{row['day']}",
+            "date": str(row["day"]),
+            "orders_count": int(row["delivered_count"]),
+            "order_amount": amount,
+            "commission": commission,
+            "payout_amount": round(amount - commission, 2),
+            "status": "Processed",
+        }
 
     @rx.event
     async def fetch_data(self):
@@ -39,74 +106,59 @@ class ShopOwnerState(rx.State):
         auth_state = await self.get_state(AuthState)
         if auth_state.current_user and auth_state.current_user.get("shop_id"):
             self.shop_id = auth_state.current_user["shop_id"]
-        db = DatabaseManager()
-        if db.supabase:
-            shops = await db.get_shops()
-            shop = next((s for s in shops if s["id"] == self.shop_id), None)
-            if shop:
-                self.shop_name = shop["name"]
-            self.products = await db.get_products(self.shop_id)
-            db_orders = await db.get_orders_by_shop(self.shop_id)
-            processed_orders = []
-            for o in db_orders:
-                o["items"] = o.pop("order_items", [])
-                processed_orders.append(o)
-            self.orders = processed_orders
-        else:
-            shops = data.SHOPS
-            shop = next((s for s in shops if s["id"] == self.shop_id), None)
-            if shop:
-                self.shop_name = shop["name"]
-            self.products = [p for p in data.PRODUCTS if p["shop_id"] == self.shop_id]
-            self.orders = [o for o in data.ORDERS if o.get("shop_id") == self.shop_id]
-        self.generate_payouts()
-
-    @rx.event
-    def generate_payouts(self):
-        self.payouts = []
-        for order in self.orders:
-            if order["status"] in ["Delivered", "Completed"]:
-                commission = order["subtotal"] * 0.1
-                self.payouts.append(
-                    {
-                        "id": f"PAY-{order['id']}",
-                        "date": order["date"],
-                        "order_id": order["id"],
-                        "order_amount": order["subtotal"],
-                        "commission": commission,
-                        "payout_amount": order["subtotal"] - commission,
-                        "status": "Processed",
-                    }
-                )
+        db = get_db()
+        shops = await db.get_shops()
+        shop = next((s for s in shops if s["id"] == self.shop_id), None)
+        if shop:
+            self.shop_name = shop["name"]
+            self._commission_rate = float(shop.get("commission_rate") or 10)
+        self.products = await db.get_products(self.shop_id, include_unavailable=True)
+        await self._reload_orders()
+        first, start, end = report_window(7)
+        rollups = await db.get_revenue_rollups(start, end, shop_id=self.shop_id)
+        self.weekly_stats = daily_series(rollups, first, 7)
+        await self._refresh_totals()
 
-    @rx.var
-    def total_orders_today(self) -> int:
-        return 12
+    @rx.event
+    async def load_more_orders(self):
+        """Append the next page of this shop's order history."""
+        if not self.orders_cursor:
+            return
+        db = get_db()
+        db_orders, next_cursor = await db.get_orders_by_shop_page(
+            self.shop_id,
+            cursor=self.orders_cursor,
+            view="card",
+            statuses=CLOSED_ORDER_STATUSES,
+            include_history=self.include_order_history,
+        )
+        for o in db_orders:
+            o["items"] = o.pop("order_items", [])
+            self.orders.append(o)
+        self.orders_cursor = next_cursor or ""
+
+    @rx.event
+    async def show_order_history(self):
+        """Reload the history including archived and older orders."""
+        self.include_order_history = True
+        await self._reload_orders()
 
     @rx.var
-    def total_revenue_today(self) -> float:
-        return 4500.0
+    def has_more_orders(self) -> bool:
+        return self.orders_cursor != ""
 
     @rx.var
     def pending_orders(self) -> list[OrderDict]:
-        return [o for o in self.orders if o["status"] == "Pending"]
+        return [o for o in self.open_orders if o["status"] == "Pending"]
 
     @rx.var
     def active_orders(self) -> list[OrderDict]:
-        return [
-            o
-            for o in self.orders
-            if o["status"] in ["Confirmed", "Packed", "Ready", "Out for Delivery"]
-        ]
+        return [o for o in self.open_orders if o["status"] != "Pending"]
 
     @rx.var
     def completed_orders(self) -> list[OrderDict]:
         return [o for o in self.orders if o["status"] in ["Delivered", "Completed"]]
 
-    @rx.var
-    def total_earnings(self) -> float:
-        return sum((p["payout_amount"] for p in self.payouts))
-
     @rx.event
     def open_add_product_dialog(self):
         self.editing_product_id = 0
@@ -142,7 +194,7 @@ class ShopOwnerState(rx.State):
         except ValueError as e:
             logging.exception(f"Error: {e}")
             return rx.window_alert("Invalid price")
-        db = DatabaseManager()
+        db = get_db()
         if self.editing_product_id == 0:
             new_product = {
                 "shop_id": self.shop_id,
@@ -175,7 +227,7 @@ class ShopOwnerState(rx.State):
 
     @rx.event
     async def toggle_stock(self, product_id: int):
-        db = DatabaseManager()
+        db = get_db()
         current_status = True
         for p in self.products:
             if p["id"] == product_id:
@@ -186,9 +238,13 @@ class ShopOwnerState(rx.State):
 
     @rx.event
     async def update_order_status(self, order_id: str, status: str):
-        db = DatabaseManager()
-        await db.update_order_status(order_id, status)
-        await self.fetch_data()
+        db = get_db()
+        if not await db.update_order_status(order_id, status):
+            return rx.toast.error("Failed to update order status")
+        if patch_order(self, SHOP_ORDER_LISTS, order_id, status=status):
+            await self._refresh_totals()
+        else:
+            await self.fetch_data()
 
     @rx.event
     def set_form_name(self, value: str):
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL.
+
+    Keys are tuples whose first element is a namespace (for example
+    ``("products", shop_id, view)``), so writers can drop a single entry, a
+    key prefix, or every entry in a namespace. Cached rows and documents are
+    copied on the way in and out so callers can mutate what they receive
+    without corrupting the cache.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def _copy(cls, value: Any) -> Any:
+        if isinstance(value, list):
+            return [cls._copy(v) for v in value]
+        if isinstance(value, dict):
+            return {k: cls._copy(v) for k, v in value.items()}
+        return value
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._copy(value)
+
+    def set(self, key: tuple, value: Any):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, self._copy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, namespace: str, *key: Hashable):
+        """Drop every entry whose key starts with ``(namespace, *key)``."""
+        prefix = (namespace, *key)
+        with self._lock:
+            for cached_key in [k for k in self._data if k[: len(prefix)] == prefix]:
+                del self._data[cached_key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
\ No newline at end of file
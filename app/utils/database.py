@@ -1,17 +1,225 @@
+import asyncio
+import base64
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+from app.utils.cache import TTLCache
+from app.utils.dispatch import dispatcher
+from app.utils.ids import get_order_id_generator
+from app.utils.metrics import instrument_methods, record_error
+from app.utils.order_feed import ORDER_EVENT_FIELDS, order_feed
 from app.utils.supabase_client import get_supabase
 
+if TYPE_CHECKING:
+    from app.utils.repository import Repository
 
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "32"))
+DB_QUERY_TIMEOUT = float(os.environ.get("DB_QUERY_TIMEOUT", "10"))
+# Budget for each load of a page's fan_out; a slower load keeps its old value.
+DB_LOAD_TIMEOUT = float(os.environ.get("DB_LOAD_TIMEOUT", "5"))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", "60"))
+CATALOG_CACHE_SIZE = int(os.environ.get("CATALOG_CACHE_SIZE", "256"))
+ORDERS_PAGE_SIZE = int(os.environ.get("ORDERS_PAGE_SIZE", "20"))
+# A shop works through its open orders, which are loaded in full; closed
+# orders are history and are paged.
+OPEN_ORDER_STATUSES = ("Pending", "Confirmed", "Packed", "Ready", "Out for Delivery")
+CLOSED_ORDER_STATUSES = ("Delivered", "Completed", "Cancelled", "Rejected")
+# Days of delivered sales listed on the shop payouts page.
+PAYOUT_DAYS = int(os.environ.get("PAYOUT_DAYS", "30"))
+# Counters kept per (day, shop) in shop_daily_stats.
+DAILY_STAT_COLUMNS = (
+    "orders_count",
+    "revenue",
+    "delivered_count",
+    "delivered_revenue",
+    "cancelled_count",
+)
+# revenue_rollups rows with this shop_id hold the platform-wide totals.
+PLATFORM_ROLLUP_SHOP_ID = 0
+ROLLUP_COLUMNS = "bucket, orders_count, gmv, commission, delivery_fees"
+ROLLUP_INTERVAL = float(os.environ.get("ROLLUP_INTERVAL", "60"))
+# Customer, shop and rider listings read the last ORDERS_HOT_DAYS days unless
+# history is asked for, so they only touch the newest orders partitions.
+# Delivered orders older than ORDER_ARCHIVE_AFTER_DAYS move to orders_archive.
+ORDERS_HOT_DAYS = int(os.environ.get("ORDERS_HOT_DAYS", "90"))
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get("ORDER_ARCHIVE_AFTER_DAYS", "180"))
+ORDER_ARCHIVE_BATCH = int(os.environ.get("ORDER_ARCHIVE_BATCH", "5000"))
+ORDER_ARCHIVE_INTERVAL = float(os.environ.get("ORDER_ARCHIVE_INTERVAL", "3600"))
+# "supabase" sends every query through PostgREST; "sql" serves the hot catalog
+# reads, order inserts and status updates straight from the SQLAlchemy engine
+# and still needs Supabase for everything else; "memory" keeps everything in
+# process. Without Supabase or an engine the in-memory repository is used.
+DB_BACKEND = os.environ.get("DB_BACKEND", "supabase").lower()
+# psycopg 3 prepares a statement server-side after it has run this many times
+# on a connection. Set to "none" behind PgBouncer in transaction mode, which
+# cannot keep prepared statements across transactions.
+DB_PREPARE_THRESHOLD = os.environ.get("DB_PREPARE_THRESHOLD", "5").lower()
+
+# Column projections per use case. "detail" keeps every column for edit forms
+# and single-record views; listings ask for only the columns they render.
+PROJECTIONS: dict[str, dict[str, str]] = {
+    "shops": {
+        "card": "id, name, category_slug, rating, delivery_time, distance, "
+        "image_url, address, is_featured",
+        "detail": "*",
+    },
+    "products": {
+        "card": "id, shop_id, name, price, original_price, image_url, unit, "
+        "is_available",
+        "checkout": "id, shop_id, name, price, image_url, is_available",
+        "detail": "*",
+    },
+    "orders": {
+        "row": "id, date, time, status, total_amount, delivery_address, shop_id, "
+        "user_id, rider_id, created_at",
+        "card": "id, date, time, status, subtotal, delivery_fee, total_amount, "
+        "delivery_address, payment_method, shop_id, user_id, rider_id, created_at, "
+        "order_items(product_id, name, price, quantity)",
+        "detail": "*, order_items(*)",
+    },
+}
+
+
+def projection(table: str, view: str) -> str:
+    """Return the select list for ``table`` as rendered by ``view``."""
+    return PROJECTIONS[table].get(view, PROJECTIONS[table]["detail"])
+
+
+def archive_projection(view: str) -> str:
+    """The orders projection for orders_archive, whose items live in
+    order_items_archive but are still returned under ``order_items``."""
+    return projection("orders", view).replace(
+        "order_items(", "order_items:order_items_archive("
+    )
+
+
+def hot_orders_cutoff() -> Optional[str]:
+    """Oldest ``created_at`` a listing reads without history, if any."""
+    if ORDERS_HOT_DAYS <= 0:
+        return None
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=ORDERS_HOT_DAYS)
+    return cutoff.isoformat(timespec="seconds")
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db-worker"
+)
+
+
+async def run_blocking(
+    func: Callable[..., Any], *args, timeout: Optional[float] = None
+) -> Any:
+    """Run a blocking database call on the shared executor with a timeout.
+
+    The Supabase client and SQLAlchemy engine are synchronous, so every call is
+    offloaded to a bounded thread pool to keep the Reflex event loop free. The
+    pool size also caps the number of in-flight requests per worker process.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_executor, functools.partial(func, *args)),
+            timeout=timeout if timeout is not None else DB_QUERY_TIMEOUT,
+        )
+    except Exception as e:
+        record_error(e)
+        raise
+
+
+def encode_order_cursor(order: dict) -> str:
+    """Encode the (created_at, id) keyset position of an order as a cursor."""
+    raw = f"{order.get('created_at') or ''}|{order['id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_order_cursor(cursor: str) -> tuple[str, str]:
+    raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    created_at, order_id = raw.split("|", 1)
+    return created_at, order_id
+
+
+_in_fan_out: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "db_in_fan_out", default=False
+)
+
+
+def load_failed(message: str, error: Exception, default: Any) -> Any:
+    """Log a failed read and return its empty ``default``.
+
+    Inside ``fan_out`` the error is re-raised instead, so the load is left out
+    of the results and the caller keeps what it already had rather than
+    replacing it with an empty list.
+    """
+    if _in_fan_out.get():
+        raise error
+    logging.exception(message)
+    return default
+
+
+async def fan_out(
+    loads: dict[str, Awaitable], timeout: Optional[float] = None
+) -> tuple[dict[str, Any], dict[str, float]]:
+    """Await independent loads concurrently and time each one.
+
+    A load that raises or exceeds ``timeout`` is logged and left out of the
+    results, so callers can keep their previous value instead of waiting on
+    or being wiped by a single slow table. Loaders report their failures
+    through ``load_failed`` so they reach this point instead of turning into
+    empty results. Timings are in milliseconds.
+    """
+    timings: dict[str, float] = {}
+
+    async def timed(name: str, load: Awaitable) -> Any:
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(load, timeout=timeout)
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    token = _in_fan_out.set(True)
+    try:
+        # The gathered tasks copy the context here, so loaders see the flag.
+        outcomes = await asyncio.gather(
+            *(timed(name, load) for name, load in loads.items()),
+            return_exceptions=True,
+        )
+    finally:
+        _in_fan_out.reset(token)
+    results = {}
+    for name, outcome in zip(loads, outcomes):
+        if isinstance(outcome, BaseException):
+            logging.error(f"Load '{name}' failed: {outcome!r}")
+            continue
+        results[name] = outcome
+    logging.debug(f"Fan-out timings (ms): {timings}")
+    return results, timings
+
+
+@instrument_methods
 class DatabaseManager:
     """Database operations manager for both Supabase and direct SQL queries."""
 
     def __init__(self):
         self.supabase = get_supabase()
         self.engine = None
+        self.catalog_cache = TTLCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
         self._setup_engine()
 
     def _setup_engine(self):
@@ -19,12 +227,109 @@ class DatabaseManager:
         db_url = os.environ.get("REFLEX_DB_URL")
         if db_url:
             try:
-                self.engine = create_engine(db_url)
+                connect_args = {}
+                if make_url(db_url).get_driver_name() == "psycopg":
+                    connect_args["prepare_threshold"] = (
+                        None
+                        if DB_PREPARE_THRESHOLD == "none"
+                        else int(DB_PREPARE_THRESHOLD)
+                    )
+                self.engine = create_engine(
+                    db_url,
+                    connect_args=connect_args,
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_pre_ping=DB_POOL_PRE_PING,
+                )
                 self.Session = sessionmaker(bind=self.engine)
                 logging.info("Database engine initialized successfully")
             except Exception as e:
                 logging.exception(f"Failed to initialize database engine: {e}")
 
+    def pool_metrics(self) -> dict[str, object]:
+        """Return a snapshot of the SQLAlchemy connection pool."""
+        metrics: dict[str, object] = {
+            "engine": self.engine is not None,
+            "backend": "sql" if self.use_sql else "supabase",
+            "executor_workers": DB_EXECUTOR_WORKERS,
+            "catalog_cache": self.catalog_cache.stats(),
+        }
+        if not self.engine:
+            return metrics
+        pool = self.engine.pool
+        try:
+            metrics.update(
+                {
+                    "pool_size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                    "max_overflow": DB_MAX_OVERFLOW,
+                }
+            )
+        except AttributeError:
+            metrics["status"] = pool.status()
+        return metrics
+
+    @property
+    def use_sql(self) -> bool:
+        """Whether hot paths go straight to Postgres instead of PostgREST."""
+        return self.engine is not None and DB_BACKEND == "sql"
+
+    def close(self, close_connections: bool = True):
+        """Release pooled connections held by this manager."""
+        if self.engine:
+            self.engine.dispose(close=close_connections)
+
+    def _invalidate_catalog(self, namespace: str, *key):
+        """Drop cached catalog entries along with the bootstrap document."""
+        self.catalog_cache.invalidate(namespace, *key)
+        self.catalog_cache.invalidate("bootstrap")
+
+    async def _execute(self, query):
+        """Execute a Supabase query builder without blocking the event loop."""
+        return await run_blocking(query.execute)
+
+    @staticmethod
+    def _to_json_value(value):
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        return value
+
+    @classmethod
+    def _row_to_dict(cls, row) -> dict[str, object]:
+        """Convert a SQL row to the JSON-friendly shape PostgREST returns."""
+        return {key: cls._to_json_value(value) for key, value in row._mapping.items()}
+
+    def _run_sql(self, query: str, params: dict) -> list[dict[str, object]]:
+        with self.engine.begin() as connection:
+            result = connection.execute(text(query), params)
+            if not result.returns_rows:
+                return []
+            return [self._row_to_dict(row) for row in result]
+
+    def _run_sql_many(self, query: str, params: list[dict]):
+        with self.engine.begin() as connection:
+            connection.execute(text(query), params)
+
+    async def _sql(self, query: str, params: Optional[dict] = None) -> list[dict]:
+        """Run a fast-path statement on the engine, raising on failure."""
+        return await run_blocking(self._run_sql, query, params or {})
+
+    @staticmethod
+    def _insert_sql(table: str, columns) -> str:
+        columns = list(columns)
+        if not all(column.isidentifier() for column in columns):
+            raise ValueError(f"Invalid column name for {table}: {columns}")
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + column for column in columns)})"
+        )
+
     async def execute_query(
         self, query: str, params: dict = None
     ) -> list[dict[str, object]]:
@@ -33,9 +338,7 @@ class DatabaseManager:
             logging.error("Database engine not available")
             return []
         try:
-            with self.engine.connect() as connection:
-                result = connection.execute(text(query), params or {})
-                return [dict(row._mapping) for row in result]
+            return await run_blocking(self._run_sql, query, params or {})
         except Exception as e:
             logging.exception(f"Database query error: {e}")
             return []
@@ -45,8 +348,8 @@ class DatabaseManager:
         if not self.supabase:
             return None
         try:
-            response = (
-                self.supabase.table("users").select("*").eq("email", email).execute()
+            response = await self._execute(
+                self.supabase.table("users").select("*").eq("email", email)
             )
             return response.data[0] if response.data else None
         except Exception as e:
@@ -58,8 +361,8 @@ class DatabaseManager:
         if not self.supabase:
             return None
         try:
-            response = (
-                self.supabase.table("users").select("*").eq("id", user_id).execute()
+            response = await self._execute(
+                self.supabase.table("users").select("*").eq("id", user_id)
             )
             return response.data[0] if response.data else None
         except Exception as e:
@@ -71,60 +374,181 @@ class DatabaseManager:
         if not self.supabase:
             return None
         try:
-            response = self.supabase.table("users").insert(user_data).execute()
+            response = await self._execute(
+                self.supabase.table("users").insert(user_data)
+            )
             return response.data[0] if response.data else None
         except Exception as e:
             logging.exception(f"Error creating user: {e}")
             return None
 
-    async def get_shops(self, category_slug: Optional[str] = None) -> list[dict]:
+    async def get_shops(
+        self, category_slug: Optional[str] = None, view: str = "detail"
+    ) -> list[dict]:
         """Get shops from database."""
-        if not self.supabase:
+        if not self.supabase and not self.use_sql:
             return []
+        cache_key = ("shops", category_slug or "all", view)
+        cached = self.catalog_cache.get(cache_key)
+        if cached is not None:
+            return cached
         try:
-            query = self.supabase.table("shops").select("*").eq("is_active", True)
-            if category_slug and category_slug != "all":
-                query = query.eq("category_slug", category_slug)
-            response = query.execute()
-            return response.data or []
+            filter_category = category_slug and category_slug != "all"
+            if self.use_sql:
+                sql = f"SELECT {projection('shops', view)} FROM shops WHERE is_active"
+                if filter_category:
+                    sql += " AND category_slug = :category_slug"
+                shops = await self._sql(sql, {"category_slug": category_slug})
+            else:
+                query = (
+                    self.supabase.table("shops")
+                    .select(projection("shops", view))
+                    .eq("is_active", True)
+                )
+                if filter_category:
+                    query = query.eq("category_slug", category_slug)
+                response = await self._execute(query)
+                shops = response.data or []
+            self.catalog_cache.set(cache_key, shops)
+            return shops
         except Exception as e:
-            logging.exception(f"Error fetching shops: {e}")
+            return load_failed(f"Error fetching shops: {e}", e, [])
+
+    async def get_products(
+        self,
+        shop_id: Optional[int] = None,
+        view: str = "detail",
+        include_unavailable: bool = False,
+    ) -> list[dict]:
+        """Get products from database.
+
+        Out-of-stock products are skipped unless ``include_unavailable``, which
+        the shop owner's catalog uses so they can be restocked.
+        """
+        if not self.supabase and not self.use_sql:
             return []
+        cache_key = ("products", shop_id or None, view, include_unavailable)
+        cached = self.catalog_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            if self.use_sql:
+                sql = f"SELECT {projection('products', view)} FROM products WHERE TRUE"
+                if not include_unavailable:
+                    sql += " AND is_available"
+                if shop_id:
+                    sql += " AND shop_id = :shop_id"
+                products = await self._sql(sql, {"shop_id": shop_id})
+            else:
+                query = self.supabase.table("products").select(
+                    projection("products", view)
+                )
+                if not include_unavailable:
+                    query = query.eq("is_available", True)
+                if shop_id:
+                    query = query.eq("shop_id", shop_id)
+                response = await self._execute(query)
+                products = response.data or []
+            self.catalog_cache.set(cache_key, products)
+            return products
+        except Exception as e:
+            return load_failed(f"Error fetching products: {e}", e, [])
 
-    async def get_products(self, shop_id: Optional[int] = None) -> list[dict]:
-        """Get products from database."""
-        if not self.supabase:
+    async def get_products_by_ids(
+        self, product_ids: list[int], view: str = "checkout"
+    ) -> list[dict]:
+        """Get the current state of specific products, bypassing the cache."""
+        if not (self.supabase or self.use_sql) or not product_ids:
             return []
         try:
-            query = self.supabase.table("products").select("*").eq("is_available", True)
-            if shop_id:
-                query = query.eq("shop_id", shop_id)
-            response = query.execute()
+            if self.use_sql:
+                return await self._sql(
+                    f"SELECT {projection('products', view)} FROM products "
+                    "WHERE id = ANY(:ids)",
+                    {"ids": list(product_ids)},
+                )
+            response = await self._execute(
+                self.supabase.table("products")
+                .select(projection("products", view))
+                .in_("id", product_ids)
+            )
             return response.data or []
         except Exception as e:
-            logging.exception(f"Error fetching products: {e}")
+            logging.exception(f"Error fetching products by id: {e}")
             return []
 
     async def get_categories(self, include_inactive: bool = False) -> list[dict]:
         """Get categories from database."""
-        if not self.supabase:
+        if not self.supabase and not self.use_sql:
             return []
+        cache_key = ("categories", include_inactive)
+        cached = self.catalog_cache.get(cache_key)
+        if cached is not None:
+            return cached
         try:
-            query = self.supabase.table("categories").select("*")
-            if not include_inactive:
-                query = query.eq("is_active", True)
-            response = query.order("sort_order").execute()
-            return response.data or []
+            if self.use_sql:
+                categories = await self._sql(
+                    "SELECT * FROM categories"
+                    + ("" if include_inactive else " WHERE is_active")
+                    + " ORDER BY sort_order"
+                )
+            else:
+                query = self.supabase.table("categories").select("*")
+                if not include_inactive:
+                    query = query.eq("is_active", True)
+                response = await self._execute(query.order("sort_order"))
+                categories = response.data or []
+            self.catalog_cache.set(cache_key, categories)
+            return categories
         except Exception as e:
-            logging.exception(f"Error fetching categories: {e}")
-            return []
+            return load_failed(f"Error fetching categories: {e}", e, [])
+
+    async def get_storefront_bootstrap(
+        self, known_version: Optional[str] = None
+    ) -> Optional[dict]:
+        """Get categories, shops and products as one versioned document.
+
+        Returns ``{"version": ..., "unchanged": True}`` when ``known_version``
+        is still current, and None when the bootstrap function is unavailable
+        so callers can fall back to the individual catalog queries.
+        """
+        cached = self.catalog_cache.get(("bootstrap",))
+        if cached is None:
+            try:
+                if self.engine:
+                    rows = await self.execute_query(
+                        "SELECT storefront_bootstrap(:known_version) AS document",
+                        {"known_version": known_version},
+                    )
+                    cached = rows[0]["document"] if rows else None
+                elif self.supabase:
+                    response = await self._execute(
+                        self.supabase.rpc(
+                            "storefront_bootstrap", {"known_version": known_version}
+                        )
+                    )
+                    cached = response.data
+            except Exception as e:
+                logging.exception(f"Error fetching storefront bootstrap: {e}")
+                return None
+            if not cached:
+                return None
+            if cached.get("unchanged"):
+                return cached
+            self.catalog_cache.set(("bootstrap",), cached)
+        if known_version and cached.get("version") == known_version:
+            return {"version": known_version, "unchanged": True}
+        return cached
 
     async def create_category(self, category_data: dict) -> Optional[dict]:
         """Create a new category."""
         if not self.supabase:
             return None
         try:
-            response = self.supabase.table("categories").insert(category_data).execute()
+            response = await self._execute(
+                self.supabase.table("categories").insert(category_data)
+            )
+            self._invalidate_catalog("categories")
             return response.data[0] if response.data else None
         except Exception as e:
             logging.exception(f"Error creating category: {e}")
@@ -135,9 +559,10 @@ class DatabaseManager:
         if not self.supabase:
             return False
         try:
-            self.supabase.table("categories").update(updates).eq(
-                "id", category_id
-            ).execute()
+            await self._execute(
+                self.supabase.table("categories").update(updates).eq("id", category_id)
+            )
+            self._invalidate_catalog("categories")
             return True
         except Exception as e:
             logging.exception(f"Error updating category: {e}")
@@ -148,7 +573,10 @@ class DatabaseManager:
         if not self.supabase:
             return False
         try:
-            self.supabase.table("categories").delete().eq("id", category_id).execute()
+            await self._execute(
+                self.supabase.table("categories").delete().eq("id", category_id)
+            )
+            self._invalidate_catalog("categories")
             return True
         except Exception as e:
             logging.exception(f"Error deleting category: {e}")
@@ -156,211 +584,718 @@ class DatabaseManager:
 
     async def create_order(self, order_data: dict) -> Optional[dict]:
         """Create a new order in the database."""
-        if not self.supabase:
+        if not self.supabase and not self.use_sql:
             return None
         try:
-            response = self.supabase.table("orders").insert(order_data).execute()
-            return response.data[0] if response.data else None
+            if self.use_sql:
+                rows = await self._sql(
+                    self._insert_sql("orders", order_data) + " RETURNING *", order_data
+                )
+            else:
+                response = await self._execute(
+                    self.supabase.table("orders").insert(order_data)
+                )
+                rows = response.data
+            if not rows:
+                return None
+            order_feed.publish_local("INSERT", rows[0])
+            return rows[0]
         except Exception as e:
             logging.exception(f"Error creating order: {e}")
             return None
 
     async def create_order_items(self, items_data: list[dict]) -> bool:
         """Create order items in the database."""
-        if not self.supabase:
+        if not self.supabase and not self.use_sql:
             return False
         try:
-            self.supabase.table("order_items").insert(items_data).execute()
+            if self.use_sql:
+                if items_data:
+                    await run_blocking(
+                        self._run_sql_many,
+                        self._insert_sql("order_items", items_data[0]),
+                        items_data,
+                    )
+                return True
+            await self._execute(self.supabase.table("order_items").insert(items_data))
             return True
         except Exception as e:
             logging.exception(f"Error creating order items: {e}")
             return False
 
-    async def get_orders_by_user(self, user_id: str) -> list[dict]:
+    async def place_orders(self, orders: list[dict]) -> list[str]:
+        """Insert split orders and their items in one transactional round trip.
+
+        Each order dict carries its line items under ``"items"``. Returns the
+        created order IDs, or an empty list when nothing was written.
+        """
+        if not orders:
+            return []
+        try:
+            if self.engine:
+                rows = await self.execute_query(
+                    "SELECT order_id FROM place_orders(CAST(:orders AS JSONB))",
+                    {"orders": json.dumps(orders)},
+                )
+            elif self.supabase:
+                response = await self._execute(
+                    self.supabase.rpc("place_orders", {"orders": orders})
+                )
+                rows = response.data or []
+            else:
+                return []
+            created = [row["order_id"] for row in rows]
+            for order in orders:
+                if order["id"] in created:
+                    order_feed.publish_local("INSERT", {"status": "Pending", **order})
+            return created
+        except Exception as e:
+            logging.exception(f"Error placing orders: {e}")
+            return []
+
+    async def get_orders_by_user(
+        self, user_id: str, view: str = "detail", include_history: bool = False
+    ) -> list[dict]:
         """Get orders for a specific user."""
         if not self.supabase:
             return []
         try:
-            response = (
-                self.supabase.table("orders")
-                .select("*, order_items(*)")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .execute()
-            )
-            return response.data or []
+            return await self._fetch_orders({"user_id": user_id}, view, include_history)
         except Exception as e:
             logging.exception(f"Error fetching user orders: {e}")
             return []
 
-    async def get_orders_by_shop(self, shop_id: int) -> list[dict]:
+    async def get_orders_by_shop(
+        self, shop_id: int, view: str = "detail", include_history: bool = False
+    ) -> list[dict]:
         """Get orders for a specific shop."""
         if not self.supabase:
             return []
         try:
-            response = (
-                self.supabase.table("orders")
-                .select("*, order_items(*)")
-                .eq("shop_id", shop_id)
-                .order("created_at", desc=True)
-                .execute()
-            )
-            return response.data or []
+            return await self._fetch_orders({"shop_id": shop_id}, view, include_history)
         except Exception as e:
             logging.exception(f"Error fetching shop orders: {e}")
             return []
 
     async def update_order_status(self, order_id: str, status: str) -> bool:
         """Update the status of an order."""
-        if not self.supabase:
+        if not self.supabase and not self.use_sql:
             return False
         try:
-            self.supabase.table("orders").update({"status": status}).eq(
-                "id", order_id
-            ).execute()
+            if self.use_sql:
+                rows = await self._sql(
+                    "UPDATE orders SET status = :status WHERE id = :id "
+                    f"RETURNING {', '.join(ORDER_EVENT_FIELDS)}",
+                    {"status": status, "id": order_id},
+                )
+            else:
+                response = await self._execute(
+                    self.supabase.table("orders")
+                    .update({"status": status})
+                    .eq("id", order_id)
+                )
+                rows = response.data
+            for row in rows or []:
+                order_feed.publish_local("UPDATE", row)
             return True
         except Exception as e:
             logging.exception(f"Error updating order status: {e}")
             return False
 
-    async def get_available_orders(self) -> list[dict]:
+    async def get_available_orders(self, view: str = "detail") -> list[dict]:
         """Get all orders that are ready for pickup."""
         if not self.supabase:
             return []
         try:
-            response = (
-                self.supabase.table("orders")
-                .select("*, order_items(*)")
-                .eq("status", "Ready")
-                .order("created_at", desc=True)
-                .execute()
-            )
-            return response.data or []
+            return await self._fetch_orders({"status": "Ready"}, view)
         except Exception as e:
             logging.exception(f"Error fetching available orders: {e}")
             return []
 
-    async def get_rider_orders(self, rider_id: str) -> list[dict]:
+    async def get_out_for_delivery_orders(self, view: str = "detail") -> list[dict]:
+        """Get every order a rider has picked up and not yet delivered."""
+        if not self.supabase:
+            return []
+        try:
+            return await self._fetch_orders(
+                {"status": "Out for Delivery"}, view, hot_window=False
+            )
+        except Exception as e:
+            return load_failed(f"Error fetching orders out for delivery: {e}", e, [])
+
+    async def get_rider_orders(
+        self, rider_id: str, view: str = "detail", include_history: bool = False
+    ) -> list[dict]:
         """Get orders assigned to a specific rider."""
         if not self.supabase:
             return []
         try:
-            response = (
-                self.supabase.table("orders")
-                .select("*, order_items(*)")
-                .eq("rider_id", rider_id)
-                .order("created_at", desc=True)
-                .execute()
+            return await self._fetch_orders(
+                {"rider_id": rider_id}, view, include_history
             )
-            return response.data or []
         except Exception as e:
             logging.exception(f"Error fetching rider orders: {e}")
             return []
 
-    async def assign_order_to_rider(self, order_id: str, rider_id: str) -> bool:
-        """Assign an order to a rider and update status."""
-        if not self.supabase:
-            return False
+    async def assign_order_to_rider(
+        self, order_id: str, rider_id: str
+    ) -> Optional[dict]:
+        """Claim a Ready, unassigned order for a rider and return it.
+
+        The update only matches while the order is still Ready with no rider,
+        so when several riders accept the same order exactly one wins; the
+        others get None and should be told the order is gone.
+        """
+        if not self.supabase and not self.use_sql:
+            return None
         try:
-            self.supabase.table("orders").update(
-                {"rider_id": rider_id, "status": "Out for Delivery"}
-            ).eq("id", order_id).execute()
-            return True
+            if self.use_sql:
+                rows = await self._sql(
+                    "UPDATE orders SET rider_id = :rider_id, status = 'Out for Delivery' "
+                    "WHERE id = :id AND status = 'Ready' AND rider_id IS NULL "
+                    "RETURNING *",
+                    {"rider_id": rider_id, "id": order_id},
+                )
+            else:
+                response = await self._execute(
+                    self.supabase.table("orders")
+                    .update({"rider_id": rider_id, "status": "Out for Delivery"})
+                    .eq("id", order_id)
+                    .eq("status", "Ready")
+                    .is_("rider_id", "null")
+                )
+                rows = response.data
+            if not rows:
+                return None
+            order_feed.publish_local("UPDATE", rows[0])
+            return rows[0]
         except Exception as e:
             logging.exception(f"Error assigning order: {e}")
-            return False
+            return None
 
     async def get_rider_by_id(self, rider_id: str) -> dict | None:
         """Get rider details by ID."""
         if not self.supabase:
             return None
         try:
-            response = (
-                self.supabase.table("riders").select("*").eq("id", rider_id).execute()
+            response = await self._execute(
+                self.supabase.table("riders").select("*").eq("id", rider_id)
             )
             return response.data[0] if response.data else None
         except Exception as e:
             logging.exception(f"Error fetching rider: {e}")
             return None
 
-    async def update_rider_earnings(self, rider_id: str, amount: float) -> bool:
-        """Update rider earnings and completed orders count."""
-        if not self.supabase:
-            return False
+    async def update_rider_earnings(
+        self, rider_id: str, amount: float
+    ) -> Optional[dict]:
+        """Atomically credit one delivery to a rider and return the new row."""
+        riders = await self.settle_rider_deliveries(
+            [{"rider_id": rider_id, "amount": amount, "deliveries": 1}]
+        )
+        return riders[0] if riders else None
+
+    async def settle_rider_deliveries(self, credits: list[dict]) -> list[dict]:
+        """Credit many deliveries in a single UPDATE statement.
+
+        Each credit is ``{"rider_id": str, "amount": float, "deliveries": int}``;
+        ``deliveries`` defaults to 1. Returns the updated rider rows.
+        """
+        if not credits:
+            return []
         try:
-            rider = await self.get_rider_by_id(rider_id)
-            if not rider:
-                return False
-            current_earnings = rider.get("earnings", 0.0)
-            current_completed = rider.get("completed_orders", 0)
-            updates = {
-                "earnings": current_earnings + amount,
-                "completed_orders": current_completed + 1,
-            }
-            self.supabase.table("riders").update(updates).eq("id", rider_id).execute()
-            return True
+            if self.engine:
+                return await self.execute_query(
+                    "SELECT * FROM settle_rider_deliveries(CAST(:credits AS JSONB))",
+                    {"credits": json.dumps(credits)},
+                )
+            if not self.supabase:
+                return []
+            response = await self._execute(
+                self.supabase.rpc("settle_rider_deliveries", {"credits": credits})
+            )
+            return response.data or []
         except Exception as e:
-            logging.exception(f"Error updating rider stats: {e}")
-            return False
+            logging.exception(f"Error settling rider deliveries: {e}")
+            return []
+
+    async def deliver_orders(self, deliveries: list[dict]) -> list[dict]:
+        """Mark orders Delivered and credit their riders in one statement.
+
+        Each delivery is ``{"order_id": str, "rider_id": str, "amount": float}``.
+        Only orders still Out for Delivery with that rider are delivered and
+        credited, so a repeated call pays nothing. Returns one row per
+        delivered order with the rider's new ``earnings`` and
+        ``completed_orders``.
+        """
+        if not deliveries:
+            return []
+        try:
+            if self.engine:
+                rows = await self.execute_query(
+                    "SELECT * FROM deliver_orders(CAST(:deliveries AS JSONB))",
+                    {"deliveries": json.dumps(deliveries)},
+                )
+            elif self.supabase:
+                response = await self._execute(
+                    self.supabase.rpc("deliver_orders", {"deliveries": deliveries})
+                )
+                rows = response.data or []
+            else:
+                return []
+            for row in rows:
+                order_feed.publish_local("UPDATE", row)
+            return rows
+        except Exception as e:
+            logging.exception(f"Error delivering orders: {e}")
+            return []
 
     async def toggle_rider_status(self, rider_id: str, status: str) -> bool:
         """Update rider online/offline status."""
         if not self.supabase:
             return False
         try:
-            self.supabase.table("riders").update({"status": status}).eq(
-                "id", rider_id
-            ).execute()
+            response = await self._execute(
+                self.supabase.table("riders")
+                .update({"status": status})
+                .eq("id", rider_id)
+            )
+            rider = response.data[0] if response.data else {}
+            dispatcher.update_rider(
+                rider_id, status, rider.get("latitude"), rider.get("longitude")
+            )
             return True
         except Exception as e:
             logging.exception(f"Error updating rider status: {e}")
             return False
 
-    async def get_riders(self) -> list[dict]:
-        """Get all riders from database."""
+    async def update_rider_location(
+        self, rider_id: str, latitude: float, longitude: float
+    ) -> bool:
+        """Store a rider's latest position and move them in the dispatch index."""
+        if not self.supabase and not self.use_sql:
+            return False
+        try:
+            if self.use_sql:
+                rows = await self._sql(
+                    "UPDATE riders SET latitude = :latitude, longitude = :longitude, "
+                    "location_updated_at = NOW() WHERE id = :id RETURNING id",
+                    {"latitude": latitude, "longitude": longitude, "id": rider_id},
+                )
+            else:
+                response = await self._execute(
+                    self.supabase.table("riders")
+                    .update(
+                        {
+                            "latitude": latitude,
+                            "longitude": longitude,
+                            "location_updated_at": datetime.datetime.now(
+                                datetime.timezone.utc
+                            ).isoformat(),
+                        }
+                    )
+                    .eq("id", rider_id)
+                )
+                rows = response.data
+            if not rows:
+                return False
+            dispatcher.update_rider(rider_id, latitude=latitude, longitude=longitude)
+            return True
+        except Exception as e:
+            logging.exception(f"Error updating rider location: {e}")
+            return False
+
+    async def get_riders(self, status: Optional[str] = None) -> list[dict]:
+        """Get all riders from database, optionally only those with ``status``."""
         if not self.supabase:
             return []
         try:
-            response = self.supabase.table("riders").select("*").execute()
+            query = self.supabase.table("riders").select("*")
+            if status:
+                query = query.eq("status", status)
+            response = await self._execute(query)
             return response.data or []
         except Exception as e:
-            logging.exception(f"Error fetching riders: {e}")
-            return []
+            return load_failed(f"Error fetching riders: {e}", e, [])
 
     async def get_coupons(self) -> list[dict]:
         """Get all coupons from database."""
         if not self.supabase:
             return []
         try:
-            response = self.supabase.table("coupons").select("*").execute()
+            response = await self._execute(self.supabase.table("coupons").select("*"))
             return response.data or []
         except Exception as e:
-            logging.exception(f"Error fetching coupons: {e}")
+            return load_failed(f"Error fetching coupons: {e}", e, [])
+
+    async def get_daily_stats(
+        self, day: Optional[str], shop_id: Optional[int] = None
+    ) -> dict[str, float]:
+        """Dashboard counters for ``day`` (YYYY-MM-DD), one shop or all of them.
+        With ``day`` None the counters of every day are summed.
+
+        Reads the trigger-maintained ``shop_daily_stats`` rows, at most one per
+        shop and day, instead of aggregating orders.
+        """
+        totals = {column: 0 for column in DAILY_STAT_COLUMNS}
+        if not self.supabase and not self.use_sql:
+            return totals
+        try:
+            if self.use_sql:
+                sums = ", ".join(
+                    f"COALESCE(SUM({c}), 0) AS {c}" for c in DAILY_STAT_COLUMNS
+                )
+                query = f"SELECT {sums} FROM shop_daily_stats WHERE TRUE"
+                params = {"day": day}
+                if day is not None:
+                    query += " AND day = CAST(:day AS DATE)"
+                if shop_id is not None:
+                    query += " AND shop_id = :shop_id"
+                    params["shop_id"] = shop_id
+                rows = await self._sql(query, params)
+            else:
+                query = self.supabase.table("shop_daily_stats").select(
+                    ", ".join(DAILY_STAT_COLUMNS)
+                )
+                if day is not None:
+                    query = query.eq("day", day)
+                if shop_id is not None:
+                    query = query.eq("shop_id", shop_id)
+                rows = (await self._execute(query)).data or []
+            for row in rows:
+                for column in DAILY_STAT_COLUMNS:
+                    totals[column] += row.get(column) or 0
+            return totals
+        except Exception as e:
+            return load_failed(f"Error fetching daily stats: {e}", e, totals)
+
+    async def get_payout_days(
+        self, shop_id: int, limit: int = PAYOUT_DAYS
+    ) -> list[dict]:
+        """A shop's days with deliveries, newest first, from shop_daily_stats.
+
+        Rows carry ``day``, ``delivered_count`` and ``delivered_revenue`` (the
+        delivered orders' subtotals), which payouts are computed from.
+        """
+        if not self.supabase and not self.use_sql:
             return []
+        try:
+            if self.use_sql:
+                return await self._sql(
+                    "SELECT day::TEXT AS day, delivered_count, delivered_revenue "
+                    "FROM shop_daily_stats "
+                    "WHERE shop_id = :shop_id AND delivered_count > 0 "
+                    "ORDER BY day DESC LIMIT :limit",
+                    {"shop_id": shop_id, "limit": limit},
+                )
+            response = await self._execute(
+                self.supabase.table("shop_daily_stats")
+                .select("day, delivered_count, delivered_revenue")
+                .eq("shop_id", shop_id)
+                .gt("delivered_count", 0)
+                .order("day", desc=True)
+                .limit(limit)
+            )
+            return response.data or []
+        except Exception as e:
+            return load_failed(f"Error fetching payout days: {e}", e, [])
 
-    async def get_all_orders(self) -> list[dict]:
-        """Get all orders for admin view."""
-        if not self.supabase:
+    async def refresh_revenue_rollups(self) -> Optional[dict]:
+        """Run one step of the incremental rollup job.
+
+        Returns ``{"rolled_up_to", "caught_up"}`` with the new watermark and
+        whether it reached the database's clock, or None when there was
+        nothing to do or another worker is already running the job.
+        """
+        try:
+            if self.engine:
+                rows = await self._sql(
+                    "SELECT rolled_up_to, caught_up FROM refresh_revenue_rollups()"
+                )
+                step = rows[0] if rows else None
+            elif self.supabase:
+                response = await self._execute(
+                    self.supabase.rpc("refresh_revenue_rollups", {})
+                )
+                step = response.data
+                if isinstance(step, list):
+                    step = step[0] if step else None
+            else:
+                return None
+            if not step or not step.get("rolled_up_to"):
+                return None
+            return {
+                "rolled_up_to": str(step["rolled_up_to"]),
+                "caught_up": bool(step["caught_up"]),
+            }
+        except Exception as e:
+            logging.exception(f"Error refreshing revenue rollups: {e}")
+            return None
+
+    async def archive_orders(
+        self,
+        older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS,
+        batch_size: int = ORDER_ARCHIVE_BATCH,
+    ) -> int:
+        """Move one batch of old delivered orders into orders_archive.
+
+        Also creates the orders partitions for the coming months. Returns the
+        number of orders moved, 0 when another worker holds the job lock.
+        """
+        try:
+            params = {"older_than": f"{older_than_days} days", "batch_size": batch_size}
+            if self.engine:
+                rows = await self._sql(
+                    "SELECT archive_orders(CAST(:older_than AS INTERVAL), :batch_size) AS moved",
+                    params,
+                )
+                return int(rows[0]["moved"]) if rows else 0
+            if self.supabase:
+                response = await self._execute(
+                    self.supabase.rpc("archive_orders", params)
+                )
+                return int(response.data or 0)
+            return 0
+        except Exception as e:
+            logging.exception(f"Error archiving orders: {e}")
+            return 0
+
+    async def get_revenue_rollups(
+        self,
+        start: str,
+        end: str,
+        granularity: str = "day",
+        shop_id: Optional[int] = None,
+    ) -> list[dict]:
+        """Rollup buckets in ``[start, end)``, oldest first.
+
+        ``granularity`` is ``"hour"`` or ``"day"``; without ``shop_id`` the
+        platform-wide rows are returned.
+        """
+        if not self.supabase and not self.use_sql:
             return []
+        scope = PLATFORM_ROLLUP_SHOP_ID if shop_id is None else shop_id
         try:
-            response = (
-                self.supabase.table("orders")
-                .select("*, order_items(*)")
-                .order("created_at", desc=True)
-                .execute()
+            if self.use_sql:
+                return await self._sql(
+                    f"SELECT {ROLLUP_COLUMNS} FROM revenue_rollups "
+                    "WHERE granularity = :granularity AND shop_id = :shop_id "
+                    "AND bucket >= CAST(:start AS TIMESTAMP) "
+                    "AND bucket < CAST(:end AS TIMESTAMP) ORDER BY bucket",
+                    {
+                        "granularity": granularity,
+                        "shop_id": scope,
+                        "start": start,
+                        "end": end,
+                    },
+                )
+            response = await self._execute(
+                self.supabase.table("revenue_rollups")
+                .select(ROLLUP_COLUMNS)
+                .eq("granularity", granularity)
+                .eq("shop_id", scope)
+                .gte("bucket", start)
+                .lt("bucket", end)
+                .order("bucket")
             )
             return response.data or []
+        except Exception as e:
+            return load_failed(f"Error fetching revenue rollups: {e}", e, [])
+
+    async def get_all_orders(
+        self, view: str = "detail", include_history: bool = False
+    ) -> list[dict]:
+        """Get all orders for admin view."""
+        if not self.supabase:
+            return []
+        try:
+            return await self._fetch_orders({}, view, include_history, hot_window=False)
         except Exception as e:
             logging.exception(f"Error fetching all orders: {e}")
             return []
 
-    async def delete_all_orders(self) -> bool:
-        """Delete all orders and order items."""
+    async def get_order(self, order_id: str, view: str = "detail") -> Optional[dict]:
+        """Get one live order by ID, or None if it is gone or archived."""
         if not self.supabase:
+            return None
+        try:
+            rows = await self._fetch_orders(
+                {"id": order_id}, view, limit=1, hot_window=False
+            )
+            return rows[0] if rows else None
+        except Exception as e:
+            logging.exception(f"Error fetching order {order_id}: {e}")
+            return None
+
+    async def _fetch_orders(
+        self,
+        filters: dict,
+        view: str,
+        include_history: bool = False,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        hot_window: bool = True,
+    ) -> list[dict]:
+        """Orders matching ``filters``, newest first by (created_at, id).
+
+        With ``hot_window`` only orders created since ``hot_orders_cutoff()``
+        are read, which prunes the scan to the newest partitions.
+        ``include_history`` lifts the cutoff and merges in orders_archive.
+        """
+        tables = ["orders"]
+        since = hot_orders_cutoff() if hot_window else None
+        if include_history:
+            tables.append("orders_archive")
+            since = None
+        queries = []
+        for table in tables:
+            select = (
+                projection("orders", view)
+                if table == "orders"
+                else archive_projection(view)
+            )
+            query = self.supabase.table(table).select(select)
+            for column, value in filters.items():
+                if isinstance(value, (list, tuple)):
+                    query = query.in_(column, list(value))
+                else:
+                    query = query.eq(column, value)
+            if since:
+                query = query.gte("created_at", since)
+            if cursor:
+                created_at, order_id = decode_order_cursor(cursor)
+                query = query.or_(
+                    f'created_at.lt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.lt."{order_id}")'
+                )
+            query = query.order("created_at", desc=True).order("id", desc=True)
+            if limit is not None:
+                query = query.limit(limit)
+            queries.append(self._execute(query))
+        responses = await asyncio.gather(*queries)
+        rows = [row for response in responses for row in response.data or []]
+        if len(responses) > 1:
+            rows.sort(key=lambda o: (o.get("created_at") or "", o["id"]), reverse=True)
+            rows = rows if limit is None else rows[:limit]
+        return rows
+
+    async def _get_orders_page(
+        self,
+        filters: dict,
+        cursor: Optional[str],
+        limit: int,
+        view: str,
+        include_history: bool = False,
+        hot_window: bool = True,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Fetch one page of orders newest first using (created_at, id) keysets.
+
+        One extra row is requested to tell whether another page exists; the
+        returned cursor is None on the last page.
+        """
+        if not self.supabase:
+            return [], None
+        try:
+            rows = await self._fetch_orders(
+                filters, view, include_history, cursor, limit + 1, hot_window
+            )
+            next_cursor = (
+                encode_order_cursor(rows[limit - 1]) if len(rows) > limit else None
+            )
+            return rows[:limit], next_cursor
+        except Exception as e:
+            return load_failed(
+                f"Error fetching orders page {filters}: {e}", e, ([], None)
+            )
+
+    async def get_all_orders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Get one page of all live orders for the admin view.
+
+        Admins see every partition; archived orders need ``include_history``.
+        """
+        return await self._get_orders_page(
+            {}, cursor, limit, view, include_history, hot_window=False
+        )
+
+    async def get_orders_by_shop_page(
+        self,
+        shop_id: int,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+        statuses: Optional[tuple[str, ...]] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Get one page of orders for a specific shop, optionally only those
+        in ``statuses``."""
+        filters: dict[str, Any] = {"shop_id": shop_id}
+        if statuses:
+            filters["status"] = list(statuses)
+        return await self._get_orders_page(
+            filters, cursor, limit, view, include_history
+        )
+
+    async def get_open_orders_by_shop(
+        self, shop_id: int, view: str = "detail"
+    ) -> list[dict]:
+        """Every open order of a shop, however old, for its action queue."""
+        if not self.supabase:
+            return []
+        try:
+            return await self._fetch_orders(
+                {"shop_id": shop_id, "status": list(OPEN_ORDER_STATUSES)},
+                view,
+                hot_window=False,
+            )
+        except Exception as e:
+            return load_failed(f"Error fetching open shop orders: {e}", e, [])
+
+    async def get_orders_by_user_page(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Get one page of orders for a specific user."""
+        return await self._get_orders_page(
+            {"user_id": user_id}, cursor, limit, view, include_history
+        )
+
+    async def get_rider_orders_page(
+        self,
+        rider_id: str,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Get one page of orders assigned to a specific rider."""
+        return await self._get_orders_page(
+            {"rider_id": rider_id}, cursor, limit, view, include_history
+        )
+
+    async def delete_all_orders(self) -> bool:
+        """Delete all orders and order items, along with their stats.
+
+        Runs the ``purge_orders()`` TRUNCATE, which takes the same time
+        whatever the table size and returns no rows.
+        """
+        if not self.supabase and not self.engine:
             return False
         try:
-            self.supabase.table("order_items").delete().neq("id", -1).execute()
-            self.supabase.table("orders").delete().neq("id", "xxxxx").execute()
+            if self.engine:
+                await self._sql("SELECT purge_orders()")
+            else:
+                await self._execute(self.supabase.rpc("purge_orders", {}))
+            order_feed.publish_local("TRUNCATE")
             return True
         except Exception as e:
             logging.exception(f"Error deleting all orders: {e}")
@@ -371,7 +1306,12 @@ class DatabaseManager:
         if not self.supabase:
             return None
         try:
-            response = self.supabase.table("shops").insert(shop_data).execute()
+            response = await self._execute(
+                self.supabase.table("shops").insert(shop_data)
+            )
+            self._invalidate_catalog("shops", "all")
+            if shop_data.get("category_slug"):
+                self._invalidate_catalog("shops", shop_data["category_slug"])
             return response.data[0] if response.data else None
         except Exception as e:
             logging.exception(f"Error creating shop: {e}")
@@ -382,7 +1322,10 @@ class DatabaseManager:
         if not self.supabase:
             return False
         try:
-            self.supabase.table("shops").update(updates).eq("id", shop_id).execute()
+            await self._execute(
+                self.supabase.table("shops").update(updates).eq("id", shop_id)
+            )
+            self._invalidate_catalog("shops")
             return True
         except Exception as e:
             logging.exception(f"Error updating shop: {e}")
@@ -393,7 +1336,10 @@ class DatabaseManager:
         if not self.supabase:
             return False
         try:
-            self.supabase.table("shops").delete().eq("id", shop_id).execute()
+            await self._execute(self.supabase.table("shops").delete().eq("id", shop_id))
+            self._invalidate_catalog("shops")
+            self._invalidate_catalog("products", None)
+            self._invalidate_catalog("products", shop_id)
             return True
         except Exception as e:
             logging.exception(f"Error deleting shop: {e}")
@@ -404,7 +1350,9 @@ class DatabaseManager:
         if not self.supabase:
             return None
         try:
-            response = self.supabase.table("riders").insert(rider_data).execute()
+            response = await self._execute(
+                self.supabase.table("riders").insert(rider_data)
+            )
             return response.data[0] if response.data else None
         except Exception as e:
             logging.exception(f"Error creating rider: {e}")
@@ -415,7 +1363,11 @@ class DatabaseManager:
         if not self.supabase:
             return None
         try:
-            response = self.supabase.table("products").insert(product_data).execute()
+            response = await self._execute(
+                self.supabase.table("products").insert(product_data)
+            )
+            self._invalidate_catalog("products", None)
+            self._invalidate_catalog("products", product_data.get("shop_id"))
             return response.data[0] if response.data else None
         except Exception as e:
             logging.exception(f"Error creating product: {e}")
@@ -426,9 +1378,10 @@ class DatabaseManager:
         if not self.supabase:
             return False
         try:
-            self.supabase.table("products").update(updates).eq(
-                "id", product_id
-            ).execute()
+            await self._execute(
+                self.supabase.table("products").update(updates).eq("id", product_id)
+            )
+            self._invalidate_catalog("products")
             return True
         except Exception as e:
             logging.exception(f"Error updating product: {e}")
@@ -439,10 +1392,141 @@ class DatabaseManager:
         if not self.supabase:
             return False
         try:
-            self.supabase.table("products").update({"is_available": new_status}).eq(
-                "id", product_id
-            ).execute()
+            await self._execute(
+                self.supabase.table("products")
+                .update({"is_available": new_status})
+                .eq("id", product_id)
+            )
+            self._invalidate_catalog("products")
             return True
         except Exception as e:
             logging.exception(f"Error toggling product stock: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+_db: Optional["Repository"] = None
+_db_pid: Optional[int] = None
+_db_lock = threading.Lock()
+
+
+def _create_repository() -> "Repository":
+    manager = DatabaseManager()
+    if manager.use_sql and not manager.supabase:
+        manager.close()
+        raise RuntimeError(
+            "DB_BACKEND=sql only serves the hot paths from Postgres; set "
+            "SUPABASE_URL and SUPABASE_KEY for the rest, or use "
+            "DB_BACKEND=supabase or DB_BACKEND=memory."
+        )
+    if DB_BACKEND != "memory" and manager.supabase:
+        return manager
+    manager.close()
+    from app.utils.repository import MemoryRepository
+
+    logging.info("Using the in-memory repository")
+    return MemoryRepository()
+
+
+def get_db() -> "Repository":
+    """Return the repository shared by every state in this worker process.
+
+    The repository is rebuilt after a fork so child workers never reuse pooled
+    connections opened by their parent.
+    """
+    global _db, _db_pid
+    pid = os.getpid()
+    if _db is None or _db_pid != pid:
+        with _db_lock:
+            if _db is None or _db_pid != pid:
+                if _db is not None:
+                    _db.close(close_connections=False)
+                _db = _create_repository()
+                _db_pid = pid
+    return _db
+
+
+def close_db():
+    """Dispose of the process-wide DatabaseManager, if one was created."""
+    global _db, _db_pid
+    with _db_lock:
+        if _db is not None and _db_pid == os.getpid():
+            _db.close()
+        _db = None
+        _db_pid = None
+
+
+@contextlib.asynccontextmanager
+async def db_lifespan():
+    """Reflex lifespan task that owns the worker's DatabaseManager."""
+    get_db()
+    # Build the order ID generator now so a misconfigured one fails at startup.
+    get_order_id_generator()
+    try:
+        yield
+    finally:
+        close_db()
+
+
+async def _run_rollups():
+    """Refresh revenue rollups every ROLLUP_INTERVAL seconds.
+
+    Each worker runs the loop; the database function skips the step when
+    another worker holds its lock. While the job is catching up on history
+    it runs back to back instead of waiting for the next tick.
+    """
+    while True:
+        try:
+            step = await get_db().refresh_revenue_rollups()
+        except Exception as e:
+            logging.exception(f"Revenue rollup step failed: {e}")
+            step = None
+        behind = step is not None and not step["caught_up"]
+        await asyncio.sleep(0 if behind else ROLLUP_INTERVAL)
+
+
+@contextlib.asynccontextmanager
+async def rollup_lifespan():
+    """Reflex lifespan task that runs the revenue rollup job in the background."""
+    if ROLLUP_INTERVAL <= 0:
+        yield
+        return
+    task = asyncio.create_task(_run_rollups())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def _run_archive():
+    """Archive old delivered orders every ORDER_ARCHIVE_INTERVAL seconds.
+
+    Full batches mean a backlog, so the next batch runs straight away.
+    """
+    while True:
+        try:
+            moved = await get_db().archive_orders()
+        except Exception as e:
+            logging.exception(f"Order archive step failed: {e}")
+            moved = 0
+        if moved:
+            logging.info(f"Archived {moved} orders")
+        await asyncio.sleep(
+            0 if moved >= ORDER_ARCHIVE_BATCH else ORDER_ARCHIVE_INTERVAL
+        )
+
+
+@contextlib.asynccontextmanager
+async def archive_lifespan():
+    """Reflex lifespan task that runs the order archive job in the background."""
+    if ORDER_ARCHIVE_INTERVAL <= 0:
+        yield
+        return
+    task = asyncio.create_task(_run_archive())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
\ No newline at end of file
@@ -0,0 +1,363 @@
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from app.utils.order_feed import RESYNC_OPS, order_feed
+
+DISPATCH_ENABLED = os.environ.get("DISPATCH_ENABLED", "true").lower() == "true"
+# Each Ready order is offered to this many of the nearest idle riders at once.
+DISPATCH_OFFER_SIZE = int(os.environ.get("DISPATCH_OFFER_SIZE", "3"))
+DISPATCH_RADIUS_KM = float(os.environ.get("DISPATCH_RADIUS_KM", "8"))
+DISPATCH_CELL_KM = float(os.environ.get("DISPATCH_CELL_KM", "0.5"))
+# An offer nobody accepts within this many seconds moves on to the next riders.
+DISPATCH_OFFER_TIMEOUT = float(os.environ.get("DISPATCH_OFFER_TIMEOUT", "30"))
+# The rider index lives in each worker. Reloading it from the riders table
+# picks up status changes and pings that reached other workers.
+DISPATCH_RESYNC_INTERVAL = float(os.environ.get("DISPATCH_RESYNC_INTERVAL", "60"))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class RiderGrid:
+    """Point index on a fixed grid of lat/lon cells, like geohash buckets.
+
+    Moving a point is two dict operations. ``nearest`` scans rings of cells
+    outward from the query point and stops once the next ring cannot hold
+    anything closer than the k-th match, so its cost depends on local
+    density, not on how many riders the city has.
+    """
+
+    def __init__(self, cell_km: float = DISPATCH_CELL_KM):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self._cells: dict[tuple[int, int], dict[str, tuple[float, float]]] = {}
+        self._where: dict[str, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._where
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def move(self, key: str, lat: float, lon: float):
+        cell = self._cell(lat, lon)
+        old = self._where.get(key)
+        if old is not None and old != cell:
+            self._drop(key, old)
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._where[key] = cell
+
+    def remove(self, key: str):
+        cell = self._where.pop(key, None)
+        if cell is not None:
+            self._drop(key, cell)
+
+    def _drop(self, key: str, cell: tuple[int, int]):
+        bucket = self._cells[cell]
+        bucket.pop(key, None)
+        if not bucket:
+            del self._cells[cell]
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterable[tuple[int, int]]:
+        if r == 0:
+            yield (ci, cj)
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield (ci - r, j)
+            yield (ci + r, j)
+        for i in range(ci - r + 1, ci + r):
+            yield (i, cj - r)
+            yield (i, cj + r)
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        radius_km: float,
+        exclude: Iterable[str] = (),
+    ) -> list[tuple[float, str]]:
+        """Up to ``k`` (distance km, key) pairs within ``radius_km``, nearest first."""
+        exclude = set(exclude)
+        ci, cj = self._cell(lat, lon)
+        # Cells in ring r are at least r - 1 whole cells away along one axis.
+        # Longitude cells narrow with latitude, so step by the narrower side.
+        step_km = self.cell_deg * KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        found: list[tuple[float, str]] = []
+        r = 0
+        while True:
+            gap_km = max(r - 1, 0) * step_km
+            if gap_km > radius_km or (len(found) >= k and gap_km >= found[-1][0]):
+                return found
+            for cell in self._ring(ci, cj, r):
+                for key, (plat, plon) in self._cells.get(cell, {}).items():
+                    if key in exclude:
+                        continue
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if distance <= radius_km:
+                        found.append((distance, key))
+            found = sorted(found)[:k]
+            r += 1
+
+
+@dataclass
+class Offer:
+    order_id: str
+    shop_id: int
+    riders: list[str]
+    expires_at: float
+    tried: set[str] = field(default_factory=set)
+
+
+class DispatchEngine:
+    """Offers each Ready order to the nearest idle online riders.
+
+    Riders are in the grid while they are Online, have a known position and
+    are idle (nothing Out for Delivery as far as this worker has seen). Order
+    feed events drive the offers: an order that turns Ready goes to the
+    ``offer_size`` nearest idle riders around its shop, and moves on to the
+    next ones if nobody takes it within ``offer_timeout``. An order without
+    an offer (unknown shop location, nobody in range) stays visible to every
+    rider, which is how all orders behaved before dispatch.
+    """
+
+    def __init__(
+        self,
+        offer_size: int = DISPATCH_OFFER_SIZE,
+        radius_km: float = DISPATCH_RADIUS_KM,
+        cell_km: float = DISPATCH_CELL_KM,
+        offer_timeout: float = DISPATCH_OFFER_TIMEOUT,
+    ):
+        self.offer_size = offer_size
+        self.radius_km = radius_km
+        self.cell_km = cell_km
+        self.offer_timeout = offer_timeout
+        self.grid = RiderGrid(cell_km)
+        self.riders: dict[str, dict] = {}
+        self.busy: set[str] = set()
+        self.shops: dict[int, tuple[float, float]] = {}
+        self.offers: dict[str, Offer] = {}
+        self._offered_to: dict[str, set[str]] = {}
+        self.stale = True
+
+    def update_rider(
+        self,
+        rider_id: str,
+        status: Optional[str] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ):
+        """Record a status change or location ping and re-index the rider."""
+        rider = self.riders.setdefault(
+            rider_id, {"status": "Offline", "latitude": None, "longitude": None}
+        )
+        if status is not None:
+            rider["status"] = status
+        if latitude is not None and longitude is not None:
+            rider["latitude"], rider["longitude"] = float(latitude), float(longitude)
+        self._reindex(rider_id)
+
+    def _reindex(self, rider_id: str):
+        rider = self.riders.get(rider_id)
+        if (
+            rider
+            and rider["status"] == "Online"
+            and rider["latitude"] is not None
+            and rider_id not in self.busy
+        ):
+            self.grid.move(rider_id, rider["latitude"], rider["longitude"])
+        else:
+            self.grid.remove(rider_id)
+
+    def set_shop(
+        self, shop_id: int, latitude: Optional[float], longitude: Optional[float]
+    ):
+        if latitude is None or longitude is None:
+            self.shops.pop(shop_id, None)
+        else:
+            self.shops[shop_id] = (float(latitude), float(longitude))
+
+    def offer(
+        self, order_id: str, shop_id: Optional[int], now: Optional[float] = None
+    ) -> list[str]:
+        """Offer an order to the nearest idle riders it has not been offered
+        to yet, replacing any current offer. Returns the riders offered."""
+        previous = self.offers.get(order_id)
+        tried = previous.tried if previous else set()
+        self._withdraw(order_id)
+        location = self.shops.get(shop_id) if shop_id is not None else None
+        if location is None:
+            return []
+        nearest = self.grid.nearest(
+            *location, self.offer_size, self.radius_km, exclude=tried
+        )
+        riders = [rider_id for _, rider_id in nearest]
+        if not riders:
+            return []
+        now = time.monotonic() if now is None else now
+        self.offers[order_id] = Offer(
+            order_id, shop_id, riders, now + self.offer_timeout, tried | set(riders)
+        )
+        for rider_id in riders:
+            self._offered_to.setdefault(rider_id, set()).add(order_id)
+        return riders
+
+    def _withdraw(self, order_id: str):
+        offer = self.offers.pop(order_id, None)
+        if not offer:
+            return
+        for rider_id in offer.riders:
+            orders = self._offered_to.get(rider_id)
+            if orders is not None:
+                orders.discard(order_id)
+                if not orders:
+                    del self._offered_to[rider_id]
+
+    def visible_to(self, order: dict, rider_id: str) -> bool:
+        """Whether a Ready order belongs on this rider's available list."""
+        offer = self.offers.get(order["id"])
+        return offer is None or rider_id in offer.riders
+
+    def offers_for(self, rider_id: str) -> set[str]:
+        return set(self._offered_to.get(rider_id, ()))
+
+    def expire(self, now: Optional[float] = None) -> list[Offer]:
+        """Move offers past their deadline on to the next riders.
+
+        Returns the expired offers; an order that ran out of riders in range
+        is left without an offer, so every rider sees it.
+        """
+        now = time.monotonic() if now is None else now
+        expired = [o for o in self.offers.values() if o.expires_at <= now]
+        for offer in expired:
+            self.offer(offer.order_id, offer.shop_id, now)
+        return expired
+
+    def on_order_event(self, event: dict):
+        """Order feed listener: keep offers and rider availability in step."""
+        op = event.get("op")
+        if op in RESYNC_OPS:
+            self.stale = True
+            return
+        order_id = event.get("id")
+        if not order_id or op == "OFFER":
+            return
+        status, rider_id = event.get("status"), event.get("rider_id")
+        if op != "DELETE" and status == "Ready" and not rider_id:
+            if order_id not in self.offers:
+                self.offer(order_id, event.get("shop_id"))
+            return
+        self._withdraw(order_id)
+        if not rider_id:
+            return
+        if op != "DELETE" and status == "Out for Delivery":
+            self.busy.add(rider_id)
+        else:
+            self.busy.discard(rider_id)
+        self._reindex(rider_id)
+
+    async def sync(self, db) -> list[Offer]:
+        """Reload shop locations, online riders, busy riders and Ready orders.
+
+        Offers still open are kept; Ready orders without one get one, and
+        those new offers are returned.
+        """
+        shops, riders, ready, delivering = await asyncio.gather(
+            db.get_shops(),
+            db.get_riders(status="Online"),
+            db.get_available_orders(view="row"),
+            db.get_out_for_delivery_orders(view="row"),
+        )
+        for shop in shops:
+            self.set_shop(shop["id"], shop.get("latitude"), shop.get("longitude"))
+        # Deliveries finished or picked up through other workers only show up
+        # here, so busy is rebuilt rather than patched.
+        self.busy = {o["rider_id"] for o in delivering if o.get("rider_id")}
+        online = {rider["id"] for rider in riders}
+        for rider_id, rider in self.riders.items():
+            if rider_id not in online:
+                rider["status"] = "Offline"
+                self.grid.remove(rider_id)
+        for rider in riders:
+            self.update_rider(
+                rider["id"], "Online", rider.get("latitude"), rider.get("longitude")
+            )
+        ready_ids = {order["id"] for order in ready}
+        for order_id in [o for o in self.offers if o not in ready_ids]:
+            self._withdraw(order_id)
+        made = []
+        for order in ready:
+            if order["id"] not in self.offers and self.offer(
+                order["id"], order.get("shop_id")
+            ):
+                made.append(self.offers[order["id"]])
+        self.stale = False
+        return made
+
+    async def run(self):
+        """Resync periodically and move expired offers along once a second.
+
+        Orders offered by a resync or re-offered after a timeout are published as ``OFFER`` events so open rider
+        screens pick up or drop them.
+        """
+        from app.utils.database import get_db
+
+        synced_at = 0.0
+        while True:
+            changed = []
+            if self.stale or time.monotonic() - synced_at >= DISPATCH_RESYNC_INTERVAL:
+                try:
+                    changed = await self.sync(get_db())
+                    synced_at = time.monotonic()
+                except Exception as e:
+                    logging.exception(f"Dispatch resync failed: {e}")
+            for offer in changed + self.expire():
+                order_feed.publish(
+                    {
+                        "op": "OFFER",
+                        "id": offer.order_id,
+                        "status": "Ready",
+                        "shop_id": offer.shop_id,
+                        "rider_id": None,
+                    }
+                )
+            await asyncio.sleep(1)
+
+
+dispatcher = DispatchEngine()
+
+
+@contextlib.asynccontextmanager
+async def dispatch_lifespan():
+    """Reflex lifespan task that keeps the dispatch engine fed and moving."""
+    if not DISPATCH_ENABLED:
+        yield
+        return
+    order_feed.add_listener(dispatcher.on_order_event)
+    task = asyncio.create_task(dispatcher.run())
+    try:
+        yield
+    finally:
+        order_feed.remove_listener(dispatcher.on_order_event)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
\ No newline at end of file
@@ -0,0 +1,177 @@
+import os
+import secrets
+import threading
+import time
+from typing import Protocol
+
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class IdGenerator(Protocol):
+    def new_id(self) -> str: ...
+
+
+class UlidGenerator:
+    """Monotonic ULIDs: 48-bit millisecond timestamp plus 80 random bits.
+
+    IDs are 26-character Crockford base32 strings that sort lexicographically
+    in creation order. Within the same millisecond the random part is
+    incremented, so IDs from one process stay strictly increasing; the random
+    component keeps IDs from different workers from colliding.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    @staticmethod
+    def _encode(value: int, length: int) -> str:
+        chars = []
+        for _ in range(length):
+            chars.append(CROCKFORD_BASE32[value & 31])
+            value >>= 5
+        return "".join(reversed(chars))
+
+    def new_id(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms <= self._last_ms:
+                now_ms = self._last_ms
+                self._last_random = (self._last_random + 1) & ((1 << 80) - 1)
+                if self._last_random == 0:
+                    now_ms += 1
+            else:
+                self._last_random = secrets.randbits(80)
+            self._last_ms = now_ms
+            return self._encode(now_ms, 10) + self._encode(self._last_random, 16)
+
+
+class SnowflakeGenerator:
+    """Snowflake IDs: 41-bit ms timestamp, 10-bit worker ID, 12-bit sequence.
+
+    Two processes with the same worker ID issue the same IDs in the same
+    millisecond, so the ID is never guessed. It is ``SNOWFLAKE_WORKER_ID``
+    when set, which must then differ for every process. Otherwise a free
+    slot is leased from Postgres at ``REFLEX_DB_URL`` with an advisory lock
+    held on a dedicated connection for the life of the process. Without
+    either the generator refuses to start. IDs are zero-padded to 19 digits
+    so that text comparison on ``orders.id`` matches numeric order.
+    """
+
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    WORKER_IDS = 1024
+    # Advisory lock class for worker slots ("SNOW"); the slot is the object ID.
+    LOCK_CLASS = 0x534E4F57
+
+    def __init__(self, worker_id: int | None = None, db_url: str | None = None):
+        if worker_id is None and os.environ.get("SNOWFLAKE_WORKER_ID"):
+            worker_id = int(os.environ["SNOWFLAKE_WORKER_ID"])
+        if worker_id is not None and not 0 <= worker_id < self.WORKER_IDS:
+            raise ValueError(
+                f"Snowflake worker ID must be in [0, {self.WORKER_IDS}), got {worker_id}"
+            )
+        self._db_url = db_url or os.environ.get("REFLEX_DB_URL")
+        if worker_id is None and not self._db_url:
+            raise RuntimeError(
+                "ORDER_ID_GENERATOR=snowflake needs SNOWFLAKE_WORKER_ID (unique per "
+                "process) or REFLEX_DB_URL to lease a worker ID from"
+            )
+        self._configured_worker_id = worker_id
+        self._lease = None
+        # Leases inherited across fork stay referenced: closing them in the
+        # child would end the parent's session and release its slot.
+        self._inherited_leases: list = []
+        self._reset()
+        if worker_id is None:
+            self._lease_worker_id()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        self.worker_id = self._configured_worker_id
+
+    def _after_fork(self):
+        if self._lease is not None:
+            self._inherited_leases.append(self._lease)
+            self._lease = None
+        self._reset()
+
+    def _lease_worker_id(self):
+        """Take the first free worker slot and hold it until the process exits."""
+        import psycopg
+        from sqlalchemy.engine import make_url
+
+        conninfo = (
+            make_url(self._db_url)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+        conn = psycopg.connect(conninfo, autocommit=True)
+        row = conn.execute(
+            "SELECT slot FROM generate_series(0, %s) AS slot "
+            "WHERE pg_try_advisory_lock(%s, slot) LIMIT 1",
+            (self.WORKER_IDS - 1, self.LOCK_CLASS),
+        ).fetchone()
+        if row is None:
+            conn.close()
+            raise RuntimeError(f"All {self.WORKER_IDS} Snowflake worker IDs are leased")
+        self._lease = conn
+        self.worker_id = row[0]
+
+    def new_id(self) -> str:
+        with self._lock:
+            if self.worker_id is None:
+                self._lease_worker_id()
+            now_ms = time.time_ns() // 1_000_000 - self.EPOCH_MS
+            if now_ms < self._last_ms:
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & 0xFFF
+                if self._sequence == 0:
+                    while now_ms <= self._last_ms:
+                        now_ms = time.time_ns() // 1_000_000 - self.EPOCH_MS
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            value = (now_ms << 22) | (self.worker_id << 12) | self._sequence
+            return f"{value:019d}"
+
+
+GENERATORS: dict[str, type] = {
+    "ulid": UlidGenerator,
+    "snowflake": SnowflakeGenerator,
+}
+_order_id_generator: IdGenerator | None = None
+
+
+def get_order_id_generator() -> IdGenerator:
+    """Return the generator selected by ORDER_ID_GENERATOR (default: ulid)."""
+    global _order_id_generator
+    if _order_id_generator is None:
+        name = os.environ.get("ORDER_ID_GENERATOR", "ulid").lower()
+        if name not in GENERATORS:
+            raise ValueError(
+                f"Unknown ORDER_ID_GENERATOR {name!r}; "
+                f"expected one of: {', '.join(sorted(GENERATORS))}"
+            )
+        _order_id_generator = GENERATORS[name]()
+    return _order_id_generator
+
+
+def set_order_id_generator(generator: IdGenerator):
+    """Install a custom generator, e.g. one backed by a database sequence."""
+    global _order_id_generator
+    _order_id_generator = generator
+
+
+def new_order_id() -> str:
+    return f"ORD-{get_order_id_generator().new_id()}"
\ No newline at end of file
@@ -1,10 +1,87 @@
+import argparse
 import asyncio
+import csv
+import datetime
+import io
 import logging
+import math
 import os
+import random
 import sys
+import time
+from typing import Optional
+from sqlalchemy import create_engine, text
+from app.utils.auth import hash_password
+from app.utils.database import ORDER_ARCHIVE_AFTER_DAYS, ORDER_ARCHIVE_BATCH
 from app.utils.supabase_client import get_supabase
 from app.utils.db_seed import seed_admin_user
+from app.utils.dispatch import KM_PER_DEGREE
 from app.utils.migrate_db import run_migration
+from app.utils.order_feed import ORDER_FEED_CHANNEL
+from app.utils.reset_database import clear_all_tables
+
+# Synthetic dataset sizes. "production" mirrors the scale we need to reproduce
+# locally; "small" is quick enough to load on a laptop in seconds.
+SCALE_PRESETS = {
+    "small": {
+        "shops": 50,
+        "products": 5_000,
+        "orders": 20_000,
+        "riders": 200,
+        "customers": 2_000,
+    },
+    "medium": {
+        "shops": 500,
+        "products": 200_000,
+        "orders": 1_000_000,
+        "riders": 5_000,
+        "customers": 50_000,
+    },
+    "production": {
+        "shops": 5_000,
+        "products": 2_000_000,
+        "orders": 10_000_000,
+        "riders": 50_000,
+        "customers": 500_000,
+    },
+}
+DEFAULT_CATEGORY_SLUGS = [
+    "grocery",
+    "snacks",
+    "dairy",
+    "medical",
+    "stationery",
+    "bakery",
+]
+ORDER_STATUSES = [
+    ("Delivered", 0.85),
+    ("Cancelled", 0.04),
+    ("Out for Delivery", 0.03),
+    ("Ready", 0.03),
+    ("Confirmed", 0.03),
+    ("Pending", 0.02),
+]
+PRODUCT_WORDS = ["Fresh", "Organic", "Classic", "Premium", "Daily", "Family", "Mini"]
+PRODUCT_NOUNS = [
+    "Milk",
+    "Bread",
+    "Eggs",
+    "Noodles",
+    "Chips",
+    "Paneer",
+    "Biscuits",
+    "Tablets",
+    "Notebook",
+    "Pen",
+    "Cake",
+    "Juice",
+    "Rice",
+    "Atta",
+]
+COPY_CHUNK_ROWS = 50_000
+# Synthetic shops and riders are scattered over a disc around this point.
+CITY_CENTER = (12.9716, 77.5946)
+CITY_RADIUS_KM = 15.0
 
 
 def print_header():
@@ -13,48 +90,71 @@ def print_header():
     print("=" * 60)
 
 
-async def get_stats():
+def _format_bytes(size: Optional[int]) -> str:
+    size = float(size or 0)
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def fetch_table_stats(exact: bool = False) -> list[dict]:
+    """Counts, sizes and bloat for every table from one table_stats() call."""
+    db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+    if db_url:
+        engine = create_engine(db_url)
+        try:
+            with engine.connect() as conn:
+                result = conn.execute(
+                    text("SELECT * FROM table_stats(:exact)"), {"exact": exact}
+                )
+                return [dict(row._mapping) for row in result]
+        finally:
+            engine.dispose()
     supabase = get_supabase()
     if not supabase:
-        print("❌ Could not connect to Supabase.")
+        raise RuntimeError("Set REFLEX_DB_URL or the Supabase credentials.")
+    return supabase.rpc("table_stats", {"exact": exact}).execute().data or []
+
+
+async def get_stats(exact: bool = False):
+    started = time.perf_counter()
+    try:
+        stats = fetch_table_stats(exact)
+    except Exception as e:
+        logging.exception(f"Error getting database statistics: {e}")
+        print(f"❌ Could not read database statistics: {e}")
         return
-    tables = [
-        "users",
-        "shops",
-        "products",
-        "categories",
-        "orders",
-        "order_items",
-        "riders",
-        "coupons",
-        "payouts",
-        "addresses",
-    ]
-    print("""
-📊 Database Statistics:""")
-    print("-" * 40)
-    print(f"{'Table':<20} | {'Count':<10}")
-    print("-" * 40)
-    for table in tables:
-        try:
-            res = supabase.table(table).select("*", count="exact", head=True).execute()
-            count = res.count
-            print(f"{table:<20} | {count:<10}")
-        except Exception as e:
-            logging.exception(f"Error getting stats for {table}: {e}")
-            print(f"{table:<20} | Error")
+    elapsed = (time.perf_counter() - started) * 1000
+    width = 86
+    print(f"""
+📊 Database Statistics ({"exact" if exact else "estimated"} counts, {elapsed:.0f} ms):""")
+    print("-" * width)
     print(
-        "-" * 40
-        + """
-"""
+        f"{'Table':<20} | {'Rows':>12} | {'Table':>9} | {'Indexes':>9} | "
+        f"{'Dead rows':>10} | {'Bloat':>6}"
     )
+    print("-" * width)
+    total_bytes = 0
+    for row in stats:
+        rows = row["row_count"] or 0
+        prefix = "" if row["is_exact"] else "~"
+        ratio = row["bloat_ratio"]
+        total_bytes += (row["table_bytes"] or 0) + (row["index_bytes"] or 0)
+        print(
+            f"{row['table_name']:<20} | {prefix + format(rows, ','):>12} | "
+            f"{_format_bytes(row['table_bytes']):>9} | "
+            f"{_format_bytes(row['index_bytes']):>9} | "
+            f"{row['dead_rows'] or 0:>10,} | "
+            f"{'-' if ratio is None else f'{float(ratio):.1%}':>6}"
+        )
+    print("-" * width)
+    print(f"Total size: {_format_bytes(total_bytes)}")
+    print()
 
 
 async def clear_database():
-    supabase = get_supabase()
-    if not supabase:
-        print("❌ Could not connect to Supabase.")
-        return
     print("""
 ⚠️  WARNING: This will DELETE ALL DATA from the database.""")
     confirm = input("Are you sure you want to continue? (yes/no): ")
@@ -63,33 +163,8 @@ async def clear_database():
         return
     print("""
 🗑️  Clearing all data...""")
-    tables_config = [
-        ("order_items", True),
-        ("payouts", False),
-        ("addresses", False),
-        ("orders", False),
-        ("products", True),
-        ("shops", True),
-        ("categories", True),
-        ("coupons", False, "code"),
-        ("riders", False),
-        ("users", False),
-    ]
-    for config in tables_config:
-        table = config[0]
-        is_int = config[1]
-        id_col = config[2] if len(config) > 2 else "id"
-        try:
-            query = supabase.table(table).delete()
-            if is_int:
-                query.gte(id_col, 0).execute()
-            else:
-                query.neq(id_col, "xxxxx").execute()
-            print(f"✅ Cleared {table}")
-        except Exception as e:
-            logging.exception(f"Failed to clear {table}: {e}")
-            print(f"⚠️  Failed to clear {table}: {e}")
-    print("""
+    if clear_all_tables():
+        print("""
 ✅ Database cleared successfully!""")
 
 
@@ -111,6 +186,430 @@ def seed_sample_data():
         print(f"❌ Failed to seed data: {e}")
 
 
+def _copy_rows(raw_conn, table: str, columns: list[str], rows) -> int:
+    """Stream rows into table with COPY, for either psycopg 3 or psycopg2."""
+    cursor = raw_conn.cursor()
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    count = 0
+    if hasattr(cursor, "copy"):
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    else:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if v is None else v for v in row])
+            count += 1
+        buffer.seek(0)
+        cursor.copy_expert(f"{sql} WITH (FORMAT csv)", buffer)
+    cursor.close()
+    return count
+
+
+def _random_point(rng: random.Random) -> tuple[float, float]:
+    """A uniformly random (latitude, longitude) within CITY_RADIUS_KM of the center."""
+    lat, lon = CITY_CENTER
+    distance = CITY_RADIUS_KM * math.sqrt(rng.random()) / KM_PER_DEGREE
+    bearing = rng.uniform(0, 2 * math.pi)
+    return (
+        round(lat + distance * math.cos(bearing), 6),
+        round(lon + distance * math.sin(bearing) / math.cos(math.radians(lat)), 6),
+    )
+
+
+def _chunks(rows, size: int = COPY_CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate_scale_data(
+    db_url: str,
+    shops: int,
+    products: int,
+    orders: int,
+    riders: int,
+    customers: int,
+    days: int = 180,
+    max_items: int = 4,
+    seed: int = 42,
+):
+    """Generate a synthetic dataset and bulk-load it with COPY.
+
+    Rows are generated lazily and written in chunks of COPY_CHUNK_ROWS, each
+    chunk committed on its own, so memory stays flat at any size. Products are
+    laid out as one contiguous id range per shop, which lets order items pick a
+    product from the order's shop without keeping the catalog in memory.
+    Synthetic users, riders and orders use "syn_" / "SYN-" id prefixes so they
+    never collide with real rows.
+    """
+    rng = random.Random(seed)
+    engine = create_engine(db_url)
+    with engine.begin() as conn:
+        slugs = [r[0] for r in conn.execute(text("SELECT slug FROM categories"))]
+        if not slugs:
+            for i, slug in enumerate(DEFAULT_CATEGORY_SLUGS):
+                conn.execute(
+                    text("""
+                        INSERT INTO categories (name, slug, sort_order)
+                        VALUES (:name, :slug, :sort_order)
+                        ON CONFLICT (slug) DO NOTHING
+                    """),
+                    {"name": slug.title(), "slug": slug, "sort_order": i + 1},
+                )
+            slugs = DEFAULT_CATEGORY_SLUGS
+        shop_base = conn.execute(
+            text("SELECT COALESCE(MAX(id), 0) FROM shops")
+        ).scalar()
+        product_base = conn.execute(
+            text("SELECT COALESCE(MAX(id), 0) FROM products")
+        ).scalar()
+        # Continue after the highest suffix in use, not the row count: after
+        # deletes or archiving the count would reuse ids that still exist.
+        order_base, rider_base, customer_base = (
+            conn.execute(
+                text(
+                    "SELECT COALESCE(MAX(substring(id FROM :pattern)::BIGINT) + 1, 0) "
+                    f"FROM {table} WHERE id ~ :pattern"
+                ),
+                {"pattern": pattern},
+            ).scalar()
+            for table, pattern in (
+                ("orders_all", r"^SYN-(\d+)$"),
+                ("riders", r"^syn_r(\d+)$"),
+                ("users", r"^syn_user_(\d+)$"),
+            )
+        )
+    shop_ids = list(range(shop_base + 1, shop_base + shops + 1))
+    per_shop = max(products // max(shops, 1), 1)
+    # Product id range of each shop: [start, start + per_shop)
+    product_start = {
+        shop_id: product_base + i * per_shop + 1 for i, shop_id in enumerate(shop_ids)
+    }
+    product_prices = [round(rng.uniform(10, 500), 2) for _ in range(per_shop)]
+    password_hash = hash_password("password123")
+    now = datetime.datetime.now()
+    statuses, weights = zip(*ORDER_STATUSES)
+
+    def shop_rows():
+        for shop_id in shop_ids:
+            yield (
+                shop_id,
+                f"Synthetic Shop {shop_id}",
+                rng.choice(slugs),
+                round(rng.uniform(3.5, 5.0), 1),
+                f"{rng.randint(10, 30)}-{rng.randint(31, 45)} min",
+                f"{rng.uniform(0.2, 5.0):.1f} km",
+                f"{shop_id} Market Rd",
+                rng.random() < 0.1,
+                True,
+                *_random_point(rng),
+            )
+
+    def product_rows():
+        for shop_id in shop_ids:
+            start = product_start[shop_id]
+            for offset in range(per_shop):
+                price = product_prices[offset]
+                yield (
+                    start + offset,
+                    shop_id,
+                    f"{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_NOUNS)} {offset}",
+                    price,
+                    round(price * rng.uniform(1.0, 1.2), 2),
+                    rng.random() > 0.05,
+                    rng.choice(["1 pc", "500g", "1 kg", "1 L", "Pack of 6"]),
+                )
+
+    def rider_rows():
+        for i in range(rider_base, rider_base + riders):
+            yield (
+                f"syn_r{i}",
+                f"Rider {i}",
+                f"9{i:09d}",
+                rng.choice(["Bike", "Scooter", "Cycle"]),
+                rng.choice(["Online", "Offline"]),
+                0,
+                0,
+                *_random_point(rng),
+            )
+
+    def customer_rows():
+        for i in range(customer_base, customer_base + customers):
+            yield (
+                f"syn_user_{i}",
+                f"Customer {i}",
+                f"customer{i}@synthetic.minidrop",
+                f"8{i:09d}",
+                "customer",
+                password_hash,
+            )
+
+    def order_rows():
+        items = []
+        for n in range(order_base, order_base + orders):
+            shop_id = rng.choice(shop_ids)
+            status = rng.choices(statuses, weights)[0]
+            created_at = now - datetime.timedelta(seconds=rng.randint(0, days * 86400))
+            order_id = f"SYN-{n:010d}"
+            subtotal = 0.0
+            for _ in range(rng.randint(1, max_items)):
+                offset = rng.randrange(per_shop)
+                price = product_prices[offset]
+                quantity = rng.randint(1, 3)
+                subtotal += price * quantity
+                items.append(
+                    (
+                        order_id,
+                        product_start[shop_id] + offset,
+                        f"Item {offset}",
+                        price,
+                        quantity,
+                    )
+                )
+            rider_id = (
+                f"syn_r{rng.randrange(rider_base + riders)}"
+                if rider_base + riders and status in ("Delivered", "Out for Delivery")
+                else None
+            )
+            yield (
+                (
+                    order_id,
+                    round(subtotal, 2),
+                    15.0,
+                    round(subtotal + 15.0, 2),
+                    status,
+                    created_at.strftime("%Y-%m-%d"),
+                    created_at.strftime("%H:%M"),
+                    f"{rng.randint(1, 999)} Synthetic Lane",
+                    rng.choice(["COD", "UPI"]),
+                    shop_id,
+                    f"syn_user_{rng.randrange(customer_base + customers)}"
+                    if customer_base + customers
+                    else None,
+                    rider_id,
+                    created_at,
+                ),
+                items,
+            )
+            items = []
+
+    tables = [
+        (
+            "shops",
+            [
+                "id",
+                "name",
+                "category_slug",
+                "rating",
+                "delivery_time",
+                "distance",
+                "address",
+                "is_featured",
+                "is_active",
+                "latitude",
+                "longitude",
+            ],
+            shop_rows(),
+        ),
+        (
+            "products",
+            [
+                "id",
+                "shop_id",
+                "name",
+                "price",
+                "original_price",
+                "is_available",
+                "unit",
+            ],
+            product_rows(),
+        ),
+        (
+            "riders",
+            [
+                "id",
+                "name",
+                "phone",
+                "vehicle_type",
+                "status",
+                "earnings",
+                "completed_orders",
+                "latitude",
+                "longitude",
+            ],
+            rider_rows(),
+        ),
+        (
+            "users",
+            ["id", "name", "email", "phone", "role", "password_hash"],
+            customer_rows(),
+        ),
+    ]
+    order_columns = [
+        "id",
+        "subtotal",
+        "delivery_fee",
+        "total_amount",
+        "status",
+        "date",
+        "time",
+        "delivery_address",
+        "payment_method",
+        "shop_id",
+        "user_id",
+        "rider_id",
+        "created_at",
+    ]
+    item_columns = ["order_id", "product_id", "name", "price", "quantity"]
+    raw_conn = engine.raw_connection()
+    try:
+        for table, columns, rows in tables:
+            started = time.perf_counter()
+            total = 0
+            for chunk in _chunks(rows):
+                total += _copy_rows(raw_conn, table, columns, chunk)
+                raw_conn.commit()
+            print(
+                f"✅ {table:<12} {total:>12,} rows in {time.perf_counter() - started:.1f}s"
+            )
+        # Create the monthly orders partitions the history will land in, so it
+        # does not all pile up in the default partition.
+        cursor = raw_conn.cursor()
+        cursor.execute(
+            "SELECT to_regprocedure('ensure_order_partitions(date, integer)')"
+        )
+        if cursor.fetchone()[0]:
+            cursor.execute(
+                "SELECT ensure_order_partitions(%s)",
+                ((now - datetime.timedelta(days=days)).date(),),
+            )
+        # One RESYNC at the end instead of a change notification per row.
+        cursor.execute("SELECT set_config('minidrop.skip_order_feed', 'on', false)")
+        cursor.close()
+        raw_conn.commit()
+        started = time.perf_counter()
+        total_orders = total_items = 0
+        for chunk in _chunks(order_rows()):
+            total_orders += _copy_rows(
+                raw_conn, "orders", order_columns, (o for o, _ in chunk)
+            )
+            total_items += _copy_rows(
+                raw_conn,
+                "order_items",
+                item_columns,
+                (i for _, items in chunk for i in items),
+            )
+            raw_conn.commit()
+        print(
+            f"✅ {'orders':<12} {total_orders:>12,} rows, {total_items:,} items "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        cursor = raw_conn.cursor()
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('shops', 'id'), (SELECT MAX(id) FROM shops))"
+        )
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence('products', 'id'), (SELECT MAX(id) FROM products))"
+        )
+        cursor.execute("ANALYZE")
+        # Historical orders land behind the rollup watermark; drop it so the
+        # rollup job rebuilds every bucket.
+        cursor.execute("SELECT to_regclass('rollup_watermarks')")
+        if cursor.fetchone()[0]:
+            cursor.execute("DELETE FROM rollup_watermarks WHERE name = 'revenue'")
+        cursor.execute(
+            f"SELECT pg_notify('{ORDER_FEED_CHANNEL}', %s)",
+            ('{"op": "RESYNC"}',),
+        )
+        cursor.close()
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+        engine.dispose()
+
+
+def refresh_rollups(db_url: str, rebuild: bool = False):
+    """Run the revenue rollup job until it has caught up with the orders."""
+    engine = create_engine(db_url)
+    try:
+        if rebuild:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("DELETE FROM rollup_watermarks WHERE name = 'revenue'")
+                )
+                conn.execute(text("DELETE FROM revenue_rollups"))
+        started = time.perf_counter()
+        while True:
+            with engine.begin() as conn:
+                rolled_up_to, caught_up = conn.execute(
+                    text(
+                        "SELECT rolled_up_to, caught_up FROM refresh_revenue_rollups()"
+                    )
+                ).one()
+            if rolled_up_to is None:
+                print("⏭️  Nothing to roll up, or another worker holds the job lock.")
+                break
+            print(f"📈 Rolled up to {rolled_up_to:%Y-%m-%d %H:%M}")
+            if caught_up:
+                break
+        print(f"✅ Rollups refreshed in {time.perf_counter() - started:.1f}s")
+    finally:
+        engine.dispose()
+
+
+def archive_orders(db_url: str, older_than_days: int, batch_size: int):
+    """Move old delivered orders to the archive tables, batch by batch."""
+    engine = create_engine(db_url)
+    try:
+        started = time.perf_counter()
+        total = 0
+        while True:
+            with engine.begin() as conn:
+                moved = conn.execute(
+                    text(
+                        "SELECT archive_orders(CAST(:older_than AS INTERVAL), :batch_size)"
+                    ),
+                    {"older_than": f"{older_than_days} days", "batch_size": batch_size},
+                ).scalar()
+            total += moved
+            if moved:
+                print(f"📦 Archived {moved:,} orders")
+            if moved < batch_size:
+                break
+        print(
+            f"✅ {total:,} orders older than {older_than_days} days archived "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+    finally:
+        engine.dispose()
+
+
+def generate_from_args(args):
+    db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+    if not db_url:
+        print("❌ Set REFLEX_DB_URL (or DATABASE_URL) to load synthetic data.")
+        sys.exit(1)
+    sizes = dict(SCALE_PRESETS[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    print(
+        f"🌱 Generating synthetic data ({args.scale}): "
+        + ", ".join(f"{v:,} {k}" for k, v in sizes.items())
+    )
+    generate_scale_data(
+        db_url, days=args.days, max_items=args.max_items, seed=args.seed, **sizes
+    )
+
+
 async def main_menu():
     while True:
         print_header()
@@ -140,6 +639,68 @@ Press Enter to continue...""")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mini Drop database manager.")
+    subparsers = parser.add_subparsers(dest="command")
+    generate = subparsers.add_parser(
+        "generate", help="bulk-load a synthetic dataset with COPY"
+    )
+    generate.add_argument("--scale", choices=SCALE_PRESETS, default="small")
+    for key in SCALE_PRESETS["small"]:
+        generate.add_argument(
+            f"--{key}", type=int, help=f"override the number of {key}"
+        )
+    generate.add_argument(
+        "--days", type=int, default=180, help="spread orders over this many days"
+    )
+    generate.add_argument(
+        "--max-items", type=int, default=4, help="maximum items per order"
+    )
+    generate.add_argument("--seed", type=int, default=42)
+    rollup = subparsers.add_parser(
+        "rollup", help="run the revenue rollup job until it has caught up"
+    )
+    rollup.add_argument(
+        "--rebuild", action="store_true", help="recompute every bucket from scratch"
+    )
+    archive = subparsers.add_parser(
+        "archive", help="move old delivered orders to the archive tables"
+    )
+    archive.add_argument(
+        "--older-than-days",
+        type=int,
+        default=ORDER_ARCHIVE_AFTER_DAYS,
+        help="archive Delivered/Completed orders older than this",
+    )
+    archive.add_argument("--batch-size", type=int, default=ORDER_ARCHIVE_BATCH)
+    stats = subparsers.add_parser(
+        "stats", help="row counts, sizes and bloat for every table"
+    )
+    stats.add_argument(
+        "--exact",
+        action="store_true",
+        help="count every row instead of using planner estimates",
+    )
+    args = parser.parse_args()
+    if args.command == "stats":
+        asyncio.run(get_stats(exact=args.exact))
+        sys.exit(0)
+    if args.command == "generate":
+        generate_from_args(args)
+        sys.exit(0)
+    if args.command == "rollup":
+        db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+        if not db_url:
+            print("❌ Set REFLEX_DB_URL (or DATABASE_URL) to refresh rollups.")
+            sys.exit(1)
+        refresh_rollups(db_url, rebuild=args.rebuild)
+        sys.exit(0)
+    if args.command == "archive":
+        db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+        if not db_url:
+            print("❌ Set REFLEX_DB_URL (or DATABASE_URL) to archive orders.")
+            sys.exit(1)
+        archive_orders(db_url, args.older_than_days, args.batch_size)
+        sys.exit(0)
     try:
         asyncio.run(main_menu())
     except KeyboardInterrupt as e:
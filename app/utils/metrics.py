@@ -0,0 +1,268 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Optional
+
+DB_METRICS_ENABLED = os.environ.get("DB_METRICS_ENABLED", "true").lower() == "true"
+# Serialising large results just to size them is expensive, so payload bytes
+# are measured on a sample of calls.
+DB_METRICS_PAYLOAD_SAMPLE = float(os.environ.get("DB_METRICS_PAYLOAD_SAMPLE", "0.1"))
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+ROW_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(
+                    f"{self.name}{_format_labels(self.labels, labels)} {value:g}"
+                )
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...], buckets: tuple
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict[tuple, dict[str, float]]:
+        """Count and sum per label set, e.g. for logging or tests."""
+        with self._lock:
+            return {
+                labels: {"count": count, "sum": total}
+                for labels, (_, total, count) in self._series.items()
+            }
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(
+                (k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()
+            )
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labels, labels, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labels, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            label_text = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_text} {total:g}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+QUERY_SECONDS = Histogram(
+    "minidrop_db_call_duration_seconds",
+    "Wall time of data-layer calls.",
+    ("method", "outcome"),
+    LATENCY_BUCKETS,
+)
+QUERY_ROWS = Histogram(
+    "minidrop_db_call_rows",
+    "Rows returned by data-layer calls.",
+    ("method",),
+    ROW_BUCKETS,
+)
+QUERY_PAYLOAD_BYTES = Histogram(
+    "minidrop_db_call_payload_bytes",
+    "JSON size of data-layer results (sampled).",
+    ("method",),
+    BYTE_BUCKETS,
+)
+QUERY_ERRORS = Counter(
+    "minidrop_db_call_errors_total",
+    "Data-layer calls that hit a database error, by exception type.",
+    ("method", "error"),
+)
+REGISTRY = [QUERY_SECONDS, QUERY_ROWS, QUERY_PAYLOAD_BYTES, QUERY_ERRORS]
+
+_current_call: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "db_current_call", default=None
+)
+
+
+def record_error(error: BaseException):
+    """Tag the data-layer call in progress with ``error``.
+
+    DatabaseManager methods log and swallow their exceptions, so the failure
+    is recorded where it is raised rather than inferred from the return value.
+    """
+    call = _current_call.get()
+    if call is not None and call["error"] is None:
+        call["error"] = type(error).__name__
+
+
+def measure_result(result: Any) -> tuple[int, int]:
+    """Rows and JSON payload bytes of a data-layer return value."""
+    rows = result_rows(result)
+    if isinstance(result, tuple):
+        result = result[0]
+    return rows, len(json.dumps(result, default=str).encode("utf-8"))
+
+
+def result_rows(result: Any) -> int:
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, list):
+        return len(result)
+    if result is None or result is False:
+        return 0
+    return 1
+
+
+def instrument(name: str):
+    """Decorator recording latency, rows, payload and errors for ``name``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not DB_METRICS_ENABLED:
+                return await func(*args, **kwargs)
+            call = {"error": None}
+            token = _current_call.set(call)
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException as e:
+                record_error(e)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                _current_call.reset(token)
+                outcome = "error" if call["error"] else "ok"
+                QUERY_SECONDS.observe((name, outcome), elapsed)
+                if call["error"]:
+                    QUERY_ERRORS.inc((name, call["error"]))
+            QUERY_ROWS.observe((name,), result_rows(result))
+            if random.random() < DB_METRICS_PAYLOAD_SAMPLE:
+                try:
+                    _, payload = measure_result(result)
+                    QUERY_PAYLOAD_BYTES.observe((name,), payload)
+                except (TypeError, ValueError) as e:
+                    logging.debug(f"Could not size result of {name}: {e}")
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(cls):
+    """Class decorator that instruments every public coroutine method."""
+    for attr, value in list(vars(cls).items()):
+        if not attr.startswith("_") and inspect.iscoroutinefunction(value):
+            setattr(cls, attr, instrument(attr)(value))
+    return cls
+
+
+def _gauge_lines(name: str, documentation: str, values: dict[str, float]) -> list[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for key, value in sorted(values.items()):
+        lines.append(f'{name}{{name="{key}"}} {value:g}')
+    return lines
+
+
+def render_metrics(pool: Optional[dict] = None) -> str:
+    """Render every registered metric, plus pool gauges, as exposition text."""
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    if pool:
+        numeric = {
+            key: float(value)
+            for key, value in pool.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        lines.extend(
+            _gauge_lines("minidrop_db_pool", "Connection pool state.", numeric)
+        )
+        cache = pool.get("catalog_cache")
+        if isinstance(cache, dict):
+            lines.extend(
+                _gauge_lines(
+                    "minidrop_catalog_cache",
+                    "Catalog cache counters.",
+                    {
+                        k: float(v)
+                        for k, v in cache.items()
+                        if isinstance(v, (int, float))
+                    },
+                )
+            )
+    return "\n".join(lines) + "\n"
\ No newline at end of file
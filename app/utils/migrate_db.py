@@ -1,6 +1,11 @@
+import argparse
+import hashlib
 import os
+import re
 import sys
 import logging
+from dataclasses import dataclass
+from typing import Optional
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -18,7 +23,7 @@ except ImportError:
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
-SCHEMA_SQL = """
+BASE_TABLES_SQL = """
 -- Create categories table
 CREATE TABLE IF NOT EXISTS categories (
     id SERIAL PRIMARY KEY,
@@ -42,6 +47,7 @@ CREATE TABLE IF NOT EXISTS shops (
     address TEXT,
     is_featured BOOLEAN DEFAULT FALSE,
     is_active BOOLEAN DEFAULT TRUE,
+    commission_rate DECIMAL(5,2) DEFAULT 10.0,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -84,7 +90,7 @@ CREATE TABLE IF NOT EXISTS orders (
     delivery_address TEXT,
     payment_method TEXT,
     shop_id INTEGER REFERENCES shops(id),
-    status TEXT,
+    user_id TEXT,
     rider_id TEXT,
     created_at TIMESTAMP DEFAULT NOW()
 );
@@ -140,18 +146,2126 @@ CREATE TABLE IF NOT EXISTS payouts (
     status TEXT
 );
 
--- Add columns if they don't exist (migrations)
+-- Columns added after the first release, for databases created before them
+ALTER TABLE users ADD COLUMN IF NOT EXISTS shop_id INTEGER REFERENCES shops(id);
+ALTER TABLE shops ADD COLUMN IF NOT EXISTS commission_rate DECIMAL(5,2) DEFAULT 10.0;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS user_id TEXT;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS rider_id TEXT;
+"""
+
+FUNCTIONS_SQL = """
+-- Storefront bootstrap: categories, active shops and available products in one
+-- round trip, projected to the columns the storefront cards render. The version
+-- is a hash of the document, so callers that pass the version they already hold
+-- get back {"unchanged": true} instead of the data.
+CREATE OR REPLACE FUNCTION storefront_bootstrap(known_version TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    payload JSONB;
+    payload_version TEXT;
+BEGIN
+    SELECT jsonb_build_object(
+        'categories', COALESCE((SELECT jsonb_agg(c ORDER BY c.sort_order, c.id) FROM categories c WHERE c.is_active), '[]'::jsonb),
+        'shops', COALESCE((SELECT jsonb_agg(to_jsonb(s) ORDER BY s.id) FROM (
+            SELECT id, name, category_slug, rating, delivery_time, distance, image_url, address, is_featured
+            FROM shops WHERE is_active) s), '[]'::jsonb),
+        'products', COALESCE((SELECT jsonb_agg(to_jsonb(p) ORDER BY p.id) FROM (
+            SELECT id, shop_id, name, price, original_price, image_url, unit, is_available
+            FROM products WHERE is_available) p), '[]'::jsonb)
+    ) INTO payload;
+    payload_version := md5(payload::text);
+    IF known_version IS NOT DISTINCT FROM payload_version THEN
+        RETURN jsonb_build_object('version', payload_version, 'unchanged', TRUE);
+    END IF;
+    RETURN payload || jsonb_build_object('version', payload_version, 'unchanged', FALSE);
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Rider settlement: credit earnings and completed deliveries in one atomic
+-- UPDATE. credits is a JSON array of {"rider_id", "amount", "deliveries"}
+-- objects; several credits for the same rider are summed first.
+CREATE OR REPLACE FUNCTION settle_rider_deliveries(credits JSONB)
+RETURNS SETOF riders AS $$
+    UPDATE riders r
+    SET earnings = COALESCE(r.earnings, 0) + c.amount,
+        completed_orders = COALESCE(r.completed_orders, 0) + c.deliveries
+    FROM (
+        SELECT rider_id, SUM(amount) AS amount, SUM(COALESCE(deliveries, 1))::INTEGER AS deliveries
+        FROM jsonb_to_recordset(credits) AS x(rider_id TEXT, amount NUMERIC, deliveries INTEGER)
+        GROUP BY rider_id
+    ) c
+    WHERE r.id = c.rider_id
+    RETURNING r.*;
+$$ LANGUAGE sql;
+
+-- Transactional checkout: insert every split order and all of its items in one
+-- statement, so a failure leaves no orphan orders. orders is a JSON array of
+-- order objects, each carrying its line items under "items".
+CREATE OR REPLACE FUNCTION place_orders(orders JSONB)
+RETURNS TABLE (order_id TEXT) AS $$
+    WITH new_orders AS (
+        INSERT INTO orders (id, subtotal, delivery_fee, total_amount, status, date, time, delivery_address, payment_method, shop_id, user_id)
+        SELECT o.id, o.subtotal, o.delivery_fee, o.total_amount, COALESCE(o.status, 'Pending'), o.date, o.time, o.delivery_address, o.payment_method, o.shop_id, o.user_id
+        FROM jsonb_to_recordset(orders) AS o(id TEXT, subtotal NUMERIC, delivery_fee NUMERIC, total_amount NUMERIC, status TEXT, date TEXT, time TEXT, delivery_address TEXT, payment_method TEXT, shop_id INTEGER, user_id TEXT)
+        RETURNING id
+    ), new_items AS (
+        INSERT INTO order_items (order_id, product_id, name, price, quantity, image_url)
+        SELECT o->>'id', i.product_id, i.name, i.price, i.quantity, i.image_url
+        FROM jsonb_array_elements(orders) AS o,
+             jsonb_to_recordset(o->'items') AS i(product_id INTEGER, name TEXT, price NUMERIC, quantity INTEGER, image_url TEXT)
+    )
+    SELECT id FROM new_orders;
+$$ LANGUAGE sql;
+"""
+
+INDEXES_SQL = """
+-- Hot-path indexes: one composite index per DatabaseManager query shape. The
+-- order listings filter on one column and page by (created_at, id) newest
+-- first, so the index order matches the ORDER BY and no sort is needed.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_created ON orders (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_shop_created ON orders (shop_id, created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_rider_created ON orders (rider_id, created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_status_created ON orders (status, created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_shop_available ON products (shop_id, id) WHERE is_available;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shops_category_active ON shops (category_slug, id) WHERE is_active;
+"""
+
+DAILY_STATS_SQL = """
+-- Dashboard counters: one row per (day, shop) kept current by a trigger on
+-- orders, so "orders today" and "revenue today" are a primary-key lookup
+-- instead of a scan. Every write path (create_order, update_order_status,
+-- place_orders, rider assignment, deletes) goes through the trigger. An order
+-- contributes to revenue unless it is Cancelled, and to delivered_revenue
+-- (its subtotal) once it is Delivered or Completed.
+CREATE TABLE IF NOT EXISTS shop_daily_stats (
+    day DATE NOT NULL,
+    shop_id INTEGER NOT NULL,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    delivered_count INTEGER NOT NULL DEFAULT 0,
+    delivered_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    cancelled_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, shop_id)
+);
+
+-- The business day of an order: its "date" text when it is an ISO date,
+-- otherwise the day it was created.
+CREATE OR REPLACE FUNCTION order_stats_day(order_date TEXT, created_at TIMESTAMP)
+RETURNS DATE AS $$
+    SELECT CASE WHEN order_date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+                THEN order_date::DATE ELSE COALESCE(created_at, NOW())::DATE END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add (sign = 1) or remove (sign = -1) one order's contribution.
+CREATE OR REPLACE FUNCTION apply_order_stats(o orders, sign INTEGER)
+RETURNS VOID AS $$
+    INSERT INTO shop_daily_stats AS s (day, shop_id, orders_count, revenue, delivered_count, delivered_revenue, cancelled_count)
+    VALUES (
+        order_stats_day(o.date, o.created_at),
+        COALESCE(o.shop_id, 0),
+        sign,
+        sign * CASE WHEN o.status = 'Cancelled' THEN 0 ELSE COALESCE(o.total_amount, 0) END,
+        sign * CASE WHEN o.status IN ('Delivered', 'Completed') THEN 1 ELSE 0 END,
+        sign * CASE WHEN o.status IN ('Delivered', 'Completed') THEN COALESCE(o.subtotal, 0) ELSE 0 END,
+        sign * CASE WHEN o.status = 'Cancelled' THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (day, shop_id) DO UPDATE SET
+        orders_count = s.orders_count + EXCLUDED.orders_count,
+        revenue = s.revenue + EXCLUDED.revenue,
+        delivered_count = s.delivered_count + EXCLUDED.delivered_count,
+        delivered_revenue = s.delivered_revenue + EXCLUDED.delivered_revenue,
+        cancelled_count = s.cancelled_count + EXCLUDED.cancelled_count;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION orders_daily_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_order_stats(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_order_stats(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_daily_stats_write ON orders;
+CREATE TRIGGER orders_daily_stats_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_daily_stats_trigger();
+DROP TRIGGER IF EXISTS orders_daily_stats_update ON orders;
+CREATE TRIGGER orders_daily_stats_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.total_amount IS DISTINCT FROM NEW.total_amount
+          OR OLD.subtotal IS DISTINCT FROM NEW.subtotal
+          OR OLD.shop_id IS DISTINCT FROM NEW.shop_id
+          OR OLD.date IS DISTINCT FROM NEW.date)
+    EXECUTE FUNCTION orders_daily_stats_trigger();
+
+-- Backfill from existing orders. CREATE TRIGGER locks out writers until this
+-- transaction commits, so no order is counted twice or missed.
+INSERT INTO shop_daily_stats (day, shop_id, orders_count, revenue, delivered_count, delivered_revenue, cancelled_count)
+SELECT order_stats_day(date, created_at), COALESCE(shop_id, 0), COUNT(*),
+       COALESCE(SUM(total_amount) FILTER (WHERE status IS DISTINCT FROM 'Cancelled'), 0),
+       COUNT(*) FILTER (WHERE status IN ('Delivered', 'Completed')),
+       COALESCE(SUM(subtotal) FILTER (WHERE status IN ('Delivered', 'Completed')), 0),
+       COUNT(*) FILTER (WHERE status = 'Cancelled')
+FROM orders
+GROUP BY 1, 2
+ON CONFLICT (day, shop_id) DO NOTHING;
+"""
+
+REVENUE_ROLLUPS_SQL = """
+-- Revenue rollups for reports and charts: order count, GMV, commission and
+-- delivery fees per hour and per day, for each shop and platform-wide
+-- (shop_id 0). Cancelled orders are left out. refresh_revenue_rollups() is
+-- run by a background job: it recomputes every bucket from the start of the
+-- day before its watermark up to now, so late status changes within that
+-- window are picked up, and advances the watermark by at most max_span per
+-- call so a first run over a large history is split into short transactions.
+CREATE TABLE IF NOT EXISTS revenue_rollups (
+    granularity TEXT NOT NULL CHECK (granularity IN ('hour', 'day')),
+    shop_id INTEGER NOT NULL,
+    bucket TIMESTAMP NOT NULL,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    gmv DECIMAL(14,2) NOT NULL DEFAULT 0,
+    commission DECIMAL(14,2) NOT NULL DEFAULT 0,
+    delivery_fees DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, shop_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name TEXT PRIMARY KEY,
+    rolled_up_to TIMESTAMP NOT NULL
+);
+
+-- Returns the new watermark, or NULL when another worker holds the job lock
+-- or there are no orders yet.
+CREATE OR REPLACE FUNCTION refresh_revenue_rollups(
+    lookback INTERVAL DEFAULT '1 day', max_span INTERVAL DEFAULT '31 days'
+)
+RETURNS TIMESTAMP AS $$
+DECLARE
+    done_to TIMESTAMP;
+    from_ts TIMESTAMP;
+    to_ts TIMESTAMP;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(7316019) THEN
+        RETURN NULL;
+    END IF;
+    SELECT rolled_up_to INTO done_to FROM rollup_watermarks WHERE name = 'revenue';
+    IF done_to IS NULL THEN
+        SELECT MIN(created_at) + lookback INTO done_to FROM orders;
+        IF done_to IS NULL THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    from_ts := date_trunc('day', done_to - lookback);
+    to_ts := LEAST(NOW()::TIMESTAMP, from_ts + max_span);
+
+    DELETE FROM revenue_rollups
+    WHERE granularity IN ('hour', 'day') AND bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'hour',
+           CASE WHEN GROUPING(o.shop_id) = 1 THEN 0 ELSE o.shop_id END,
+           date_trunc('hour', o.created_at),
+           COUNT(*),
+           COALESCE(SUM(o.total_amount), 0),
+           COALESCE(SUM(o.subtotal * COALESCE(s.commission_rate, 10) / 100), 0),
+           COALESCE(SUM(o.delivery_fee), 0)
+    FROM orders o LEFT JOIN shops s ON s.id = o.shop_id
+    WHERE o.created_at >= from_ts AND o.created_at < to_ts
+      AND o.status IS DISTINCT FROM 'Cancelled'
+    GROUP BY GROUPING SETS ((date_trunc('hour', o.created_at), o.shop_id), (date_trunc('hour', o.created_at)))
+    HAVING GROUPING(o.shop_id) = 1 OR o.shop_id IS NOT NULL;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'day', shop_id, date_trunc('day', bucket),
+           SUM(orders_count), SUM(gmv), SUM(commission), SUM(delivery_fees)
+    FROM revenue_rollups
+    WHERE granularity = 'hour' AND bucket >= from_ts AND bucket < to_ts
+    GROUP BY shop_id, date_trunc('day', bucket);
+
+    INSERT INTO rollup_watermarks (name, rolled_up_to) VALUES ('revenue', to_ts)
+    ON CONFLICT (name) DO UPDATE SET rolled_up_to = EXCLUDED.rolled_up_to;
+    RETURN to_ts;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TABLE_STATS_SQL = """
+-- Row counts, sizes and dead-tuple bloat for every table in one round trip.
+-- Counts come from the planner's pg_class estimates (falling back to the
+-- statistics collector for never-analysed tables) unless exact is true, in
+-- which case each table is counted in full. Partitioned tables report the
+-- totals of their partitions, and the partitions themselves are not listed.
+CREATE OR REPLACE FUNCTION table_stats(exact BOOLEAN DEFAULT FALSE)
+RETURNS TABLE (
+    table_name TEXT,
+    row_count BIGINT,
+    is_exact BOOLEAN,
+    table_bytes BIGINT,
+    index_bytes BIGINT,
+    dead_rows BIGINT,
+    bloat_ratio NUMERIC,
+    last_vacuum TIMESTAMPTZ,
+    last_analyze TIMESTAMPTZ
+) AS $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT c.oid, c.relname
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+        ORDER BY c.relname
+    LOOP
+        SELECT
+            SUM(CASE WHEN pc.reltuples >= 0 THEN pc.reltuples::BIGINT ELSE COALESCE(s.n_live_tup, 0) END),
+            SUM(pg_table_size(pc.oid)),
+            SUM(pg_indexes_size(pc.oid)),
+            SUM(COALESCE(s.n_dead_tup, 0)),
+            ROUND(SUM(COALESCE(s.n_dead_tup, 0))::NUMERIC
+                  / NULLIF(SUM(COALESCE(s.n_live_tup, 0) + COALESCE(s.n_dead_tup, 0)), 0), 4),
+            MAX(GREATEST(s.last_vacuum, s.last_autovacuum)),
+            MAX(GREATEST(s.last_analyze, s.last_autoanalyze))
+        INTO row_count, table_bytes, index_bytes, dead_rows, bloat_ratio, last_vacuum, last_analyze
+        FROM (
+            SELECT relid FROM pg_partition_tree(t.oid) WHERE isleaf
+            UNION SELECT t.oid
+        ) tree
+        JOIN pg_class pc ON pc.oid = tree.relid
+        LEFT JOIN pg_stat_user_tables s ON s.relid = pc.oid;
+        table_name := t.relname;
+        is_exact := exact;
+        IF exact THEN
+            EXECUTE format('SELECT COUNT(*) FROM %I', t.relname) INTO row_count;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRUNCATE_SQL = """
+-- Constant-time purges. TRUNCATE skips row triggers, so the order-derived
+-- stats and rollups are emptied alongside the orders they were built from.
+CREATE OR REPLACE FUNCTION purge_orders()
+RETURNS VOID AS $$
+    TRUNCATE order_items, orders, shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION reset_app_data()
+RETURNS VOID AS $$
+    TRUNCATE order_items, payouts, addresses, orders, products, shops, categories,
+             coupons, riders, users, shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+-- Neither function may be callable through the public API roles.
+REVOKE EXECUTE ON FUNCTION purge_orders() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION reset_app_data() FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION purge_orders() FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION reset_app_data() FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION purge_orders() TO service_role;
+        GRANT EXECUTE ON FUNCTION reset_app_data() TO service_role;
+    END IF;
+END;
+$$;
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema step, applied at most once and recorded in schema_migrations.
+
+    Regular migrations run in a single transaction. Online migrations run
+    statement by statement in autocommit mode, which ``CREATE INDEX
+    CONCURRENTLY`` requires, so they must be idempotent (``IF NOT EXISTS``).
+    """
+
+    version: int
+    name: str
+    sql: str
+    online: bool = False
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+    @property
+    def statements(self) -> list[str]:
+        body = "\n".join(
+            line for line in self.sql.splitlines() if not line.startswith("--")
+        )
+        return [stmt.strip() for stmt in body.split(";") if stmt.strip()]
+
+
+# Append new steps here; never edit or reorder a migration that has shipped.
+PARTITION_ORDERS_SQL = """
+-- Orders are range-partitioned by created_at month, so the customer, shop and
+-- rider listings, which only read recent orders by default, prune to the last
+-- few partitions. The primary key has to include the partition key, so it
+-- becomes (id, created_at); order ids stay unique because they are generated.
+-- Rows outside every monthly partition land in orders_default until
+-- ensure_order_partitions() creates their month.
+CREATE OR REPLACE FUNCTION ensure_order_partitions(
+    from_month DATE DEFAULT NOW()::DATE, months_ahead INTEGER DEFAULT 2
+)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month)::DATE;
+    last_month DATE := (date_trunc('month', NOW()) + make_interval(months => months_ahead))::DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Rows moved out of the default partition are not new orders.
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WHILE month_start <= last_month LOOP
+        partition_name := 'orders_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM orders_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, (month_start + INTERVAL '1 month')::DATE, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Swap the plain table for a partitioned one. This rewrites every order and
+-- holds an exclusive lock until the migration commits, so run it in a
+-- maintenance window on a large database.
+DROP FUNCTION IF EXISTS apply_order_stats(orders, INTEGER);
+ALTER TABLE orders RENAME TO orders_unpartitioned;
+ALTER TABLE orders_unpartitioned RENAME CONSTRAINT orders_pkey TO orders_unpartitioned_pkey;
+CREATE TABLE orders (
+    id TEXT NOT NULL,
+    subtotal DECIMAL(10,2) NOT NULL,
+    delivery_fee DECIMAL(10,2) DEFAULT 15.0,
+    total_amount DECIMAL(10,2) NOT NULL,
+    status TEXT DEFAULT 'Pending',
+    date TEXT,
+    time TEXT,
+    delivery_address TEXT,
+    payment_method TEXT,
+    shop_id INTEGER REFERENCES shops(id),
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE orders_default PARTITION OF orders DEFAULT;
+SELECT ensure_order_partitions(COALESCE((SELECT MIN(created_at) FROM orders_unpartitioned), NOW())::DATE);
+INSERT INTO orders (id, subtotal, delivery_fee, total_amount, status, date, time, delivery_address, payment_method, shop_id, user_id, rider_id, created_at)
+SELECT id, subtotal, delivery_fee, total_amount, status, date, time, delivery_address, payment_method, shop_id, user_id, rider_id, COALESCE(created_at, NOW())
+FROM orders_unpartitioned;
+-- Also drops the order_items foreign key: it cannot reference id alone any more.
+DROP TABLE orders_unpartitioned CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_shop_created ON orders (shop_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_rider_created ON orders (rider_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders (status, created_at DESC, id DESC);
+
+-- PostgREST embeds order_items(...) through this computed relationship now
+-- that there is no foreign key to follow.
+CREATE OR REPLACE FUNCTION order_items(orders)
+RETURNS SETOF order_items ROWS 4 AS $$
+    SELECT * FROM order_items WHERE order_id = $1.id;
+$$ LANGUAGE sql STABLE;
+
+-- The stats trigger again, on the partitioned table. apply_order_stats takes
+-- the columns it needs rather than the row type, which partitions do not share.
+CREATE OR REPLACE FUNCTION apply_order_stats(
+    order_date TEXT, created_at TIMESTAMP, shop_id INTEGER, status TEXT,
+    total_amount NUMERIC, subtotal NUMERIC, sign INTEGER
+)
+RETURNS VOID AS $$
+    INSERT INTO shop_daily_stats AS s (day, shop_id, orders_count, revenue, delivered_count, delivered_revenue, cancelled_count)
+    VALUES (
+        order_stats_day(order_date, created_at),
+        COALESCE(shop_id, 0),
+        sign,
+        sign * CASE WHEN status = 'Cancelled' THEN 0 ELSE COALESCE(total_amount, 0) END,
+        sign * CASE WHEN status IN ('Delivered', 'Completed') THEN 1 ELSE 0 END,
+        sign * CASE WHEN status IN ('Delivered', 'Completed') THEN COALESCE(subtotal, 0) ELSE 0 END,
+        sign * CASE WHEN status = 'Cancelled' THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (day, shop_id) DO UPDATE SET
+        orders_count = s.orders_count + EXCLUDED.orders_count,
+        revenue = s.revenue + EXCLUDED.revenue,
+        delivered_count = s.delivered_count + EXCLUDED.delivered_count,
+        delivered_revenue = s.delivered_revenue + EXCLUDED.delivered_revenue,
+        cancelled_count = s.cancelled_count + EXCLUDED.cancelled_count;
+$$ LANGUAGE sql;
+
+-- Archiving and partition maintenance set minidrop.skip_order_stats: moving
+-- an order between tables does not change what it contributed.
+CREATE OR REPLACE FUNCTION orders_daily_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('minidrop.skip_order_stats', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_order_stats(OLD.date, OLD.created_at, OLD.shop_id, OLD.status, OLD.total_amount, OLD.subtotal, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_order_stats(NEW.date, NEW.created_at, NEW.shop_id, NEW.status, NEW.total_amount, NEW.subtotal, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER orders_daily_stats_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_daily_stats_trigger();
+CREATE TRIGGER orders_daily_stats_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.total_amount IS DISTINCT FROM NEW.total_amount
+          OR OLD.subtotal IS DISTINCT FROM NEW.subtotal
+          OR OLD.shop_id IS DISTINCT FROM NEW.shop_id
+          OR OLD.date IS DISTINCT FROM NEW.date)
+    EXECUTE FUNCTION orders_daily_stats_trigger();
+
+-- Cold storage for finished orders. archive_orders() moves Delivered and
+-- Completed orders older than older_than, with their items, in batches; the
+-- history views read orders_all and order_items_archive.
+CREATE TABLE IF NOT EXISTS orders_archive (LIKE orders INCLUDING DEFAULTS);
+ALTER TABLE orders_archive ADD PRIMARY KEY (id);
+CREATE TABLE IF NOT EXISTS order_items_archive (LIKE order_items);
+ALTER TABLE order_items_archive ADD PRIMARY KEY (id);
+ALTER TABLE order_items_archive ADD FOREIGN KEY (order_id) REFERENCES orders_archive(id);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_created ON orders_archive (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_user_created ON orders_archive (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_shop_created ON orders_archive (shop_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_rider_created ON orders_archive (rider_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_items_archive_order_id ON order_items_archive (order_id);
+
+CREATE OR REPLACE VIEW orders_all AS
+SELECT * FROM orders
+UNION ALL
+SELECT * FROM orders_archive;
+
+-- Returns the number of orders moved, 0 when another worker holds the job lock.
+CREATE OR REPLACE FUNCTION archive_orders(
+    older_than INTERVAL DEFAULT '180 days', batch_size INTEGER DEFAULT 5000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(7316022) THEN
+        RETURN 0;
+    END IF;
+    PERFORM ensure_order_partitions();
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WITH batch AS (
+        SELECT id, created_at FROM orders
+        WHERE created_at < NOW() - older_than AND status IN ('Delivered', 'Completed')
+        ORDER BY created_at
+        LIMIT batch_size
+    ), moved_orders AS (
+        DELETE FROM orders o USING batch b
+        WHERE o.id = b.id AND o.created_at = b.created_at
+        RETURNING o.*
+    ), archived AS (
+        INSERT INTO orders_archive SELECT * FROM moved_orders
+        RETURNING id
+    ), moved_items AS (
+        DELETE FROM order_items i USING archived a
+        WHERE i.order_id = a.id
+        RETURNING i.*
+    ), archived_items AS (
+        INSERT INTO order_items_archive SELECT * FROM moved_items
+    )
+    SELECT COUNT(*) INTO moved FROM archived;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rollups cover archived orders too, so a rebuild reproduces the same history.
+CREATE OR REPLACE FUNCTION refresh_revenue_rollups(
+    lookback INTERVAL DEFAULT '1 day', max_span INTERVAL DEFAULT '31 days'
+)
+RETURNS TIMESTAMP AS $$
+DECLARE
+    done_to TIMESTAMP;
+    from_ts TIMESTAMP;
+    to_ts TIMESTAMP;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(7316019) THEN
+        RETURN NULL;
+    END IF;
+    SELECT rolled_up_to INTO done_to FROM rollup_watermarks WHERE name = 'revenue';
+    IF done_to IS NULL THEN
+        SELECT MIN(created_at) + lookback INTO done_to FROM orders_all;
+        IF done_to IS NULL THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+    from_ts := date_trunc('day', done_to - lookback);
+    to_ts := LEAST(NOW()::TIMESTAMP, from_ts + max_span);
+
+    DELETE FROM revenue_rollups
+    WHERE granularity IN ('hour', 'day') AND bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'hour',
+           CASE WHEN GROUPING(o.shop_id) = 1 THEN 0 ELSE o.shop_id END,
+           date_trunc('hour', o.created_at),
+           COUNT(*),
+           COALESCE(SUM(o.total_amount), 0),
+           COALESCE(SUM(o.subtotal * COALESCE(s.commission_rate, 10) / 100), 0),
+           COALESCE(SUM(o.delivery_fee), 0)
+    FROM orders_all o LEFT JOIN shops s ON s.id = o.shop_id
+    WHERE o.created_at >= from_ts AND o.created_at < to_ts
+      AND o.status IS DISTINCT FROM 'Cancelled'
+    GROUP BY GROUPING SETS ((date_trunc('hour', o.created_at), o.shop_id), (date_trunc('hour', o.created_at)))
+    HAVING GROUPING(o.shop_id) = 1 OR o.shop_id IS NOT NULL;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'day', shop_id, date_trunc('day', bucket),
+           SUM(orders_count), SUM(gmv), SUM(commission), SUM(delivery_fees)
+    FROM revenue_rollups
+    WHERE granularity = 'hour' AND bucket >= from_ts AND bucket < to_ts
+    GROUP BY shop_id, date_trunc('day', bucket);
+
+    INSERT INTO rollup_watermarks (name, rolled_up_to) VALUES ('revenue', to_ts)
+    ON CONFLICT (name) DO UPDATE SET rolled_up_to = EXCLUDED.rolled_up_to;
+    RETURN to_ts;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION purge_orders()
+RETURNS VOID AS $$
+    TRUNCATE order_items, orders, order_items_archive, orders_archive,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION reset_app_data()
+RETURNS VOID AS $$
+    TRUNCATE order_items, payouts, addresses, orders, products, shops, categories,
+             coupons, riders, users, order_items_archive, orders_archive,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+REVOKE EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) TO service_role;
+        GRANT EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) TO service_role;
+    END IF;
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
+"""
+
+ORDER_FEED_SQL = """
+-- Publishes order changes on the order_changes channel for the app's LISTEN
+-- connection. The payload carries only the columns that decide which screens
+-- show an order, well under the 8000 byte NOTIFY limit; listeners fetch the
+-- rest. Bulk loads set minidrop.skip_order_feed and send one RESYNC instead,
+-- and archive moves (minidrop.skip_order_stats) are not changes to the order.
+CREATE OR REPLACE FUNCTION orders_notify_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('order_changes', '{"op": "TRUNCATE"}');
+        RETURN NULL;
+    END IF;
+    IF current_setting('minidrop.skip_order_stats', true) = 'on'
+       OR current_setting('minidrop.skip_order_feed', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    PERFORM pg_notify('order_changes', json_build_object(
+        'op', TG_OP, 'id', r.id, 'status', r.status, 'shop_id', r.shop_id,
+        'user_id', r.user_id, 'rider_id', r.rider_id, 'created_at', r.created_at
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER orders_notify_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_notify_trigger();
+CREATE TRIGGER orders_notify_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.rider_id IS DISTINCT FROM NEW.rider_id)
+    EXECUTE FUNCTION orders_notify_trigger();
+CREATE TRIGGER orders_notify_truncate AFTER TRUNCATE ON orders
+    FOR EACH STATEMENT EXECUTE FUNCTION orders_notify_trigger();
+"""
+
+GEO_SQL = """
+-- Coordinates for dispatch. Shops are placed once; riders report theirs with
+-- location pings while online. The dispatch engine keeps online riders in an
+-- in-memory grid and reloads it from here, so no spatial index is needed.
+ALTER TABLE shops ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE shops ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+ALTER TABLE riders ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE riders ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+ALTER TABLE riders ADD COLUMN IF NOT EXISTS location_updated_at TIMESTAMP;
+
+NOTIFY pgrst, 'reload schema';
+"""
+
+ROLLUP_STATUS_SQL = """
+-- refresh_revenue_rollups() also says whether the step reached the present, so
+-- the job loop never compares the watermark with the app server's clock. The
+-- return type changes, which CREATE OR REPLACE cannot do, hence the DROP.
+DROP FUNCTION IF EXISTS refresh_revenue_rollups(INTERVAL, INTERVAL);
+
+-- rolled_up_to is the new watermark, or NULL when another worker holds the
+-- job lock or there are no orders yet; caught_up is false while older history
+-- is still waiting for another step.
+CREATE FUNCTION refresh_revenue_rollups(
+    lookback INTERVAL DEFAULT '1 day',
+    max_span INTERVAL DEFAULT '31 days',
+    OUT rolled_up_to TIMESTAMP,
+    OUT caught_up BOOLEAN
+) AS $$
+DECLARE
+    done_to TIMESTAMP;
+    from_ts TIMESTAMP;
+    to_ts TIMESTAMP;
+BEGIN
+    caught_up := TRUE;
+    IF NOT pg_try_advisory_xact_lock(7316019) THEN
+        RETURN;
+    END IF;
+    SELECT w.rolled_up_to INTO done_to FROM rollup_watermarks w WHERE w.name = 'revenue';
+    IF done_to IS NULL THEN
+        SELECT MIN(created_at) + lookback INTO done_to FROM orders_all;
+        IF done_to IS NULL THEN
+            RETURN;
+        END IF;
+    END IF;
+    from_ts := date_trunc('day', done_to - lookback);
+    to_ts := LEAST(NOW()::TIMESTAMP, from_ts + max_span);
+
+    DELETE FROM revenue_rollups
+    WHERE granularity IN ('hour', 'day') AND bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'hour',
+           CASE WHEN GROUPING(o.shop_id) = 1 THEN 0 ELSE o.shop_id END,
+           date_trunc('hour', o.created_at),
+           COUNT(*),
+           COALESCE(SUM(o.total_amount), 0),
+           COALESCE(SUM(o.subtotal * COALESCE(s.commission_rate, 10) / 100), 0),
+           COALESCE(SUM(o.delivery_fee), 0)
+    FROM orders_all o LEFT JOIN shops s ON s.id = o.shop_id
+    WHERE o.created_at >= from_ts AND o.created_at < to_ts
+      AND o.status IS DISTINCT FROM 'Cancelled'
+    GROUP BY GROUPING SETS ((date_trunc('hour', o.created_at), o.shop_id), (date_trunc('hour', o.created_at)))
+    HAVING GROUPING(o.shop_id) = 1 OR o.shop_id IS NOT NULL;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'day', r.shop_id, date_trunc('day', r.bucket),
+           SUM(r.orders_count), SUM(r.gmv), SUM(r.commission), SUM(r.delivery_fees)
+    FROM revenue_rollups r
+    WHERE r.granularity = 'hour' AND r.bucket >= from_ts AND r.bucket < to_ts
+    GROUP BY r.shop_id, date_trunc('day', r.bucket);
+
+    INSERT INTO rollup_watermarks (name, rolled_up_to) VALUES ('revenue', to_ts)
+    ON CONFLICT (name) DO UPDATE SET rolled_up_to = EXCLUDED.rolled_up_to;
+    rolled_up_to := to_ts;
+    caught_up := to_ts >= NOW()::TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+NOTIFY pgrst, 'reload schema';
+"""
+
+PARTITION_TABLE_STATS_SQL = """
+-- table_stats() again, counting rows in the leaf partitions only. Once a
+-- partitioned table is analysed its own reltuples holds the total of its
+-- partitions, so adding it on top doubled the count. The parent still
+-- contributes its sizes and vacuum and analyze times.
+CREATE OR REPLACE FUNCTION table_stats(exact BOOLEAN DEFAULT FALSE)
+RETURNS TABLE (
+    table_name TEXT,
+    row_count BIGINT,
+    is_exact BOOLEAN,
+    table_bytes BIGINT,
+    index_bytes BIGINT,
+    dead_rows BIGINT,
+    bloat_ratio NUMERIC,
+    last_vacuum TIMESTAMPTZ,
+    last_analyze TIMESTAMPTZ
+) AS $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT c.oid, c.relname, c.relkind
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+        ORDER BY c.relname
+    LOOP
+        SELECT
+            COALESCE(SUM(CASE WHEN NOT tree.counted THEN 0
+                              WHEN pc.reltuples >= 0 THEN pc.reltuples::BIGINT
+                              ELSE COALESCE(s.n_live_tup, 0) END), 0),
+            SUM(pg_table_size(pc.oid)),
+            SUM(pg_indexes_size(pc.oid)),
+            SUM(CASE WHEN tree.counted THEN COALESCE(s.n_dead_tup, 0) ELSE 0 END),
+            ROUND(SUM(CASE WHEN tree.counted THEN COALESCE(s.n_dead_tup, 0) ELSE 0 END)::NUMERIC
+                  / NULLIF(SUM(CASE WHEN tree.counted
+                                    THEN COALESCE(s.n_live_tup, 0) + COALESCE(s.n_dead_tup, 0)
+                                    ELSE 0 END), 0), 4),
+            MAX(GREATEST(s.last_vacuum, s.last_autovacuum)),
+            MAX(GREATEST(s.last_analyze, s.last_autoanalyze))
+        INTO row_count, table_bytes, index_bytes, dead_rows, bloat_ratio, last_vacuum, last_analyze
+        FROM (
+            SELECT relid, TRUE AS counted FROM pg_partition_tree(t.oid) WHERE isleaf
+            UNION SELECT t.oid, t.relkind = 'r'
+        ) tree
+        JOIN pg_class pc ON pc.oid = tree.relid
+        LEFT JOIN pg_stat_user_tables s ON s.relid = pc.oid;
+        table_name := t.relname;
+        is_exact := exact;
+        IF exact THEN
+            EXECUTE format('SELECT COUNT(*) FROM %I', t.relname) INTO row_count;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DELIVERY_SETTLEMENT_SQL = """
+-- Delivery settlement: mark orders Delivered and credit their riders in one
+-- statement. deliveries is a JSON array of {"order_id", "rider_id", "amount"}
+-- objects. Only orders still Out for Delivery with that rider change, and only
+-- those are credited, so a repeated or stale call pays nothing. Returns one row
+-- per delivered order with its routing columns and the rider's new totals.
+CREATE OR REPLACE FUNCTION deliver_orders(deliveries JSONB)
+RETURNS TABLE (
+    id TEXT,
+    status TEXT,
+    shop_id INTEGER,
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP,
+    earnings DECIMAL(10,2),
+    completed_orders INTEGER
+) AS $$
+    WITH delivered AS (
+        UPDATE orders o SET status = 'Delivered'
+        FROM jsonb_to_recordset(deliveries) AS d(order_id TEXT, rider_id TEXT, amount NUMERIC)
+        WHERE o.id = d.order_id AND o.rider_id = d.rider_id AND o.status = 'Out for Delivery'
+        RETURNING o.id, o.status, o.shop_id, o.user_id, o.rider_id, o.created_at, d.amount
+    ), credited AS (
+        UPDATE riders r
+        SET earnings = COALESCE(r.earnings, 0) + c.amount,
+            completed_orders = COALESCE(r.completed_orders, 0) + c.deliveries
+        FROM (
+            SELECT x.rider_id, SUM(x.amount) AS amount, COUNT(*)::INTEGER AS deliveries
+            FROM delivered x
+            GROUP BY x.rider_id
+        ) c
+        WHERE r.id = c.rider_id
+        RETURNING r.id, r.earnings, r.completed_orders
+    )
+    SELECT d.id, d.status, d.shop_id, d.user_id, d.rider_id, d.created_at,
+           c.earnings, c.completed_orders
+    FROM delivered d LEFT JOIN credited c ON c.id = d.rider_id;
+$$ LANGUAGE sql;
+
+NOTIFY pgrst, 'reload schema';
+"""
+
+ORDER_IDS_SQL = """
+-- Order ids are unique again. Partitioning made the orders key (id,
+-- created_at) and dropped the order_items foreign key, so nothing stopped two
+-- orders sharing an id. Every order id is now registered once in order_ids:
+-- inserting an order registers its id, so a reused id fails on the order_ids
+-- primary key, and orders, orders_archive and order_items all reference it.
+-- Archiving and partition maintenance move rows without inserting into
+-- orders, so they never register an id twice.
+CREATE TABLE IF NOT EXISTS order_ids (
+    id TEXT PRIMARY KEY
+);
+
 DO $$
+DECLARE
+    duplicate TEXT;
+BEGIN
+    SELECT id INTO duplicate FROM orders_all GROUP BY id HAVING COUNT(*) > 1 LIMIT 1;
+    IF duplicate IS NOT NULL THEN
+        RAISE EXCEPTION 'order id % is used by more than one order; resolve duplicates before migrating', duplicate;
+    END IF;
+END;
+$$;
+
+-- Items left behind by deleted orders keep their ids reserved.
+INSERT INTO order_ids (id)
+SELECT id FROM orders_all
+UNION
+SELECT order_id FROM order_items WHERE order_id IS NOT NULL
+UNION
+SELECT order_id FROM order_items_archive WHERE order_id IS NOT NULL
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION register_order_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO order_ids (id) VALUES (NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Changing created_at could move an order to another partition, which
+-- Postgres does as a delete plus an insert and would register the id again.
+CREATE OR REPLACE FUNCTION freeze_order_key()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'order % cannot change its id or created_at', OLD.id;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_register_id ON orders;
+CREATE TRIGGER orders_register_id BEFORE INSERT ON orders
+    FOR EACH ROW EXECUTE FUNCTION register_order_id();
+DROP TRIGGER IF EXISTS orders_freeze_key ON orders;
+CREATE TRIGGER orders_freeze_key BEFORE UPDATE OF id, created_at ON orders
+    FOR EACH ROW
+    WHEN (OLD.id IS DISTINCT FROM NEW.id OR OLD.created_at IS DISTINCT FROM NEW.created_at)
+    EXECUTE FUNCTION freeze_order_key();
+
+ALTER TABLE orders ADD CONSTRAINT orders_id_fkey
+    FOREIGN KEY (id) REFERENCES order_ids(id);
+ALTER TABLE orders_archive ADD CONSTRAINT orders_archive_id_fkey
+    FOREIGN KEY (id) REFERENCES order_ids(id);
+ALTER TABLE order_items ADD CONSTRAINT order_items_order_id_fkey
+    FOREIGN KEY (order_id) REFERENCES order_ids(id);
+
+-- Checkout names the first id that is taken or repeated instead of failing
+-- on the order_ids primary key halfway through the batch.
+CREATE OR REPLACE FUNCTION place_orders(orders JSONB)
+RETURNS TABLE (order_id TEXT) AS $$
+#variable_conflict use_column
+DECLARE
+    taken TEXT;
+BEGIN
+    SELECT o.id INTO taken
+    FROM jsonb_to_recordset(place_orders.orders) AS o(id TEXT)
+    GROUP BY o.id
+    HAVING COUNT(*) > 1 OR EXISTS (SELECT 1 FROM order_ids r WHERE r.id = o.id)
+    LIMIT 1;
+    IF taken IS NOT NULL THEN
+        RAISE EXCEPTION 'order id % is already in use', taken USING ERRCODE = 'unique_violation';
+    END IF;
+    RETURN QUERY
+    WITH new_orders AS (
+        INSERT INTO orders (id, subtotal, delivery_fee, total_amount, status, date, time, delivery_address, payment_method, shop_id, user_id)
+        SELECT o.id, o.subtotal, o.delivery_fee, o.total_amount, COALESCE(o.status, 'Pending'), o.date, o.time, o.delivery_address, o.payment_method, o.shop_id, o.user_id
+        FROM jsonb_to_recordset(place_orders.orders) AS o(id TEXT, subtotal NUMERIC, delivery_fee NUMERIC, total_amount NUMERIC, status TEXT, date TEXT, time TEXT, delivery_address TEXT, payment_method TEXT, shop_id INTEGER, user_id TEXT)
+        RETURNING orders.id
+    ), new_items AS (
+        INSERT INTO order_items (order_id, product_id, name, price, quantity, image_url)
+        SELECT o->>'id', i.product_id, i.name, i.price, i.quantity, i.image_url
+        FROM jsonb_array_elements(place_orders.orders) AS o,
+             jsonb_to_recordset(o->'items') AS i(product_id INTEGER, name TEXT, price NUMERIC, quantity INTEGER, image_url TEXT)
+    )
+    SELECT n.id FROM new_orders n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- archive_orders now checks that every order it moved left nothing behind
+-- in orders or order_items before it commits the batch.
+CREATE OR REPLACE FUNCTION archive_orders(
+    older_than INTERVAL DEFAULT '180 days', batch_size INTEGER DEFAULT 5000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved_ids TEXT[];
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(7316022) THEN
+        RETURN 0;
+    END IF;
+    PERFORM ensure_order_partitions();
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WITH batch AS (
+        SELECT id, created_at FROM orders
+        WHERE created_at < NOW() - older_than AND status IN ('Delivered', 'Completed')
+        ORDER BY created_at
+        LIMIT batch_size
+    ), moved_orders AS (
+        DELETE FROM orders o USING batch b
+        WHERE o.id = b.id AND o.created_at = b.created_at
+        RETURNING o.*
+    ), archived AS (
+        INSERT INTO orders_archive SELECT * FROM moved_orders
+        RETURNING id
+    ), moved_items AS (
+        DELETE FROM order_items i USING archived a
+        WHERE i.order_id = a.id
+        RETURNING i.*
+    ), archived_items AS (
+        INSERT INTO order_items_archive SELECT * FROM moved_items
+    )
+    SELECT COALESCE(array_agg(id), '{}') INTO moved_ids FROM archived;
+    IF EXISTS (SELECT 1 FROM orders WHERE id = ANY(moved_ids))
+       OR EXISTS (SELECT 1 FROM order_items WHERE order_id = ANY(moved_ids)) THEN
+        RAISE EXCEPTION 'archive_orders left rows behind for archived orders';
+    END IF;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN cardinality(moved_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION purge_orders()
+RETURNS VOID AS $$
+    TRUNCATE order_items, orders, order_items_archive, orders_archive, order_ids,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION reset_app_data()
+RETURNS VOID AS $$
+    TRUNCATE order_items, payouts, addresses, orders, products, shops, categories,
+             coupons, riders, users, order_items_archive, orders_archive, order_ids,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+NOTIFY pgrst, 'reload schema';
+"""
+
+MIGRATIONS = [
+    Migration(1, "base tables", BASE_TABLES_SQL),
+    Migration(2, "storefront, settlement and checkout functions", FUNCTIONS_SQL),
+    Migration(3, "hot path indexes", INDEXES_SQL, online=True),
+    Migration(4, "shop daily stats", DAILY_STATS_SQL),
+    Migration(5, "revenue rollups", REVENUE_ROLLUPS_SQL),
+    Migration(6, "table stats function", TABLE_STATS_SQL),
+    Migration(7, "truncate fast paths", TRUNCATE_SQL),
+    Migration(8, "partition orders by month", PARTITION_ORDERS_SQL),
+    Migration(9, "order change feed", ORDER_FEED_SQL),
+    Migration(10, "shop and rider coordinates", GEO_SQL),
+    Migration(11, "rollup catch-up status", ROLLUP_STATUS_SQL),
+    Migration(12, "partition-aware table stats", PARTITION_TABLE_STATS_SQL),
+    Migration(13, "delivery settlement", DELIVERY_SETTLEMENT_SQL),
+    Migration(14, "order id registry", ORDER_IDS_SQL),
+]
+SCHEMA_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT NOW()
+);
+"""
+
+# The schema as of migration SCHEMA_VERSION, written once in its final state
+# for new databases: the Supabase SQL editor and schema.sql run this instead
+# of replaying the migrations. Every statement can be run again. It records
+# the migrations it covers, so migrate() only applies later ones. A new
+# migration must be folded in here and SCHEMA_VERSION bumped; the tests check
+# that SCHEMA_VERSION is the latest migration.
+SCHEMA_VERSION = 14
+SCHEMA_SQL = (
+    """
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    slug TEXT UNIQUE NOT NULL,
+    icon TEXT,
+    color_bg TEXT,
+    is_active BOOLEAN DEFAULT TRUE,
+    sort_order INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS shops (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    category_slug TEXT,
+    rating DECIMAL(2,1) DEFAULT 5.0,
+    delivery_time TEXT,
+    distance TEXT,
+    image_url TEXT,
+    address TEXT,
+    is_featured BOOLEAN DEFAULT FALSE,
+    is_active BOOLEAN DEFAULT TRUE,
+    commission_rate DECIMAL(5,2) DEFAULT 10.0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    phone TEXT,
+    role TEXT DEFAULT 'customer',
+    password_hash TEXT NOT NULL,
+    avatar_url TEXT,
+    shop_id INTEGER REFERENCES shops(id),
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id SERIAL PRIMARY KEY,
+    shop_id INTEGER REFERENCES shops(id),
+    name TEXT NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    original_price DECIMAL(10,2),
+    image_url TEXT,
+    description TEXT,
+    is_available BOOLEAN DEFAULT TRUE,
+    unit TEXT,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Every order id is registered here once, by the orders_register_id trigger,
+-- so ids stay unique even though the partitioned orders key has to include
+-- created_at. orders, orders_archive and order_items all reference it.
+CREATE TABLE IF NOT EXISTS order_ids (
+    id TEXT PRIMARY KEY
+);
+
+-- Orders are range-partitioned by created_at month, so the customer, shop and
+-- rider listings, which only read recent orders by default, prune to the last
+-- few partitions. Rows outside every monthly partition land in orders_default
+-- until ensure_order_partitions() creates their month.
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT NOT NULL REFERENCES order_ids(id),
+    subtotal DECIMAL(10,2) NOT NULL,
+    delivery_fee DECIMAL(10,2) DEFAULT 15.0,
+    total_amount DECIMAL(10,2) NOT NULL,
+    status TEXT DEFAULT 'Pending',
+    date TEXT,
+    time TEXT,
+    delivery_address TEXT,
+    payment_method TEXT,
+    shop_id INTEGER REFERENCES shops(id),
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT;
+
+CREATE TABLE IF NOT EXISTS order_items (
+    id SERIAL PRIMARY KEY,
+    order_id TEXT REFERENCES order_ids(id),
+    product_id INTEGER,
+    name TEXT,
+    price DECIMAL(10,2),
+    quantity INTEGER,
+    image_url TEXT
+);
+
+-- Cold storage for finished orders; archive_orders() moves them here.
+CREATE TABLE IF NOT EXISTS orders_archive (
+    id TEXT PRIMARY KEY REFERENCES order_ids(id),
+    subtotal DECIMAL(10,2) NOT NULL,
+    delivery_fee DECIMAL(10,2) DEFAULT 15.0,
+    total_amount DECIMAL(10,2) NOT NULL,
+    status TEXT DEFAULT 'Pending',
+    date TEXT,
+    time TEXT,
+    delivery_address TEXT,
+    payment_method TEXT,
+    shop_id INTEGER,
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    id INTEGER PRIMARY KEY,
+    order_id TEXT REFERENCES orders_archive(id),
+    product_id INTEGER,
+    name TEXT,
+    price DECIMAL(10,2),
+    quantity INTEGER,
+    image_url TEXT
+);
+
+CREATE TABLE IF NOT EXISTS riders (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    phone TEXT,
+    vehicle_type TEXT,
+    status TEXT DEFAULT 'Offline',
+    earnings DECIMAL(10,2) DEFAULT 0,
+    completed_orders INTEGER DEFAULT 0,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    location_updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS coupons (
+    code TEXT PRIMARY KEY,
+    discount DECIMAL(10,2),
+    type TEXT,
+    min_order DECIMAL(10,2),
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS addresses (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    type TEXT,
+    address TEXT,
+    phone TEXT
+);
+
+CREATE TABLE IF NOT EXISTS payouts (
+    id TEXT PRIMARY KEY,
+    date TEXT,
+    order_id TEXT,
+    order_amount DECIMAL(10,2),
+    commission DECIMAL(10,2),
+    payout_amount DECIMAL(10,2),
+    status TEXT
+);
+
+-- Dashboard counters: one row per (day, shop) kept current by a trigger on
+-- orders. An order contributes to revenue unless it is Cancelled, and to
+-- delivered_revenue (its subtotal) once it is Delivered or Completed.
+CREATE TABLE IF NOT EXISTS shop_daily_stats (
+    day DATE NOT NULL,
+    shop_id INTEGER NOT NULL,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    delivered_count INTEGER NOT NULL DEFAULT 0,
+    delivered_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    cancelled_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, shop_id)
+);
+
+-- Revenue rollups per hour and per day, for each shop and platform-wide
+-- (shop_id 0), maintained by refresh_revenue_rollups().
+CREATE TABLE IF NOT EXISTS revenue_rollups (
+    granularity TEXT NOT NULL CHECK (granularity IN ('hour', 'day')),
+    shop_id INTEGER NOT NULL,
+    bucket TIMESTAMP NOT NULL,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    gmv DECIMAL(14,2) NOT NULL DEFAULT 0,
+    commission DECIMAL(14,2) NOT NULL DEFAULT 0,
+    delivery_fees DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, shop_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name TEXT PRIMARY KEY,
+    rolled_up_to TIMESTAMP NOT NULL
+);
+
+-- Hot-path indexes: one composite index per DatabaseManager query shape. The
+-- order listings filter on one column and page by (created_at, id) newest
+-- first, so the index order matches the ORDER BY and no sort is needed.
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_shop_created ON orders (shop_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_rider_created ON orders (rider_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders (status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_products_shop_available ON products (shop_id, id) WHERE is_available;
+CREATE INDEX IF NOT EXISTS idx_shops_category_active ON shops (category_slug, id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_orders_archive_created ON orders_archive (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_user_created ON orders_archive (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_shop_created ON orders_archive (shop_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_rider_created ON orders_archive (rider_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_items_archive_order_id ON order_items_archive (order_id);
+
+CREATE OR REPLACE VIEW orders_all AS
+SELECT * FROM orders
+UNION ALL
+SELECT * FROM orders_archive;
+
+-- Storefront bootstrap: categories, active shops and available products in one
+-- round trip, projected to the columns the storefront cards render. The version
+-- is a hash of the document, so callers that pass the version they already hold
+-- get back {"unchanged": true} instead of the data.
+CREATE OR REPLACE FUNCTION storefront_bootstrap(known_version TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    payload JSONB;
+    payload_version TEXT;
+BEGIN
+    SELECT jsonb_build_object(
+        'categories', COALESCE((SELECT jsonb_agg(c ORDER BY c.sort_order, c.id) FROM categories c WHERE c.is_active), '[]'::jsonb),
+        'shops', COALESCE((SELECT jsonb_agg(to_jsonb(s) ORDER BY s.id) FROM (
+            SELECT id, name, category_slug, rating, delivery_time, distance, image_url, address, is_featured
+            FROM shops WHERE is_active) s), '[]'::jsonb),
+        'products', COALESCE((SELECT jsonb_agg(to_jsonb(p) ORDER BY p.id) FROM (
+            SELECT id, shop_id, name, price, original_price, image_url, unit, is_available
+            FROM products WHERE is_available) p), '[]'::jsonb)
+    ) INTO payload;
+    payload_version := md5(payload::text);
+    IF known_version IS NOT DISTINCT FROM payload_version THEN
+        RETURN jsonb_build_object('version', payload_version, 'unchanged', TRUE);
+    END IF;
+    RETURN payload || jsonb_build_object('version', payload_version, 'unchanged', FALSE);
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Rider settlement: credit earnings and completed deliveries in one atomic
+-- UPDATE. credits is a JSON array of {"rider_id", "amount", "deliveries"}
+-- objects; several credits for the same rider are summed first.
+CREATE OR REPLACE FUNCTION settle_rider_deliveries(credits JSONB)
+RETURNS SETOF riders AS $$
+    UPDATE riders r
+    SET earnings = COALESCE(r.earnings, 0) + c.amount,
+        completed_orders = COALESCE(r.completed_orders, 0) + c.deliveries
+    FROM (
+        SELECT rider_id, SUM(amount) AS amount, SUM(COALESCE(deliveries, 1))::INTEGER AS deliveries
+        FROM jsonb_to_recordset(credits) AS x(rider_id TEXT, amount NUMERIC, deliveries INTEGER)
+        GROUP BY rider_id
+    ) c
+    WHERE r.id = c.rider_id
+    RETURNING r.*;
+$$ LANGUAGE sql;
+
+-- Delivery settlement: mark orders Delivered and credit their riders in one
+-- statement. deliveries is a JSON array of {"order_id", "rider_id", "amount"}
+-- objects. Only orders still Out for Delivery with that rider change, and only
+-- those are credited, so a repeated or stale call pays nothing. Returns one row
+-- per delivered order with its routing columns and the rider's new totals.
+CREATE OR REPLACE FUNCTION deliver_orders(deliveries JSONB)
+RETURNS TABLE (
+    id TEXT,
+    status TEXT,
+    shop_id INTEGER,
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP,
+    earnings DECIMAL(10,2),
+    completed_orders INTEGER
+) AS $$
+    WITH delivered AS (
+        UPDATE orders o SET status = 'Delivered'
+        FROM jsonb_to_recordset(deliveries) AS d(order_id TEXT, rider_id TEXT, amount NUMERIC)
+        WHERE o.id = d.order_id AND o.rider_id = d.rider_id AND o.status = 'Out for Delivery'
+        RETURNING o.id, o.status, o.shop_id, o.user_id, o.rider_id, o.created_at, d.amount
+    ), credited AS (
+        UPDATE riders r
+        SET earnings = COALESCE(r.earnings, 0) + c.amount,
+            completed_orders = COALESCE(r.completed_orders, 0) + c.deliveries
+        FROM (
+            SELECT x.rider_id, SUM(x.amount) AS amount, COUNT(*)::INTEGER AS deliveries
+            FROM delivered x
+            GROUP BY x.rider_id
+        ) c
+        WHERE r.id = c.rider_id
+        RETURNING r.id, r.earnings, r.completed_orders
+    )
+    SELECT d.id, d.status, d.shop_id, d.user_id, d.rider_id, d.created_at,
+           c.earnings, c.completed_orders
+    FROM delivered d LEFT JOIN credited c ON c.id = d.rider_id;
+$$ LANGUAGE sql;
+
+-- Transactional checkout: insert every split order and all of its items in one
+-- statement, so a failure leaves no orphan orders. orders is a JSON array of
+-- order objects, each carrying its line items under "items". The first id that
+-- is taken or repeated is named instead of failing on the order_ids key.
+CREATE OR REPLACE FUNCTION place_orders(orders JSONB)
+RETURNS TABLE (order_id TEXT) AS $$
+#variable_conflict use_column
+DECLARE
+    taken TEXT;
+BEGIN
+    SELECT o.id INTO taken
+    FROM jsonb_to_recordset(place_orders.orders) AS o(id TEXT)
+    GROUP BY o.id
+    HAVING COUNT(*) > 1 OR EXISTS (SELECT 1 FROM order_ids r WHERE r.id = o.id)
+    LIMIT 1;
+    IF taken IS NOT NULL THEN
+        RAISE EXCEPTION 'order id % is already in use', taken USING ERRCODE = 'unique_violation';
+    END IF;
+    RETURN QUERY
+    WITH new_orders AS (
+        INSERT INTO orders (id, subtotal, delivery_fee, total_amount, status, date, time, delivery_address, payment_method, shop_id, user_id)
+        SELECT o.id, o.subtotal, o.delivery_fee, o.total_amount, COALESCE(o.status, 'Pending'), o.date, o.time, o.delivery_address, o.payment_method, o.shop_id, o.user_id
+        FROM jsonb_to_recordset(place_orders.orders) AS o(id TEXT, subtotal NUMERIC, delivery_fee NUMERIC, total_amount NUMERIC, status TEXT, date TEXT, time TEXT, delivery_address TEXT, payment_method TEXT, shop_id INTEGER, user_id TEXT)
+        RETURNING orders.id
+    ), new_items AS (
+        INSERT INTO order_items (order_id, product_id, name, price, quantity, image_url)
+        SELECT o->>'id', i.product_id, i.name, i.price, i.quantity, i.image_url
+        FROM jsonb_array_elements(place_orders.orders) AS o,
+             jsonb_to_recordset(o->'items') AS i(product_id INTEGER, name TEXT, price NUMERIC, quantity INTEGER, image_url TEXT)
+    )
+    SELECT n.id FROM new_orders n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- PostgREST embeds order_items(...) through this computed relationship, since
+-- order_items references order_ids rather than the partitioned orders table.
+CREATE OR REPLACE FUNCTION order_items(orders)
+RETURNS SETOF order_items ROWS 4 AS $$
+    SELECT * FROM order_items WHERE order_id = $1.id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION ensure_order_partitions(
+    from_month DATE DEFAULT NOW()::DATE, months_ahead INTEGER DEFAULT 2
+)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month)::DATE;
+    last_month DATE := (date_trunc('month', NOW()) + make_interval(months => months_ahead))::DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Rows moved out of the default partition are not new orders.
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WHILE month_start <= last_month LOOP
+        partition_name := 'orders_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM orders_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, (month_start + INTERVAL '1 month')::DATE, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_order_partitions();
+
+-- The business day of an order: its "date" text when it is an ISO date,
+-- otherwise the day it was created.
+CREATE OR REPLACE FUNCTION order_stats_day(order_date TEXT, created_at TIMESTAMP)
+RETURNS DATE AS $$
+    SELECT CASE WHEN order_date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+                THEN order_date::DATE ELSE COALESCE(created_at, NOW())::DATE END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add (sign = 1) or remove (sign = -1) one order's contribution.
+CREATE OR REPLACE FUNCTION apply_order_stats(
+    order_date TEXT, created_at TIMESTAMP, shop_id INTEGER, status TEXT,
+    total_amount NUMERIC, subtotal NUMERIC, sign INTEGER
+)
+RETURNS VOID AS $$
+    INSERT INTO shop_daily_stats AS s (day, shop_id, orders_count, revenue, delivered_count, delivered_revenue, cancelled_count)
+    VALUES (
+        order_stats_day(order_date, created_at),
+        COALESCE(shop_id, 0),
+        sign,
+        sign * CASE WHEN status = 'Cancelled' THEN 0 ELSE COALESCE(total_amount, 0) END,
+        sign * CASE WHEN status IN ('Delivered', 'Completed') THEN 1 ELSE 0 END,
+        sign * CASE WHEN status IN ('Delivered', 'Completed') THEN COALESCE(subtotal, 0) ELSE 0 END,
+        sign * CASE WHEN status = 'Cancelled' THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (day, shop_id) DO UPDATE SET
+        orders_count = s.orders_count + EXCLUDED.orders_count,
+        revenue = s.revenue + EXCLUDED.revenue,
+        delivered_count = s.delivered_count + EXCLUDED.delivered_count,
+        delivered_revenue = s.delivered_revenue + EXCLUDED.delivered_revenue,
+        cancelled_count = s.cancelled_count + EXCLUDED.cancelled_count;
+$$ LANGUAGE sql;
+
+-- Archiving and partition maintenance set minidrop.skip_order_stats: moving
+-- an order between tables does not change what it contributed.
+CREATE OR REPLACE FUNCTION orders_daily_stats_trigger()
+RETURNS TRIGGER AS $$
 BEGIN
-    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'orders' AND column_name = 'rider_id') THEN
-        ALTER TABLE orders ADD COLUMN rider_id TEXT;
+    IF current_setting('minidrop.skip_order_stats', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_order_stats(OLD.date, OLD.created_at, OLD.shop_id, OLD.status, OLD.total_amount, OLD.subtotal, -1);
     END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_order_stats(NEW.date, NEW.created_at, NEW.shop_id, NEW.status, NEW.total_amount, NEW.subtotal, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
-    IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'shops' AND column_name = 'commission_rate') THEN
-        ALTER TABLE shops ADD COLUMN commission_rate DECIMAL(5,2) DEFAULT 10.0;
+-- Publishes order changes on the order_changes channel for the app's LISTEN
+-- connection. The payload carries only the columns that decide which screens
+-- show an order, well under the 8000 byte NOTIFY limit; listeners fetch the
+-- rest. Bulk loads set minidrop.skip_order_feed and send one RESYNC instead,
+-- and archive moves (minidrop.skip_order_stats) are not changes to the order.
+CREATE OR REPLACE FUNCTION orders_notify_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('order_changes', '{"op": "TRUNCATE"}');
+        RETURN NULL;
+    END IF;
+    IF current_setting('minidrop.skip_order_stats', true) = 'on'
+       OR current_setting('minidrop.skip_order_feed', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    PERFORM pg_notify('order_changes', json_build_object(
+        'op', TG_OP, 'id', r.id, 'status', r.status, 'shop_id', r.shop_id,
+        'user_id', r.user_id, 'rider_id', r.rider_id, 'created_at', r.created_at
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION register_order_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO order_ids (id) VALUES (NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Changing created_at could move an order to another partition, which
+-- Postgres does as a delete plus an insert and would register the id again.
+CREATE OR REPLACE FUNCTION freeze_order_key()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'order % cannot change its id or created_at', OLD.id;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_register_id ON orders;
+CREATE TRIGGER orders_register_id BEFORE INSERT ON orders
+    FOR EACH ROW EXECUTE FUNCTION register_order_id();
+DROP TRIGGER IF EXISTS orders_freeze_key ON orders;
+CREATE TRIGGER orders_freeze_key BEFORE UPDATE OF id, created_at ON orders
+    FOR EACH ROW
+    WHEN (OLD.id IS DISTINCT FROM NEW.id OR OLD.created_at IS DISTINCT FROM NEW.created_at)
+    EXECUTE FUNCTION freeze_order_key();
+DROP TRIGGER IF EXISTS orders_daily_stats_write ON orders;
+CREATE TRIGGER orders_daily_stats_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_daily_stats_trigger();
+DROP TRIGGER IF EXISTS orders_daily_stats_update ON orders;
+CREATE TRIGGER orders_daily_stats_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.total_amount IS DISTINCT FROM NEW.total_amount
+          OR OLD.subtotal IS DISTINCT FROM NEW.subtotal
+          OR OLD.shop_id IS DISTINCT FROM NEW.shop_id
+          OR OLD.date IS DISTINCT FROM NEW.date)
+    EXECUTE FUNCTION orders_daily_stats_trigger();
+DROP TRIGGER IF EXISTS orders_notify_write ON orders;
+CREATE TRIGGER orders_notify_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_notify_trigger();
+DROP TRIGGER IF EXISTS orders_notify_update ON orders;
+CREATE TRIGGER orders_notify_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.rider_id IS DISTINCT FROM NEW.rider_id)
+    EXECUTE FUNCTION orders_notify_trigger();
+DROP TRIGGER IF EXISTS orders_notify_truncate ON orders;
+CREATE TRIGGER orders_notify_truncate AFTER TRUNCATE ON orders
+    FOR EACH STATEMENT EXECUTE FUNCTION orders_notify_trigger();
+
+-- Moves Delivered and Completed orders older than older_than, with their
+-- items, to the archive tables in batches, and checks that every moved order
+-- left nothing behind. Returns the number of orders moved, 0 when another
+-- worker holds the job lock.
+CREATE OR REPLACE FUNCTION archive_orders(
+    older_than INTERVAL DEFAULT '180 days', batch_size INTEGER DEFAULT 5000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved_ids TEXT[];
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(7316022) THEN
+        RETURN 0;
+    END IF;
+    PERFORM ensure_order_partitions();
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WITH batch AS (
+        SELECT id, created_at FROM orders
+        WHERE created_at < NOW() - older_than AND status IN ('Delivered', 'Completed')
+        ORDER BY created_at
+        LIMIT batch_size
+    ), moved_orders AS (
+        DELETE FROM orders o USING batch b
+        WHERE o.id = b.id AND o.created_at = b.created_at
+        RETURNING o.*
+    ), archived AS (
+        INSERT INTO orders_archive SELECT * FROM moved_orders
+        RETURNING id
+    ), moved_items AS (
+        DELETE FROM order_items i USING archived a
+        WHERE i.order_id = a.id
+        RETURNING i.*
+    ), archived_items AS (
+        INSERT INTO order_items_archive SELECT * FROM moved_items
+    )
+    SELECT COALESCE(array_agg(id), '{}') INTO moved_ids FROM archived;
+    IF EXISTS (SELECT 1 FROM orders WHERE id = ANY(moved_ids))
+       OR EXISTS (SELECT 1 FROM order_items WHERE order_id = ANY(moved_ids)) THEN
+        RAISE EXCEPTION 'archive_orders left rows behind for archived orders';
+    END IF;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN cardinality(moved_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recomputes every rollup bucket from the start of the day before the
+-- watermark, so late status changes are picked up, and advances the watermark
+-- by at most max_span per call. rolled_up_to is the new watermark, or NULL
+-- when another worker holds the job lock or there are no orders yet;
+-- caught_up is false while older history is still waiting for another step.
+CREATE OR REPLACE FUNCTION refresh_revenue_rollups(
+    lookback INTERVAL DEFAULT '1 day',
+    max_span INTERVAL DEFAULT '31 days',
+    OUT rolled_up_to TIMESTAMP,
+    OUT caught_up BOOLEAN
+) AS $$
+DECLARE
+    done_to TIMESTAMP;
+    from_ts TIMESTAMP;
+    to_ts TIMESTAMP;
+BEGIN
+    caught_up := TRUE;
+    IF NOT pg_try_advisory_xact_lock(7316019) THEN
+        RETURN;
     END IF;
-END $$;
+    SELECT w.rolled_up_to INTO done_to FROM rollup_watermarks w WHERE w.name = 'revenue';
+    IF done_to IS NULL THEN
+        SELECT MIN(created_at) + lookback INTO done_to FROM orders_all;
+        IF done_to IS NULL THEN
+            RETURN;
+        END IF;
+    END IF;
+    from_ts := date_trunc('day', done_to - lookback);
+    to_ts := LEAST(NOW()::TIMESTAMP, from_ts + max_span);
+
+    DELETE FROM revenue_rollups
+    WHERE granularity IN ('hour', 'day') AND bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'hour',
+           CASE WHEN GROUPING(o.shop_id) = 1 THEN 0 ELSE o.shop_id END,
+           date_trunc('hour', o.created_at),
+           COUNT(*),
+           COALESCE(SUM(o.total_amount), 0),
+           COALESCE(SUM(o.subtotal * COALESCE(s.commission_rate, 10) / 100), 0),
+           COALESCE(SUM(o.delivery_fee), 0)
+    FROM orders_all o LEFT JOIN shops s ON s.id = o.shop_id
+    WHERE o.created_at >= from_ts AND o.created_at < to_ts
+      AND o.status IS DISTINCT FROM 'Cancelled'
+    GROUP BY GROUPING SETS ((date_trunc('hour', o.created_at), o.shop_id), (date_trunc('hour', o.created_at)))
+    HAVING GROUPING(o.shop_id) = 1 OR o.shop_id IS NOT NULL;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'day', r.shop_id, date_trunc('day', r.bucket),
+           SUM(r.orders_count), SUM(r.gmv), SUM(r.commission), SUM(r.delivery_fees)
+    FROM revenue_rollups r
+    WHERE r.granularity = 'hour' AND r.bucket >= from_ts AND r.bucket < to_ts
+    GROUP BY r.shop_id, date_trunc('day', r.bucket);
+
+    INSERT INTO rollup_watermarks (name, rolled_up_to) VALUES ('revenue', to_ts)
+    ON CONFLICT (name) DO UPDATE SET rolled_up_to = EXCLUDED.rolled_up_to;
+    rolled_up_to := to_ts;
+    caught_up := to_ts >= NOW()::TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row counts, sizes and dead-tuple bloat for every table in one round trip.
+-- Counts come from the planner's pg_class estimates (falling back to the
+-- statistics collector for never-analysed tables) unless exact is true, in
+-- which case each table is counted in full. Partitioned tables report the
+-- totals of their leaf partitions, and the partitions themselves are not
+-- listed.
+CREATE OR REPLACE FUNCTION table_stats(exact BOOLEAN DEFAULT FALSE)
+RETURNS TABLE (
+    table_name TEXT,
+    row_count BIGINT,
+    is_exact BOOLEAN,
+    table_bytes BIGINT,
+    index_bytes BIGINT,
+    dead_rows BIGINT,
+    bloat_ratio NUMERIC,
+    last_vacuum TIMESTAMPTZ,
+    last_analyze TIMESTAMPTZ
+) AS $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT c.oid, c.relname, c.relkind
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+        ORDER BY c.relname
+    LOOP
+        SELECT
+            COALESCE(SUM(CASE WHEN NOT tree.counted THEN 0
+                              WHEN pc.reltuples >= 0 THEN pc.reltuples::BIGINT
+                              ELSE COALESCE(s.n_live_tup, 0) END), 0),
+            SUM(pg_table_size(pc.oid)),
+            SUM(pg_indexes_size(pc.oid)),
+            SUM(CASE WHEN tree.counted THEN COALESCE(s.n_dead_tup, 0) ELSE 0 END),
+            ROUND(SUM(CASE WHEN tree.counted THEN COALESCE(s.n_dead_tup, 0) ELSE 0 END)::NUMERIC
+                  / NULLIF(SUM(CASE WHEN tree.counted
+                                    THEN COALESCE(s.n_live_tup, 0) + COALESCE(s.n_dead_tup, 0)
+                                    ELSE 0 END), 0), 4),
+            MAX(GREATEST(s.last_vacuum, s.last_autovacuum)),
+            MAX(GREATEST(s.last_analyze, s.last_autoanalyze))
+        INTO row_count, table_bytes, index_bytes, dead_rows, bloat_ratio, last_vacuum, last_analyze
+        FROM (
+            SELECT relid, TRUE AS counted FROM pg_partition_tree(t.oid) WHERE isleaf
+            UNION SELECT t.oid, t.relkind = 'r'
+        ) tree
+        JOIN pg_class pc ON pc.oid = tree.relid
+        LEFT JOIN pg_stat_user_tables s ON s.relid = pc.oid;
+        table_name := t.relname;
+        is_exact := exact;
+        IF exact THEN
+            EXECUTE format('SELECT COUNT(*) FROM %I', t.relname) INTO row_count;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Constant-time purges. TRUNCATE skips row triggers, so the order-derived
+-- stats and rollups are emptied alongside the orders they were built from.
+CREATE OR REPLACE FUNCTION purge_orders()
+RETURNS VOID AS $$
+    TRUNCATE order_items, orders, order_items_archive, orders_archive, order_ids,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION reset_app_data()
+RETURNS VOID AS $$
+    TRUNCATE order_items, payouts, addresses, orders, products, shops, categories,
+             coupons, riders, users, order_items_archive, orders_archive, order_ids,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+-- None of the maintenance functions may be callable through the public API
+-- roles.
+REVOKE EXECUTE ON FUNCTION purge_orders() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION reset_app_data() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION purge_orders() FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION reset_app_data() FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION purge_orders() TO service_role;
+        GRANT EXECUTE ON FUNCTION reset_app_data() TO service_role;
+        GRANT EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) TO service_role;
+        GRANT EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) TO service_role;
+    END IF;
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
 """
+    + SCHEMA_VERSION_SQL
+    + "INSERT INTO schema_migrations (version, name, checksum) VALUES\n"
+    + ",\n".join(
+        f"({m.version}, '{m.name}', '{m.checksum}')"
+        for m in MIGRATIONS
+        if m.version <= SCHEMA_VERSION
+    )
+    + "\nON CONFLICT (version) DO NOTHING;\n"
+)
+
+SAMPLE_DATA_SQL = """
+-- Insert Users (password for all: password123)
+INSERT INTO users (id, name, email, phone, role, password_hash) VALUES
+('user_001', 'Admin User', 'admin@minidrop.com', '9999999999', 'admin', '$2b$12$aUj9a/s.iL.YOXA2eS9zAuQv4Y0WwmkbMjWQsfF92KuBaN/dC/uw6'),
+('user_002', 'Shop Owner', 'owner@freshmart.com', '8888888888', 'shop_owner', '$2b$12$gAX9bshUNxx5iNLZcNJstuQCCt.4SkIyZfb.WoDnjGxlNj9eapJ1S'),
+('user_003', 'John Doe', 'customer@example.com', '7777777777', 'customer', '$2b$12$RR44h7OlXPFR6V.IrSRC2enhLCuIYdvQTUyKnBpVnHneNxMUJN6lC')
+ON CONFLICT (email) DO NOTHING;
+
+-- Insert Categories
+INSERT INTO categories (name, slug, icon, color_bg, sort_order) VALUES
+('Groceries', 'grocery', 'shopping-basket', 'bg-green-100', 1),
+('Snacks', 'snacks', 'cookie', 'bg-orange-100', 2),
+('Dairy', 'dairy', 'milk', 'bg-blue-100', 3),
+('Medicines', 'medical', 'pill', 'bg-red-100', 4),
+('Stationery', 'stationery', 'pencil', 'bg-yellow-100', 5),
+('Bakery', 'bakery', 'croissant', 'bg-amber-100', 6)
+ON CONFLICT (slug) DO NOTHING;
+
+-- Insert Shops (only into an empty table: shops have no natural key)
+INSERT INTO shops (name, category_slug, rating, delivery_time, distance, image_url, address, is_featured, latitude, longitude)
+SELECT * FROM (VALUES
+('Fresh Mart Grocery', 'grocery', 4.8, '15-20 min', '0.8 km', 'https://images.unsplash.com/photo-1542838132-92c53300491e?auto=format&fit=crop&w=400&q=80', '12 Main St', TRUE, 12.9770, 77.5990),
+('City Medicos', 'medical', 4.5, '10-15 min', '0.5 km', 'https://images.unsplash.com/photo-1585435557343-3b092031a831?auto=format&fit=crop&w=400&q=80', '45 Park Ave', TRUE, 12.9690, 77.5985),
+('Daily Dairy Needs', 'dairy', 4.9, '10 min', '0.2 km', 'https://images.unsplash.com/photo-1628088062854-d1870b4553da?auto=format&fit=crop&w=400&q=80', '88 Market Rd', FALSE, 12.9730, 77.5930),
+('Student Stationers', 'stationery', 4.2, '25-30 min', '1.5 km', 'https://images.unsplash.com/photo-1550399105-c4db5fb85c18?auto=format&fit=crop&w=400&q=80', 'University Sq', FALSE, 12.9590, 77.5880),
+('Oven Fresh Bakery', 'bakery', 4.7, '20-25 min', '1.2 km', 'https://images.unsplash.com/photo-1509440159596-0249088772ff?auto=format&fit=crop&w=400&q=80', 'Baker St', TRUE, 12.9810, 77.5880)
+) AS v
+WHERE NOT EXISTS (SELECT 1 FROM shops);
+
+-- Insert Products (shop_id references the shops created above)
+INSERT INTO products (shop_id, name, price, original_price, image_url, description, unit)
+SELECT * FROM (VALUES
+(1, 'Full Cream Milk', 32.00, 35.00, 'https://images.unsplash.com/photo-1563636619-e9143da7973b?auto=format&fit=crop&w=200&q=80', 'Fresh full cream milk', '1 L'),
+(1, 'Whole Wheat Bread', 45.00, 50.00, 'https://images.unsplash.com/photo-1598373182133-52452f7691ef?auto=format&fit=crop&w=200&q=80', 'Freshly baked brown bread', '400g'),
+(1, 'Farm Eggs', 65.00, 75.00, 'https://images.unsplash.com/photo-1506976785307-8732e854ad03?auto=format&fit=crop&w=200&q=80', 'Pack of 6 fresh eggs', '6 pcs'),
+(1, 'Maggie Noodles', 14.00, 15.00, 'https://images.unsplash.com/photo-1612929633738-8fe44f7ec841?auto=format&fit=crop&w=200&q=80', 'Instant noodles', '70g'),
+(2, 'Paracetamol 500mg', 20.00, 22.00, 'https://images.unsplash.com/photo-1584308666744-24d5c474f2ae?auto=format&fit=crop&w=200&q=80', 'Fever reducer', 'Strip of 10'),
+(2, 'Cotton Bandage', 30.00, 35.00, 'https://images.unsplash.com/photo-1583947215259-38e31be8751f?auto=format&fit=crop&w=200&q=80', 'Sterile bandage', '1 Roll'),
+(1, 'Lays Classic Salted', 20.00, 20.00, 'https://images.unsplash.com/photo-1566478919030-2609e87011bc?auto=format&fit=crop&w=200&q=80', 'Classic potato chips', '50g'),
+(4, 'Ballpoint Pen Blue', 10.00, 12.00, 'https://images.unsplash.com/photo-1585336261022-680e295ce3fe?auto=format&fit=crop&w=200&q=80', 'Smooth writing pen', '1 pc'),
+(4, 'Spiral Notebook', 55.00, 60.00, 'https://images.unsplash.com/photo-1531346878377-a516a63156a5?auto=format&fit=crop&w=200&q=80', '100 pages ruled', '1 pc')
+) AS v
+WHERE NOT EXISTS (SELECT 1 FROM products);
+
+-- Insert Riders
+INSERT INTO riders (id, name, phone, vehicle_type, status, earnings, completed_orders, latitude, longitude) VALUES
+('r1', 'Rahul Kumar', '9876543210', 'Bike', 'Online', 1250.00, 45, 12.9750, 77.5960),
+('r2', 'Amit Singh', '9876543211', 'Scooter', 'Offline', 890.00, 32, 12.9650, 77.5900)
+ON CONFLICT (id) DO NOTHING;
+
+-- Insert Coupons
+INSERT INTO coupons (code, discount, type, min_order, is_active) VALUES
+('WELCOME50', 50.00, 'Flat', 200.00, TRUE),
+('FRESH20', 20.00, 'Percent', 500.00, TRUE)
+ON CONFLICT (code) DO NOTHING;
+"""
+
+SCHEMA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "schema.sql",
+)
+SCHEMA_FILE_TEMPLATE = """-- ============================================================
+-- Mini Drop - Hyperlocal Delivery Platform Database Schema
+-- ============================================================
+-- This file creates all required tables and inserts sample data
+-- Run this in Supabase SQL Editor: https://supabase.com/dashboard
+-- Generated by `python -m app.utils.migrate_db --write-schema`; edit
+-- SCHEMA_SQL and SAMPLE_DATA_SQL in app/utils/migrate_db.py instead.
+-- ============================================================
+
+-- ============================================================
+-- STEP 1: CREATE TABLES
+-- ============================================================
+{schema}
+-- ============================================================
+-- STEP 2: INSERT SAMPLE DATA
+-- ============================================================
+{sample_data}
+-- ============================================================
+-- STEP 3: VERIFY DATA
+-- ============================================================
+-- Run these queries to verify everything was created:
+-- SELECT * FROM users;
+-- SELECT * FROM categories;
+-- SELECT * FROM shops;
+-- SELECT * FROM products;
+-- SELECT * FROM riders;
+-- SELECT * FROM coupons;
+
+-- ============================================================
+-- LOGIN CREDENTIALS (password: password123)
+-- ============================================================
+-- Admin: admin@minidrop.com
+-- Shop Owner: owner@freshmart.com
+-- Customer: customer@example.com
+-- ============================================================
+"""
+
+
+def render_schema_file() -> str:
+    """Return the contents of schema.sql: SCHEMA_SQL plus the sample data."""
+    return SCHEMA_FILE_TEMPLATE.format(schema=SCHEMA_SQL, sample_data=SAMPLE_DATA_SQL)
+
+
+# pg_advisory_lock key held while migrating, so two deploys never race.
+MIGRATION_LOCK_ID = 7_316_002
+
+
+def applied_migrations(conn) -> dict[int, str]:
+    """Return {version: checksum} for every recorded migration."""
+    if conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar() is None:
+        return {}
+    rows = conn.execute(text("SELECT version, checksum FROM schema_migrations"))
+    return {version: checksum for version, checksum in rows}
+
+
+def _drop_invalid_index(conn, statement: str):
+    """Drop the index a failed concurrent build left behind as INVALID.
+
+    ``CREATE INDEX CONCURRENTLY IF NOT EXISTS`` would otherwise skip it and
+    leave the table without a usable index.
+    """
+    match = re.search(r"IF NOT EXISTS\s+(\w+)", statement)
+    if not match:
+        return
+    invalid = conn.execute(
+        text("""
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name AND NOT i.indisvalid
+        """),
+        {"name": match.group(1)},
+    ).scalar()
+    if invalid:
+        logging.warning(f"Dropping invalid index {match.group(1)} before rebuilding")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}"))
+
+
+def migrate(engine, dry_run: bool = False, target: Optional[int] = None) -> list:
+    """Apply pending migrations in version order, up to ``target`` if given.
+
+    With ``dry_run`` nothing is executed; the pending steps and their SQL are
+    logged instead. Returns the migrations that were (or would be) applied.
+    """
+    with engine.connect() as lock_conn:
+        if not dry_run:
+            lock_conn.execute(
+                text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+            )
+        try:
+            applied = applied_migrations(lock_conn)
+            lock_conn.commit()
+            for migration in MIGRATIONS:
+                recorded = applied.get(migration.version)
+                if recorded and recorded != migration.checksum:
+                    logging.warning(
+                        f"Migration {migration.version} ({migration.name}) changed after it was applied"
+                    )
+            pending = [
+                m
+                for m in MIGRATIONS
+                if m.version not in applied and (target is None or m.version <= target)
+            ]
+            for migration in pending:
+                mode = "online" if migration.online else "transactional"
+                if dry_run:
+                    logging.info(
+                        f"[dry run] would apply {migration.version}: {migration.name} ({mode})"
+                    )
+                    print(migration.sql)
+                    continue
+                logging.info(
+                    f"Applying migration {migration.version}: {migration.name} ({mode})"
+                )
+                if migration.online:
+                    with engine.connect().execution_options(
+                        isolation_level="AUTOCOMMIT"
+                    ) as conn:
+                        for statement in migration.statements:
+                            _drop_invalid_index(conn, statement)
+                            conn.execute(text(statement))
+                with engine.begin() as conn:
+                    conn.execute(text(SCHEMA_VERSION_SQL))
+                    if not migration.online:
+                        conn.execute(text(migration.sql))
+                    conn.execute(
+                        text("""
+                            INSERT INTO schema_migrations (version, name, checksum)
+                            VALUES (:version, :name, :checksum)
+                        """),
+                        {
+                            "version": migration.version,
+                            "name": migration.name,
+                            "checksum": migration.checksum,
+                        },
+                    )
+            if not pending:
+                logging.info("Schema is up to date.")
+            return pending
+        finally:
+            if not dry_run:
+                lock_conn.execute(
+                    text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID}
+                )
+                lock_conn.commit()
+
+
+# Hot queries issued by DatabaseManager, paired with the index each one must use.
+# verify_indexes() runs EXPLAIN on every entry and reports any that fall back
+# to a sequential scan or an explicit sort.
+HOT_QUERIES = [
+    (
+        "all orders page",
+        "idx_orders_created",
+        "SELECT * FROM orders ORDER BY created_at DESC, id DESC LIMIT 21",
+    ),
+    (
+        "all orders next page",
+        "idx_orders_created",
+        """SELECT * FROM orders
+        WHERE created_at < CAST(:created_at AS TIMESTAMP)
+           OR (created_at = CAST(:created_at AS TIMESTAMP) AND id < :id)
+        ORDER BY created_at DESC, id DESC LIMIT 21""",
+    ),
+    (
+        "orders by user",
+        "idx_orders_user_created",
+        "SELECT * FROM orders WHERE user_id = :user_id AND created_at >= :hot_cutoff ORDER BY created_at DESC, id DESC LIMIT 21",
+    ),
+    (
+        "orders by shop",
+        "idx_orders_shop_created",
+        "SELECT * FROM orders WHERE shop_id = :shop_id AND created_at >= :hot_cutoff ORDER BY created_at DESC, id DESC LIMIT 21",
+    ),
+    (
+        "orders by rider",
+        "idx_orders_rider_created",
+        "SELECT * FROM orders WHERE rider_id = :rider_id AND created_at >= :hot_cutoff ORDER BY created_at DESC, id DESC LIMIT 21",
+    ),
+    (
+        "available orders",
+        "idx_orders_status_created",
+        "SELECT * FROM orders WHERE status = 'Ready' AND created_at >= :hot_cutoff ORDER BY created_at DESC",
+    ),
+    (
+        "order items",
+        "idx_order_items_order_id",
+        "SELECT * FROM order_items WHERE order_id = :id",
+    ),
+    (
+        "products by shop",
+        "idx_products_shop_available",
+        "SELECT * FROM products WHERE is_available = TRUE AND shop_id = :shop_id",
+    ),
+    (
+        "shops by category",
+        "idx_shops_category_active",
+        "SELECT * FROM shops WHERE is_active = TRUE AND category_slug = :category_slug",
+    ),
+]
+HOT_QUERY_PARAMS = {
+    "created_at": "2024-01-01 00:00:00",
+    "id": "ORD-0",
+    "hot_cutoff": "2024-01-01 00:00:00",
+    "user_id": "user_003",
+    "shop_id": 1,
+    "rider_id": "r1",
+    "category_slug": "grocery",
+}
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _parent_indexes(conn, names: set) -> set:
+    """Map each partition's index to the partitioned index it was created from."""
+    names = {name for name in names if name}
+    if not names:
+        return set()
+    rows = conn.execute(
+        text("""
+            SELECT c.relname, p.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE c.relkind = 'i' AND c.relname = ANY(:names)
+        """),
+        {"names": sorted(names)},
+    )
+    parents = dict(rows.all())
+    return {parents.get(name, name) for name in names}
+
+
+def verify_indexes(conn) -> list[str]:
+    """EXPLAIN every hot query and return a description of each one that
+    does not use its index.
+
+    Sequential scans are disabled for the check: on a small development
+    database the planner would rightly prefer them, and the question here is
+    whether the index can serve the query at all. A Sort node means the index
+    order no longer matches the query's ORDER BY, unless it sits directly on
+    the Append of an orders partition scan: merging the partitions' index
+    scans is then the planner's choice, not a missing index.
+    """
+    failures = []
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, index, sql in HOT_QUERIES:
+            plan = conn.execute(
+                text(f"EXPLAIN (FORMAT JSON) {sql}"), HOT_QUERY_PARAMS
+            ).scalar()
+            nodes = list(_plan_nodes(plan[0]["Plan"]))
+            used = _parent_indexes(conn, {node.get("Index Name") for node in nodes})
+            if index not in used:
+                failures.append(
+                    f"{name}: expected {index}, plan used {sorted(i for i in used if i) or 'no index'}"
+                )
+            elif any(
+                node["Node Type"] == "Sort"
+                and node["Plans"][0]["Node Type"] != "Append"
+                for node in nodes
+            ):
+                failures.append(
+                    f"{name}: {index} is used but the result is still sorted"
+                )
+    finally:
+        # Rolling back the savepoint also undoes SET LOCAL.
+        savepoint.rollback()
+    return failures
+
+
+def check_indexes() -> bool:
+    """Connect with REFLEX_DB_URL / DATABASE_URL and verify the hot-path indexes."""
+    db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+    if not db_url:
+        print_setup_instructions()
+        return False
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        failures = verify_indexes(conn)
+    engine.dispose()
+    for failure in failures:
+        logging.error(f"❌ {failure}")
+    if not failures:
+        logging.info(f"✅ All {len(HOT_QUERIES)} hot queries use their indexes.")
+    return not failures
 
 
 def print_setup_instructions():
@@ -218,8 +2332,8 @@ If you cannot connect from this script, you can run the SQL schema manually:""")
     )
 
 
-def run_migration():
-    """Run the database migration and seeding."""
+def run_migration(dry_run: bool = False, target: Optional[int] = None):
+    """Run pending schema migrations, then seed sample data."""
     db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
     if not db_url:
         print_setup_instructions()
@@ -228,11 +2342,14 @@ def run_migration():
     logging.info(f"Attempting to connect to database at {masked_url}")
     try:
         engine = create_engine(db_url)
+        logging.info("Connected! Applying migrations...")
+        migrate(engine, dry_run=dry_run, target=target)
+        if dry_run:
+            return
+        logging.info("✅ Tables structure applied successfully.")
         with engine.connect() as conn:
-            logging.info("Connected! Creating tables...")
-            conn.execute(text(SCHEMA_SQL))
-            conn.commit()
-            logging.info("✅ Tables structure applied successfully.")
+            for failure in verify_indexes(conn):
+                logging.warning(f"⚠️  Index check: {failure}")
             logging.info("Seeding sample data...")
             users_data = [
                 (
@@ -312,6 +2429,8 @@ def run_migration():
                     "https://images.unsplash.com/photo-1542838132-92c53300491e?auto=format&fit=crop&w=400&q=80",
                     "12 Main St",
                     True,
+                    12.977,
+                    77.599,
                 ),
                 (
                     "City Medicos",
@@ -322,6 +2441,8 @@ def run_migration():
                     "https://images.unsplash.com/photo-1585435557343-3b092031a831?auto=format&fit=crop&w=400&q=80",
                     "45 Park Ave",
                     True,
+                    12.969,
+                    77.5985,
                 ),
                 (
                     "Daily Dairy Needs",
@@ -332,6 +2453,8 @@ def run_migration():
                     "https://images.unsplash.com/photo-1628088062854-d1870b4553da?auto=format&fit=crop&w=400&q=80",
                     "88 Market Rd",
                     False,
+                    12.973,
+                    77.593,
                 ),
                 (
                     "Student Stationers",
@@ -342,6 +2465,8 @@ def run_migration():
                     "https://images.unsplash.com/photo-1550399105-c4db5fb85c18?auto=format&fit=crop&w=400&q=80",
                     "University Sq",
                     False,
+                    12.959,
+                    77.588,
                 ),
                 (
                     "Oven Fresh Bakery",
@@ -352,6 +2477,8 @@ def run_migration():
                     "https://images.unsplash.com/photo-1509440159596-0249088772ff?auto=format&fit=crop&w=400&q=80",
                     "Baker St",
                     True,
+                    12.981,
+                    77.588,
                 ),
             ]
             for shop in shops_data:
@@ -361,8 +2488,8 @@ def run_migration():
                 if not existing:
                     conn.execute(
                         text("""
-                            INSERT INTO shops (name, category_slug, rating, delivery_time, distance, image_url, address, is_featured)
-                            VALUES (:name, :category_slug, :rating, :delivery_time, :distance, :image_url, :address, :is_featured)
+                            INSERT INTO shops (name, category_slug, rating, delivery_time, distance, image_url, address, is_featured, latitude, longitude)
+                            VALUES (:name, :category_slug, :rating, :delivery_time, :distance, :image_url, :address, :is_featured, :latitude, :longitude)
                         """),
                         {
                             "name": shop[0],
@@ -373,8 +2500,18 @@ def run_migration():
                             "image_url": shop[5],
                             "address": shop[6],
                             "is_featured": shop[7],
+                            "latitude": shop[8],
+                            "longitude": shop[9],
                         },
                     )
+                else:
+                    conn.execute(
+                        text("""
+                            UPDATE shops SET latitude = :latitude, longitude = :longitude
+                            WHERE id = :id AND latitude IS NULL
+                        """),
+                        {"id": existing[0], "latitude": shop[8], "longitude": shop[9]},
+                    )
             shop_map = {}
             result = conn.execute(text("SELECT name, id FROM shops"))
             for row in result:
@@ -489,21 +2626,25 @@ def run_migration():
                             },
                         )
             riders_data = [
-                ("r1", "Rahul Kumar", "9876543210", "Bike"),
-                ("r2", "Amit Singh", "9876543211", "Scooter"),
+                ("r1", "Rahul Kumar", "9876543210", "Bike", 12.9750, 77.5960),
+                ("r2", "Amit Singh", "9876543211", "Scooter", 12.9650, 77.5900),
             ]
             for rider in riders_data:
                 conn.execute(
                     text("""
-                        INSERT INTO riders (id, name, phone, vehicle_type, status, earnings, completed_orders)
-                        VALUES (:id, :name, :phone, :vehicle_type, 'Online', 0, 0)
-                        ON CONFLICT (id) DO NOTHING
+                        INSERT INTO riders (id, name, phone, vehicle_type, status, earnings, completed_orders, latitude, longitude)
+                        VALUES (:id, :name, :phone, :vehicle_type, 'Online', 0, 0, :latitude, :longitude)
+                        ON CONFLICT (id) DO UPDATE
+                        SET latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude
+                        WHERE riders.latitude IS NULL
                     """),
                     {
                         "id": rider[0],
                         "name": rider[1],
                         "phone": rider[2],
                         "vehicle_type": rider[3],
+                        "latitude": rider[4],
+                        "longitude": rider[5],
                     },
                 )
             coupons_data = [
@@ -535,4 +2676,29 @@ def run_migration():
 
 
 if __name__ == "__main__":
-    run_migration()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migrate and seed the database.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="list pending migrations and their SQL without applying them",
+    )
+    parser.add_argument("--target", type=int, help="stop after this migration version")
+    parser.add_argument(
+        "--verify-indexes",
+        action="store_true",
+        help="only check that the hot queries use their indexes",
+    )
+    parser.add_argument(
+        "--write-schema",
+        action="store_true",
+        help="regenerate schema.sql from SCHEMA_SQL and exit",
+    )
+    args = parser.parse_args()
+    if args.verify_indexes:
+        sys.exit(0 if check_indexes() else 1)
+    if args.write_schema:
+        with open(SCHEMA_FILE, "w") as f:
+            f.write(render_schema_file())
+        print(f"Wrote {SCHEMA_FILE}")
+        sys.exit(0)
+    run_migration(dry_run=args.dry_run, target=args.target)
\ No newline at end of file
@@ -0,0 +1,279 @@
+import asyncio
+import contextlib
+import datetime
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.engine import make_url
+
+ORDER_FEED_CHANNEL = "order_changes"
+ORDER_FEED_ENABLED = os.environ.get("ORDER_FEED_ENABLED", "true").lower() == "true"
+# An idle watcher checks this often whether its browser tab is still open.
+ORDER_FEED_PING = float(os.environ.get("ORDER_FEED_PING", "30"))
+ORDER_FEED_QUEUE_SIZE = int(os.environ.get("ORDER_FEED_QUEUE_SIZE", "1000"))
+# The columns an order change event carries: enough to route it to the
+# states that show the order. Anything else is fetched once per new order.
+ORDER_EVENT_FIELDS = ("id", "status", "shop_id", "user_id", "rider_id", "created_at")
+# Events that invalidate every loaded list rather than one order.
+RESYNC_OPS = ("TRUNCATE", "RESYNC")
+
+
+def order_event(op: str, row: Optional[dict] = None) -> dict[str, Any]:
+    """Build a change event from an order row, keeping only the routed fields."""
+    event: dict[str, Any] = {"op": op}
+    if row is None:
+        return event
+    for field in ORDER_EVENT_FIELDS:
+        value = row.get(field)
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        event[field] = value
+    return event
+
+
+def _order_key(order: dict) -> tuple[str, str]:
+    return (str(order.get("created_at") or ""), str(order["id"]))
+
+
+class OrderFeed:
+    """Process-wide fan-out of order change events to the states watching them.
+
+    Events come from the ``order_changes`` Postgres channel when a LISTEN
+    connection is up. Without one (Supabase-only deployments, the in-memory
+    repository, or while reconnecting) the repository publishes its own
+    writes instead, which reaches every tab served by this worker.
+    """
+
+    def __init__(self):
+        self.listening = False
+        self._subscribers: set[asyncio.Queue] = set()
+        self._following: set[tuple[str, str]] = set()
+        self._listeners: list[Callable[[dict], Any]] = []
+        self._app = None
+
+    def add_listener(self, listener: Callable[[dict], Any]):
+        """Call ``listener(event)`` synchronously for every event, before any
+        subscriber sees it, so state it keeps is current when they do."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], Any]):
+        with contextlib.suppress(ValueError):
+            self._listeners.remove(listener)
+
+    def publish(self, event: dict):
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logging.exception(f"Order feed listener failed: {e}")
+        for queue in list(self._subscribers):
+            if queue.full():
+                # A watcher that fell this far behind reloads instead.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"op": "RESYNC"})
+            else:
+                queue.put_nowait(event)
+
+    def publish_local(self, op: str, row: Optional[dict] = None):
+        """Publish a write made by this process, unless LISTEN will deliver it."""
+        if not self.listening:
+            self.publish(order_event(op, row))
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=ORDER_FEED_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+    def client_connected(self, token: str) -> bool:
+        namespace = getattr(self._app, "event_namespace", None)
+        return namespace is None or token in namespace.token_to_sid
+
+    async def listen(self, db_url: str):
+        """Relay NOTIFY payloads from the database, reconnecting with backoff."""
+        import psycopg
+
+        conninfo = (
+            make_url(db_url)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    conninfo, autocommit=True
+                ) as conn:
+                    await conn.execute(f"LISTEN {ORDER_FEED_CHANNEL}")
+                    self.listening = True
+                    delay = 1.0
+                    # Anything written while we were not listening was missed.
+                    self.publish({"op": "RESYNC"})
+                    async for notify in conn.notifies():
+                        try:
+                            self.publish(json.loads(notify.payload))
+                        except ValueError:
+                            logging.warning(
+                                f"Ignoring malformed order event: {notify.payload!r}"
+                            )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Order feed connection lost: {e}")
+            finally:
+                self.listening = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+order_feed = OrderFeed()
+
+
+def find_order(state, lists: dict[str, Optional[str]], order_id: str) -> Optional[dict]:
+    """The loaded copy of ``order_id`` in any of the state's order lists."""
+    for name in lists:
+        for order in getattr(state, name):
+            if order["id"] == order_id:
+                return dict(order)
+    return None
+
+
+def place_order(
+    state,
+    lists: dict[str, Optional[str]],
+    event: dict,
+    target: Optional[str],
+    row: Optional[dict],
+):
+    """Apply ``event`` to the state's order lists.
+
+    ``lists`` maps each list var to the var holding its next-page cursor, or
+    None when the list is not paged. The order leaves every list but
+    ``target``; there it is patched in place, or inserted newest first when it
+    is new, unless it sorts past the end of a list that has more pages.
+    """
+    for name, cursor in lists.items():
+        orders = getattr(state, name)
+        index = next((i for i, o in enumerate(orders) if o["id"] == event["id"]), None)
+        if name != target:
+            if index is not None:
+                setattr(state, name, orders[:index] + orders[index + 1 :])
+            continue
+        if row is None:
+            continue
+        patched = dict(row)
+        if "order_items" in patched:
+            patched["items"] = patched.pop("order_items") or []
+        for field in ("status", "rider_id"):
+            if field in event:
+                patched[field] = event[field]
+        if index is not None:
+            setattr(state, name, orders[:index] + [patched] + orders[index + 1 :])
+            continue
+        position = next(
+            (i for i, o in enumerate(orders) if _order_key(o) < _order_key(patched)),
+            len(orders),
+        )
+        if position == len(orders) and cursor and getattr(state, cursor):
+            continue
+        setattr(state, name, orders[:position] + [patched] + orders[position:])
+
+
+def _placement(state, event: dict) -> Optional[str]:
+    if event.get("op") == "DELETE":
+        return None
+    return state._order_placement(event)
+
+
+def patch_order(
+    state, lists: dict[str, Optional[str]], order_id: str, **changes
+) -> bool:
+    """Apply a write this state just made to its own lists, without a refetch.
+
+    Returns False when the order is not loaded, in which case the caller
+    should reload.
+    """
+    row = find_order(state, lists, order_id)
+    if row is None:
+        return False
+    event = {**order_event("UPDATE", row), **changes}
+    place_order(state, lists, event, _placement(state, event), row)
+    return True
+
+
+async def follow_orders(
+    state,
+    lists: dict[str, Optional[str]],
+    view: str,
+    on_change: Optional[Callable[[], Awaitable[Any]]] = None,
+):
+    """Keep a state's order lists current from the feed until its tab closes.
+
+    Run from a background event. The state provides ``_order_placement(event)``
+    naming the list an order belongs in (or None) and ``_reload_orders()`` for
+    resyncs; ``on_change`` is awaited under the state lock after each applied
+    event. Only one watcher runs per tab and state in a worker.
+    """
+    from app.utils.database import get_db
+
+    async with state:
+        token = state.router.session.client_token
+    key = (token, state.get_full_name())
+    if not token or key in order_feed._following:
+        return
+    order_feed._following.add(key)
+    try:
+        async with order_feed.subscribe() as events:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), ORDER_FEED_PING)
+                except asyncio.TimeoutError:
+                    if order_feed.client_connected(token):
+                        continue
+                    return
+                if event.get("op") in RESYNC_OPS:
+                    async with state:
+                        await state._reload_orders()
+                        if on_change:
+                            await on_change()
+                    continue
+                if "id" not in event:
+                    continue
+                async with state:
+                    target = _placement(state, event)
+                    row = find_order(state, lists, event["id"])
+                if target is None and row is None:
+                    continue
+                if target and row is None:
+                    row = await get_db().get_order(event["id"], view=view)
+                    if row is None:
+                        continue
+                async with state:
+                    place_order(state, lists, event, target, row)
+                    if on_change:
+                        await on_change()
+    finally:
+        order_feed._following.discard(key)
+
+
+@contextlib.asynccontextmanager
+async def order_feed_lifespan(app):
+    """Reflex lifespan task that relays database order changes to the feed."""
+    order_feed._app = app
+    db_url = os.environ.get("REFLEX_DB_URL")
+    if not ORDER_FEED_ENABLED or not db_url:
+        yield
+        return
+    task = asyncio.create_task(order_feed.listen(db_url))
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
\ No newline at end of file
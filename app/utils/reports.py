@@ -0,0 +1,46 @@
+import datetime
+from typing import Optional
+
+
+def _stat(rollup: Optional[dict]) -> dict:
+    rollup = rollup or {}
+    return {
+        "revenue": round(float(rollup.get("gmv") or 0), 2),
+        "orders": int(rollup.get("orders_count") or 0),
+        "commission": round(float(rollup.get("commission") or 0), 2),
+        "delivery_fees": round(float(rollup.get("delivery_fees") or 0), 2),
+    }
+
+
+def report_window(days: int) -> tuple[datetime.date, str, str]:
+    """First day plus the [start, end) bounds covering the last ``days`` days."""
+    end = datetime.date.today() + datetime.timedelta(days=1)
+    first = end - datetime.timedelta(days=days)
+    return first, first.isoformat(), end.isoformat()
+
+
+def daily_series(rows: list[dict], first: datetime.date, days: int) -> list[dict]:
+    """Chart points for ``days`` consecutive days of rollups, zero-filled."""
+    by_day = {str(row["bucket"])[:10]: row for row in rows}
+    series = []
+    for offset in range(days):
+        day = first + datetime.timedelta(days=offset)
+        label = day.strftime("%a") if days <= 7 else day.strftime("%d %b")
+        series.append({"day": label, **_stat(by_day.get(day.isoformat()))})
+    return series
+
+
+def hourly_series(rows: list[dict]) -> list[dict]:
+    """Chart points for the 24 hours of one day of hourly rollups."""
+    by_hour = {int(str(row["bucket"])[11:13]): row for row in rows}
+    series = []
+    for hour in range(24):
+        stat = _stat(by_hour.get(hour))
+        series.append(
+            {
+                "hour": f"{hour:02d}:00",
+                "revenue": stat["revenue"],
+                "orders": stat["orders"],
+            }
+        )
+    return series
\ No newline at end of file
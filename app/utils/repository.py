@@ -0,0 +1,904 @@
+import copy
+import datetime
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Optional, Protocol
+import app.data as data
+from app.utils.database import (
+    DAILY_STAT_COLUMNS,
+    ORDER_ARCHIVE_AFTER_DAYS,
+    ORDER_ARCHIVE_BATCH,
+    OPEN_ORDER_STATUSES,
+    ORDERS_PAGE_SIZE,
+    PAYOUT_DAYS,
+    PLATFORM_ROLLUP_SHOP_ID,
+    decode_order_cursor,
+    encode_order_cursor,
+    hot_orders_cutoff,
+    projection,
+)
+from app.utils.dispatch import dispatcher
+from app.utils.metrics import instrument_methods
+from app.utils.order_feed import ORDER_EVENT_FIELDS, order_event, order_feed
+
+
+class Repository(Protocol):
+    """The data access API the states use, whatever the storage behind it.
+
+    ``DatabaseManager`` implements it on Supabase / Postgres and
+    ``MemoryRepository`` implements it in process. Both return plain dicts in
+    the shape PostgREST produces.
+    """
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]: ...
+    async def get_user_by_id(self, user_id: str) -> Optional[dict]: ...
+    async def create_user(self, user_data: dict) -> Optional[dict]: ...
+    async def get_shops(
+        self, category_slug: Optional[str] = None, view: str = "detail"
+    ) -> list[dict]: ...
+    async def get_products(
+        self,
+        shop_id: Optional[int] = None,
+        view: str = "detail",
+        include_unavailable: bool = False,
+    ) -> list[dict]: ...
+    async def get_products_by_ids(
+        self, product_ids: list[int], view: str = "checkout"
+    ) -> list[dict]: ...
+    async def get_categories(self, include_inactive: bool = False) -> list[dict]: ...
+    async def get_storefront_bootstrap(
+        self, known_version: Optional[str] = None
+    ) -> Optional[dict]: ...
+    async def create_category(self, category_data: dict) -> Optional[dict]: ...
+    async def update_category(self, category_id: int, updates: dict) -> bool: ...
+    async def delete_category(self, category_id: int) -> bool: ...
+    async def create_order(self, order_data: dict) -> Optional[dict]: ...
+    async def create_order_items(self, items_data: list[dict]) -> bool: ...
+    async def place_orders(self, orders: list[dict]) -> list[str]: ...
+    async def update_order_status(self, order_id: str, status: str) -> bool: ...
+    async def get_order(
+        self, order_id: str, view: str = "detail"
+    ) -> Optional[dict]: ...
+    async def get_available_orders(self, view: str = "detail") -> list[dict]: ...
+    async def get_out_for_delivery_orders(self, view: str = "detail") -> list[dict]: ...
+    async def get_rider_orders(
+        self, rider_id: str, view: str = "detail", include_history: bool = False
+    ) -> list[dict]: ...
+    async def assign_order_to_rider(
+        self, order_id: str, rider_id: str
+    ) -> Optional[dict]: ...
+    async def get_rider_by_id(self, rider_id: str) -> Optional[dict]: ...
+    async def update_rider_earnings(
+        self, rider_id: str, amount: float
+    ) -> Optional[dict]: ...
+    async def settle_rider_deliveries(self, credits: list[dict]) -> list[dict]: ...
+    async def deliver_orders(self, deliveries: list[dict]) -> list[dict]: ...
+    async def toggle_rider_status(self, rider_id: str, status: str) -> bool: ...
+    async def update_rider_location(
+        self, rider_id: str, latitude: float, longitude: float
+    ) -> bool: ...
+    async def get_riders(self, status: Optional[str] = None) -> list[dict]: ...
+    async def get_coupons(self) -> list[dict]: ...
+    async def get_daily_stats(
+        self, day: Optional[str], shop_id: Optional[int] = None
+    ) -> dict[str, float]: ...
+    async def get_payout_days(
+        self, shop_id: int, limit: int = PAYOUT_DAYS
+    ) -> list[dict]: ...
+    async def refresh_revenue_rollups(self) -> Optional[dict]: ...
+    async def archive_orders(
+        self,
+        older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS,
+        batch_size: int = ORDER_ARCHIVE_BATCH,
+    ) -> int: ...
+    async def get_revenue_rollups(
+        self,
+        start: str,
+        end: str,
+        granularity: str = "day",
+        shop_id: Optional[int] = None,
+    ) -> list[dict]: ...
+    async def get_all_orders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]: ...
+    async def get_orders_by_shop_page(
+        self,
+        shop_id: int,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+        statuses: Optional[tuple[str, ...]] = None,
+    ) -> tuple[list[dict], Optional[str]]: ...
+    async def get_open_orders_by_shop(
+        self, shop_id: int, view: str = "detail"
+    ) -> list[dict]: ...
+    async def get_orders_by_user_page(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]: ...
+    async def get_rider_orders_page(
+        self,
+        rider_id: str,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]: ...
+    async def delete_all_orders(self) -> bool: ...
+    async def create_shop(self, shop_data: dict) -> Optional[dict]: ...
+    async def update_shop(self, shop_id: int, updates: dict) -> bool: ...
+    async def delete_shop(self, shop_id: int) -> bool: ...
+    async def create_rider(self, rider_data: dict) -> Optional[dict]: ...
+    async def create_product(self, product_data: dict) -> Optional[dict]: ...
+    async def update_product(self, product_id: int, updates: dict) -> bool: ...
+    async def toggle_product_stock(self, product_id: int, new_status: bool) -> bool: ...
+    def pool_metrics(self) -> dict[str, object]: ...
+    def close(self, close_connections: bool = True): ...
+
+
+def _split_select(select: str) -> list[str]:
+    """Split a PostgREST select list on top-level commas."""
+    parts, depth, current = [], 0, ""
+    for char in select:
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+@instrument_methods
+class MemoryRepository:
+    """In-process repository seeded from the mock lists in ``app.data``.
+
+    Rows live in one dict per table keyed by primary key, with hash indexes on
+    the columns the app filters by, so lookups cost the same as an index scan
+    instead of a pass over every row. Every read returns copies and every
+    write keeps the indexes current, which gives demos, tests and benchmarks
+    the same semantics as the Supabase backend without a network hop.
+    """
+
+    supabase = None
+    engine = None
+    use_sql = False
+
+    PRIMARY_KEYS = {
+        "users": "id",
+        "categories": "id",
+        "shops": "id",
+        "products": "id",
+        "orders": "id",
+        "order_items": "id",
+        "orders_archive": "id",
+        "order_items_archive": "id",
+        "riders": "id",
+        "coupons": "code",
+    }
+    INDEXES = {
+        "users": ("email",),
+        "shops": ("category_slug",),
+        "products": ("shop_id",),
+        "orders": ("user_id", "shop_id", "rider_id", "status"),
+        "order_items": ("order_id",),
+        "orders_archive": ("user_id", "shop_id", "rider_id"),
+        "order_items_archive": ("order_id",),
+    }
+    SERIAL_TABLES = ("categories", "shops", "products", "order_items")
+
+    def __init__(self, seed: bool = True):
+        self._lock = threading.RLock()
+        self._rows: dict[str, dict[Any, dict]] = {t: {} for t in self.PRIMARY_KEYS}
+        self._indexes: dict[tuple[str, str], dict[Any, set]] = {
+            (table, column): {}
+            for table, columns in self.INDEXES.items()
+            for column in columns
+        }
+        self._next_id = {table: 1 for table in self.SERIAL_TABLES}
+        # Every order id ever inserted, like the order_ids table: archiving
+        # keeps an id taken and order items must point at a registered id.
+        self._order_ids: set[str] = set()
+        self._bootstrap: Optional[dict] = None
+        self._daily_stats: dict[str, dict[int, dict[str, float]]] = {}
+        self._rollups: dict[tuple[str, int], dict[str, dict]] = {}
+        if seed:
+            self._seed()
+
+    def _seed(self):
+        for table, rows in (
+            ("users", data.USERS),
+            ("categories", data.CATEGORIES),
+            ("shops", data.SHOPS),
+            ("products", data.PRODUCTS),
+            ("riders", data.RIDERS),
+            ("coupons", data.COUPONS),
+        ):
+            for row in rows:
+                self._insert(table, copy.deepcopy(row))
+        for order in data.ORDERS:
+            order = copy.deepcopy(order)
+            items = order.pop("items", [])
+            self._insert("orders", order)
+            for item in items:
+                self._insert("order_items", {**item, "order_id": order["id"]})
+
+    def _insert(self, table: str, row: dict) -> dict:
+        pk = self.PRIMARY_KEYS[table]
+        with self._lock:
+            if table in self.SERIAL_TABLES:
+                if row.get(pk) is None:
+                    row[pk] = self._next_id[table]
+                self._next_id[table] = max(self._next_id[table], row[pk] + 1)
+            if row[pk] in self._rows[table]:
+                raise ValueError(f"duplicate key {pk}={row[pk]!r} in {table}")
+            if table == "orders":
+                if row[pk] in self._order_ids:
+                    raise ValueError(f"order id {row[pk]!r} is already in use")
+                self._order_ids.add(row[pk])
+                row.setdefault("created_at", datetime.datetime.now().isoformat())
+                self._apply_order_stats(row, 1)
+            elif table == "order_items" and row.get("order_id") not in self._order_ids:
+                raise ValueError(f"unknown order id {row.get('order_id')!r}")
+            self._rows[table][row[pk]] = row
+            for column in self.INDEXES.get(table, ()):
+                self._indexes[(table, column)].setdefault(row.get(column), set()).add(
+                    row[pk]
+                )
+            return row
+
+    def _update(self, table: str, key: Any, updates: dict) -> Optional[dict]:
+        with self._lock:
+            row = self._rows[table].get(key)
+            if row is None:
+                return None
+            for column in self.INDEXES.get(table, ()):
+                if column in updates and updates[column] != row.get(column):
+                    self._indexes[(table, column)][row.get(column)].discard(key)
+                    self._indexes[(table, column)].setdefault(
+                        updates[column], set()
+                    ).add(key)
+            if table == "orders":
+                self._apply_order_stats(row, -1)
+                self._apply_order_stats({**row, **updates}, 1)
+            row.update(updates)
+            return row
+
+    def _delete(self, table: str, key: Any) -> bool:
+        with self._lock:
+            row = self._rows[table].pop(key, None)
+            if row is None:
+                return False
+            for column in self.INDEXES.get(table, ()):
+                self._indexes[(table, column)].get(row.get(column), set()).discard(key)
+            if table == "orders":
+                self._apply_order_stats(row, -1)
+            return True
+
+    def _apply_order_stats(self, order: dict, sign: int):
+        """Mirror of the shop_daily_stats trigger for one order."""
+        date = str(order.get("date") or "")
+        if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", date):
+            date = str(order.get("created_at") or "")[:10]
+        stats = self._daily_stats.setdefault(date, {}).setdefault(
+            order.get("shop_id") or 0, {column: 0 for column in DAILY_STAT_COLUMNS}
+        )
+        status = order.get("status")
+        delivered = status in ("Delivered", "Completed")
+        stats["orders_count"] += sign
+        if status == "Cancelled":
+            stats["cancelled_count"] += sign
+        else:
+            stats["revenue"] += sign * (order.get("total_amount") or 0)
+        if delivered:
+            stats["delivered_count"] += sign
+            stats["delivered_revenue"] += sign * (order.get("subtotal") or 0)
+
+    def _lookup(self, table: str, column: str, value: Any) -> list[dict]:
+        """Rows whose ``column`` equals ``value``, via the hash index."""
+        rows = self._rows[table]
+        keys = self._indexes[(table, column)].get(value, ())
+        return [rows[key] for key in keys if key in rows]
+
+    def _embed_items(self, order: dict, items_table: str = "order_items") -> list[dict]:
+        items = self._lookup(items_table, "order_id", order["id"])
+        return sorted(items, key=lambda item: item["id"])
+
+    def _project(
+        self,
+        table: str,
+        view: str,
+        rows: list[dict],
+        items_table: str = "order_items",
+    ) -> list[dict]:
+        """Shape rows like PostgREST would for ``projection(table, view)``."""
+        columns, embeds = [], {}
+        for part in _split_select(projection(table, view)):
+            if "(" in part:
+                name, inner = part[:-1].split("(", 1)
+                embeds[name.strip()] = [c.strip() for c in inner.split(",")]
+            else:
+                columns.append(part)
+        shaped = []
+        for row in rows:
+            out = (
+                copy.deepcopy(row)
+                if "*" in columns
+                else {c: copy.deepcopy(row.get(c)) for c in columns}
+            )
+            if "order_items" in embeds:
+                wanted = embeds["order_items"]
+                out["order_items"] = [
+                    copy.deepcopy(item)
+                    if "*" in wanted
+                    else {c: item.get(c) for c in wanted}
+                    for item in self._embed_items(row, items_table)
+                ]
+            shaped.append(out)
+        return shaped
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        users = self._lookup("users", "email", email)
+        return copy.deepcopy(users[0]) if users else None
+
+    async def get_user_by_id(self, user_id: str) -> Optional[dict]:
+        user = self._rows["users"].get(user_id)
+        return copy.deepcopy(user) if user else None
+
+    async def create_user(self, user_data: dict) -> Optional[dict]:
+        if self._lookup("users", "email", user_data.get("email")):
+            return None
+        try:
+            return copy.deepcopy(self._insert("users", dict(user_data)))
+        except ValueError:
+            return None
+
+    async def get_shops(
+        self, category_slug: Optional[str] = None, view: str = "detail"
+    ) -> list[dict]:
+        if category_slug and category_slug != "all":
+            shops = self._lookup("shops", "category_slug", category_slug)
+        else:
+            shops = list(self._rows["shops"].values())
+        shops = [s for s in shops if s.get("is_active", True)]
+        return self._project("shops", view, sorted(shops, key=lambda s: s["id"]))
+
+    async def get_products(
+        self,
+        shop_id: Optional[int] = None,
+        view: str = "detail",
+        include_unavailable: bool = False,
+    ) -> list[dict]:
+        if shop_id:
+            products = self._lookup("products", "shop_id", shop_id)
+        else:
+            products = list(self._rows["products"].values())
+        if not include_unavailable:
+            products = [p for p in products if p.get("is_available", True)]
+        return self._project("products", view, sorted(products, key=lambda p: p["id"]))
+
+    async def get_products_by_ids(
+        self, product_ids: list[int], view: str = "checkout"
+    ) -> list[dict]:
+        rows = self._rows["products"]
+        return self._project(
+            "products", view, [rows[pid] for pid in product_ids if pid in rows]
+        )
+
+    async def get_categories(self, include_inactive: bool = False) -> list[dict]:
+        categories = [
+            c
+            for c in self._rows["categories"].values()
+            if include_inactive or c.get("is_active", True)
+        ]
+        categories.sort(key=lambda c: (c.get("sort_order", 0), c["id"]))
+        return copy.deepcopy(categories)
+
+    async def get_storefront_bootstrap(
+        self, known_version: Optional[str] = None
+    ) -> Optional[dict]:
+        if self._bootstrap is None:
+            document = {
+                "categories": await self.get_categories(),
+                "shops": await self.get_shops(view="card"),
+                "products": await self.get_products(view="card"),
+            }
+            version = hashlib.md5(
+                json.dumps(document, sort_keys=True, default=str).encode()
+            ).hexdigest()
+            self._bootstrap = {**document, "version": version, "unchanged": False}
+        if known_version and known_version == self._bootstrap["version"]:
+            return {"version": known_version, "unchanged": True}
+        return copy.deepcopy(self._bootstrap)
+
+    def _catalog_changed(self):
+        self._bootstrap = None
+
+    async def create_category(self, category_data: dict) -> Optional[dict]:
+        self._catalog_changed()
+        return copy.deepcopy(self._insert("categories", dict(category_data)))
+
+    async def update_category(self, category_id: int, updates: dict) -> bool:
+        self._catalog_changed()
+        return self._update("categories", category_id, updates) is not None
+
+    async def delete_category(self, category_id: int) -> bool:
+        self._catalog_changed()
+        return self._delete("categories", category_id)
+
+    async def create_order(self, order_data: dict) -> Optional[dict]:
+        try:
+            order = copy.deepcopy(self._insert("orders", dict(order_data)))
+        except ValueError:
+            return None
+        order_feed.publish(order_event("INSERT", order))
+        return order
+
+    async def create_order_items(self, items_data: list[dict]) -> bool:
+        try:
+            for item in items_data:
+                self._insert("order_items", dict(item))
+        except ValueError:
+            return False
+        return True
+
+    async def place_orders(self, orders: list[dict]) -> list[str]:
+        with self._lock:
+            ids = [order["id"] for order in orders]
+            if len(set(ids)) != len(ids) or any(i in self._order_ids for i in ids):
+                return []
+            for order in orders:
+                order = copy.deepcopy(order)
+                items = order.pop("items", [])
+                order.setdefault("status", "Pending")
+                self._insert("orders", order)
+                for item in items:
+                    self._insert("order_items", {**item, "order_id": order["id"]})
+                order_feed.publish(order_event("INSERT", order))
+            return ids
+
+    async def update_order_status(self, order_id: str, status: str) -> bool:
+        order = self._update("orders", order_id, {"status": status})
+        if order is None:
+            return False
+        order_feed.publish(order_event("UPDATE", order))
+        return True
+
+    async def get_order(self, order_id: str, view: str = "detail") -> Optional[dict]:
+        order = self._rows["orders"].get(order_id)
+        return self._project("orders", view, [order])[0] if order else None
+
+    def _find_orders(
+        self,
+        column: Optional[str],
+        value: Any = None,
+        include_history: bool = False,
+        hot_window: bool = True,
+    ) -> list[tuple[dict, str]]:
+        """(order, items table) pairs newest first, mirroring the hot window
+        and archive merge of ``DatabaseManager._fetch_orders``."""
+        sources = [("orders", "order_items")]
+        cutoff = hot_orders_cutoff() if hot_window else None
+        if include_history:
+            sources.append(("orders_archive", "order_items_archive"))
+            cutoff = None
+        found = []
+        for table, items_table in sources:
+            rows = (
+                self._rows[table].values()
+                if column is None
+                else self._lookup(table, column, value)
+            )
+            found.extend(
+                (row, items_table)
+                for row in rows
+                if not cutoff or str(row.get("created_at") or "") >= cutoff
+            )
+        return sorted(
+            found,
+            key=lambda f: (f[0].get("created_at") or "", f[0]["id"]),
+            reverse=True,
+        )
+
+    def _project_orders(self, view: str, found: list[tuple[dict, str]]) -> list[dict]:
+        return [
+            self._project("orders", view, [row], items_table)[0]
+            for row, items_table in found
+        ]
+
+    async def get_available_orders(self, view: str = "detail") -> list[dict]:
+        return self._project_orders(view, self._find_orders("status", "Ready"))
+
+    async def get_out_for_delivery_orders(self, view: str = "detail") -> list[dict]:
+        found = self._find_orders("status", "Out for Delivery", hot_window=False)
+        return self._project_orders(view, found)
+
+    async def get_rider_orders(
+        self, rider_id: str, view: str = "detail", include_history: bool = False
+    ) -> list[dict]:
+        found = self._find_orders("rider_id", rider_id, include_history)
+        return self._project_orders(view, found)
+
+    async def assign_order_to_rider(
+        self, order_id: str, rider_id: str
+    ) -> Optional[dict]:
+        updates = {"rider_id": rider_id, "status": "Out for Delivery"}
+        with self._lock:
+            order = self._rows["orders"].get(order_id)
+            if not order or order.get("status") != "Ready" or order.get("rider_id"):
+                return None
+            order = self._update("orders", order_id, updates)
+        order_feed.publish(order_event("UPDATE", order))
+        return copy.deepcopy(order)
+
+    async def get_rider_by_id(self, rider_id: str) -> Optional[dict]:
+        rider = self._rows["riders"].get(rider_id)
+        return copy.deepcopy(rider) if rider else None
+
+    async def update_rider_earnings(
+        self, rider_id: str, amount: float
+    ) -> Optional[dict]:
+        riders = await self.settle_rider_deliveries(
+            [{"rider_id": rider_id, "amount": amount, "deliveries": 1}]
+        )
+        return riders[0] if riders else None
+
+    async def settle_rider_deliveries(self, credits: list[dict]) -> list[dict]:
+        totals: dict[str, list] = {}
+        for credit in credits:
+            total = totals.setdefault(credit["rider_id"], [0.0, 0])
+            total[0] += float(credit["amount"])
+            total[1] += int(credit.get("deliveries") or 1)
+        updated = []
+        with self._lock:
+            for rider_id, (amount, deliveries) in totals.items():
+                rider = self._rows["riders"].get(rider_id)
+                if rider is None:
+                    continue
+                rider["earnings"] = float(rider.get("earnings") or 0) + amount
+                rider["completed_orders"] = (
+                    int(rider.get("completed_orders") or 0) + deliveries
+                )
+                updated.append(copy.deepcopy(rider))
+        return updated
+
+    async def deliver_orders(self, deliveries: list[dict]) -> list[dict]:
+        delivered = []
+        with self._lock:
+            for delivery in deliveries:
+                order = self._rows["orders"].get(delivery["order_id"])
+                if (
+                    order is None
+                    or order.get("status") != "Out for Delivery"
+                    or order.get("rider_id") != delivery["rider_id"]
+                ):
+                    continue
+                self._update("orders", order["id"], {"status": "Delivered"})
+                delivered.append((order, delivery["amount"]))
+            riders = {
+                rider["id"]: rider
+                for rider in await self.settle_rider_deliveries(
+                    [
+                        {"rider_id": order["rider_id"], "amount": amount}
+                        for order, amount in delivered
+                    ]
+                )
+            }
+        rows = []
+        for order, _ in delivered:
+            order_feed.publish(order_event("UPDATE", order))
+            rider = riders.get(order["rider_id"], {})
+            rows.append(
+                {
+                    **{field: order.get(field) for field in ORDER_EVENT_FIELDS},
+                    "earnings": rider.get("earnings"),
+                    "completed_orders": rider.get("completed_orders"),
+                }
+            )
+        return rows
+
+    async def toggle_rider_status(self, rider_id: str, status: str) -> bool:
+        rider = self._update("riders", rider_id, {"status": status})
+        if rider is None:
+            return False
+        dispatcher.update_rider(
+            rider_id, status, rider.get("latitude"), rider.get("longitude")
+        )
+        return True
+
+    async def update_rider_location(
+        self, rider_id: str, latitude: float, longitude: float
+    ) -> bool:
+        updates = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "location_updated_at": datetime.datetime.now(datetime.timezone.utc),
+        }
+        if self._update("riders", rider_id, updates) is None:
+            return False
+        dispatcher.update_rider(rider_id, latitude=latitude, longitude=longitude)
+        return True
+
+    async def get_riders(self, status: Optional[str] = None) -> list[dict]:
+        riders = self._rows["riders"].values()
+        if status:
+            riders = [r for r in riders if r.get("status") == status]
+        return copy.deepcopy(list(riders))
+
+    async def get_coupons(self) -> list[dict]:
+        return copy.deepcopy(list(self._rows["coupons"].values()))
+
+    async def get_daily_stats(
+        self, day: Optional[str], shop_id: Optional[int] = None
+    ) -> dict[str, float]:
+        totals = {column: 0 for column in DAILY_STAT_COLUMNS}
+        with self._lock:
+            days = (
+                self._daily_stats.values()
+                if day is None
+                else [self._daily_stats.get(day, {})]
+            )
+            for shops in days:
+                for stats_shop, stats in shops.items():
+                    if shop_id in (None, stats_shop):
+                        for column in DAILY_STAT_COLUMNS:
+                            totals[column] += stats[column]
+        return totals
+
+    async def get_payout_days(
+        self, shop_id: int, limit: int = PAYOUT_DAYS
+    ) -> list[dict]:
+        with self._lock:
+            rows = [
+                {
+                    "day": day,
+                    "delivered_count": shops[shop_id]["delivered_count"],
+                    "delivered_revenue": shops[shop_id]["delivered_revenue"],
+                }
+                for day, shops in self._daily_stats.items()
+                if shops.get(shop_id, {}).get("delivered_count", 0) > 0
+            ]
+        return sorted(rows, key=lambda r: r["day"], reverse=True)[:limit]
+
+    async def refresh_revenue_rollups(self) -> Optional[dict]:
+        """Rebuild every rollup bucket; the in-process tables are small."""
+        with self._lock:
+            commission_rates = {
+                shop_id: shop.get("commission_rate") or 10
+                for shop_id, shop in self._rows["shops"].items()
+            }
+            rollups: dict[tuple[str, int], dict[str, dict]] = {}
+            orders = [
+                *self._rows["orders"].values(),
+                *self._rows["orders_archive"].values(),
+            ]
+            for order in orders:
+                if order.get("status") == "Cancelled" or not order.get("created_at"):
+                    continue
+                created_at = str(order["created_at"]).replace(" ", "T")
+                shop_id = order.get("shop_id")
+                scopes = [PLATFORM_ROLLUP_SHOP_ID]
+                if shop_id is not None:
+                    scopes.append(shop_id)
+                subtotal = order.get("subtotal") or 0
+                for granularity, bucket in (
+                    ("hour", created_at[:13] + ":00:00"),
+                    ("day", created_at[:10] + "T00:00:00"),
+                ):
+                    for scope in scopes:
+                        row = rollups.setdefault((granularity, scope), {}).setdefault(
+                            bucket,
+                            {
+                                "bucket": bucket,
+                                "orders_count": 0,
+                                "gmv": 0.0,
+                                "commission": 0.0,
+                                "delivery_fees": 0.0,
+                            },
+                        )
+                        row["orders_count"] += 1
+                        row["gmv"] += order.get("total_amount") or 0
+                        row["commission"] += (
+                            subtotal * commission_rates.get(shop_id, 10) / 100
+                        )
+                        row["delivery_fees"] += order.get("delivery_fee") or 0
+            self._rollups = rollups
+        return {"rolled_up_to": datetime.datetime.now().isoformat(), "caught_up": True}
+
+    async def get_revenue_rollups(
+        self,
+        start: str,
+        end: str,
+        granularity: str = "day",
+        shop_id: Optional[int] = None,
+    ) -> list[dict]:
+        if not self._rollups:
+            await self.refresh_revenue_rollups()
+        scope = PLATFORM_ROLLUP_SHOP_ID if shop_id is None else shop_id
+        buckets = self._rollups.get((granularity, scope), {})
+        return [
+            copy.deepcopy(buckets[bucket])
+            for bucket in sorted(buckets)
+            if start <= bucket < end
+        ]
+
+    async def archive_orders(
+        self,
+        older_than_days: int = ORDER_ARCHIVE_AFTER_DAYS,
+        batch_size: int = ORDER_ARCHIVE_BATCH,
+    ) -> int:
+        """Move old delivered orders and their items to the archive tables.
+
+        Their daily stats stay as they are, like the database function.
+        """
+        cutoff = (
+            datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+        ).isoformat()
+        with self._lock:
+            batch = sorted(
+                (
+                    order
+                    for order in self._rows["orders"].values()
+                    if order.get("status") in ("Delivered", "Completed")
+                    and str(order.get("created_at") or "") < cutoff
+                ),
+                key=lambda o: o["created_at"],
+            )[:batch_size]
+            for order in batch:
+                items = self._lookup("order_items", "order_id", order["id"])
+                # _delete takes the order out of the daily stats; keep it in.
+                self._apply_order_stats(order, 1)
+                self._delete("orders", order["id"])
+                self._insert("orders_archive", order)
+                for item in items:
+                    self._delete("order_items", item["id"])
+                    self._insert("order_items_archive", item)
+        return len(batch)
+
+    async def get_all_orders(
+        self, view: str = "detail", include_history: bool = False
+    ) -> list[dict]:
+        found = self._find_orders(None, None, include_history, hot_window=False)
+        return self._project_orders(view, found)
+
+    def _orders_page(
+        self,
+        found: list[tuple[dict, str]],
+        cursor: Optional[str],
+        limit: int,
+        view: str,
+    ) -> tuple[list[dict], Optional[str]]:
+        if cursor:
+            position = decode_order_cursor(cursor)
+            found = [
+                f
+                for f in found
+                if (f[0].get("created_at") or "", f[0]["id"]) < position
+            ]
+        page = self._project_orders(view, found[:limit])
+        next_cursor = (
+            encode_order_cursor(found[limit - 1][0]) if len(found) > limit else None
+        )
+        return page, next_cursor
+
+    async def get_all_orders_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]:
+        found = self._find_orders(None, None, include_history, hot_window=False)
+        return self._orders_page(found, cursor, limit, view)
+
+    async def get_orders_by_shop_page(
+        self,
+        shop_id: int,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+        statuses: Optional[tuple[str, ...]] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        found = self._find_orders("shop_id", shop_id, include_history)
+        if statuses:
+            found = [f for f in found if f[0].get("status") in statuses]
+        return self._orders_page(found, cursor, limit, view)
+
+    async def get_open_orders_by_shop(
+        self, shop_id: int, view: str = "detail"
+    ) -> list[dict]:
+        found = self._find_orders("shop_id", shop_id, hot_window=False)
+        return self._project_orders(
+            view, [f for f in found if f[0].get("status") in OPEN_ORDER_STATUSES]
+        )
+
+    async def get_orders_by_user_page(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]:
+        found = self._find_orders("user_id", user_id, include_history)
+        return self._orders_page(found, cursor, limit, view)
+
+    async def get_rider_orders_page(
+        self,
+        rider_id: str,
+        cursor: Optional[str] = None,
+        limit: int = ORDERS_PAGE_SIZE,
+        view: str = "detail",
+        include_history: bool = False,
+    ) -> tuple[list[dict], Optional[str]]:
+        found = self._find_orders("rider_id", rider_id, include_history)
+        return self._orders_page(found, cursor, limit, view)
+
+    async def delete_all_orders(self) -> bool:
+        with self._lock:
+            for table in (
+                "order_items",
+                "orders",
+                "order_items_archive",
+                "orders_archive",
+            ):
+                self._rows[table].clear()
+                for column in self.INDEXES[table]:
+                    self._indexes[(table, column)].clear()
+            self._order_ids.clear()
+            self._daily_stats.clear()
+        order_feed.publish(order_event("TRUNCATE"))
+        return True
+
+    async def create_shop(self, shop_data: dict) -> Optional[dict]:
+        self._catalog_changed()
+        return copy.deepcopy(self._insert("shops", {"is_active": True, **shop_data}))
+
+    async def update_shop(self, shop_id: int, updates: dict) -> bool:
+        self._catalog_changed()
+        return self._update("shops", shop_id, updates) is not None
+
+    async def delete_shop(self, shop_id: int) -> bool:
+        self._catalog_changed()
+        return self._delete("shops", shop_id)
+
+    async def create_rider(self, rider_data: dict) -> Optional[dict]:
+        try:
+            return copy.deepcopy(self._insert("riders", dict(rider_data)))
+        except ValueError:
+            return None
+
+    async def create_product(self, product_data: dict) -> Optional[dict]:
+        self._catalog_changed()
+        return copy.deepcopy(self._insert("products", dict(product_data)))
+
+    async def update_product(self, product_id: int, updates: dict) -> bool:
+        self._catalog_changed()
+        return self._update("products", product_id, updates) is not None
+
+    async def toggle_product_stock(self, product_id: int, new_status: bool) -> bool:
+        return await self.update_product(product_id, {"is_available": new_status})
+
+    def pool_metrics(self) -> dict[str, object]:
+        return {
+            "engine": False,
+            "backend": "memory",
+            **{f"{table}_rows": len(rows) for table, rows in self._rows.items()},
+        }
+
+    def close(self, close_connections: bool = True):
+        pass
\ No newline at end of file
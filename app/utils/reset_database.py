@@ -2,45 +2,98 @@ import asyncio
 import logging
 import os
 import sys
+import time
 
 sys.path.append(os.getcwd())
+from postgrest.types import CountMethod, ReturnMethod
+from sqlalchemy import create_engine, text
 from app.utils.supabase_client import get_supabase
 from app.utils.db_seed import seed_admin_user
 
 
-async def reset_database(create_admin=True):
+# Child tables first, so the row-by-row fallback never trips a foreign key.
+RESET_TABLES = [
+    ("order_items_archive", "id", True),
+    ("orders_archive", "id", False),
+    ("order_items", "id", True),
+    ("payouts", "id", False),
+    ("addresses", "id", False),
+    ("orders", "id", False),
+    ("products", "id", True),
+    ("shops", "id", True),
+    ("categories", "id", True),
+    ("coupons", "code", False),
+    ("riders", "id", False),
+    ("users", "id", False),
+]
+
+
+def truncate_all_tables() -> bool:
+    """Empty every table with one ``reset_app_data()`` TRUNCATE.
+
+    Uses the SQL engine when REFLEX_DB_URL is set and the Supabase RPC
+    otherwise. Returns False when neither is available or the call fails,
+    e.g. on a database migrated before the function existed.
+    """
+    db_url = os.environ.get("REFLEX_DB_URL") or os.environ.get("DATABASE_URL")
+    started = time.perf_counter()
+    try:
+        if db_url:
+            engine = create_engine(db_url)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("SELECT reset_app_data()"))
+            finally:
+                engine.dispose()
+        else:
+            supabase = get_supabase()
+            if not supabase:
+                return False
+            supabase.rpc("reset_app_data", {}).execute()
+    except Exception as e:
+        logging.exception(f"TRUNCATE reset failed: {e}")
+        return False
+    print(f"✅ Truncated all tables in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return True
+
+
+def clear_table(supabase, table_name, id_col="id", is_int=False):
+    """Delete every row server-side, returning only the count header."""
+    try:
+        query = supabase.table(table_name).delete(
+            count=CountMethod.exact, returning=ReturnMethod.minimal
+        )
+        if is_int:
+            result = query.gte(id_col, 0).execute()
+        else:
+            result = query.neq(id_col, "xxxxx").execute()
+        print(f"✅ Cleared {table_name}: {result.count or 0} rows")
+    except Exception as e:
+        logging.exception(f"Error clearing {table_name}: {e}")
+        print(f"⚠️  {table_name}: {str(e)[:100]}")
+
+
+def clear_all_tables() -> bool:
+    """Truncate everything, falling back to per-table deletes via PostgREST."""
+    if truncate_all_tables():
+        return True
     supabase = get_supabase()
     if not supabase:
         print(
-            "❌ Could not connect to Supabase. Please check your environment variables."
+            "❌ Could not connect to the database. Please check your environment variables."
         )
-        return
-    print("""🗑️  Clearing all data from database...
-""")
+        return False
+    print("↪️  Falling back to per-table deletes")
+    for table_name, id_col, is_int in RESET_TABLES:
+        clear_table(supabase, table_name, id_col=id_col, is_int=is_int)
+    return True
 
-    def clear_table(table_name, id_col="id", is_int=False):
-        try:
-            query = supabase.table(table_name).delete()
-            if is_int:
-                result = query.gte(id_col, 0).execute()
-            else:
-                result = query.neq(id_col, "xxxxx").execute()
-            count = len(result.data) if result.data else 0
-            print(f"✅ Cleared {table_name}: {count} rows")
-        except Exception as e:
-            logging.exception(f"Error clearing {table_name}: {e}")
-            print(f"⚠️  {table_name}: {str(e)[:100]}")
 
-    clear_table("order_items", is_int=True)
-    clear_table("payouts", is_int=False)
-    clear_table("addresses", is_int=False)
-    clear_table("orders", is_int=False)
-    clear_table("products", is_int=True)
-    clear_table("shops", is_int=True)
-    clear_table("categories", is_int=True)
-    clear_table("coupons", id_col="code", is_int=False)
-    clear_table("riders", is_int=False)
-    clear_table("users", is_int=False)
+async def reset_database(create_admin=True):
+    print("""🗑️  Clearing all data from database...
+""")
+    if not clear_all_tables():
+        return
     print(
         """
 """
@@ -3,25 +3,14 @@
 -- ============================================================
 -- This file creates all required tables and inserts sample data
 -- Run this in Supabase SQL Editor: https://supabase.com/dashboard
+-- Generated by `python -m app.utils.migrate_db --write-schema`; edit
+-- SCHEMA_SQL and SAMPLE_DATA_SQL in app/utils/migrate_db.py instead.
 -- ============================================================
 
 -- ============================================================
 -- STEP 1: CREATE TABLES
 -- ============================================================
 
--- Create users table
-CREATE TABLE IF NOT EXISTS users (
-    id TEXT PRIMARY KEY,
-    name TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    phone TEXT,
-    role TEXT DEFAULT 'customer',
-    password_hash TEXT NOT NULL,
-    avatar_url TEXT,
-    created_at TIMESTAMP DEFAULT NOW()
-);
-
--- Create categories table
 CREATE TABLE IF NOT EXISTS categories (
     id SERIAL PRIMARY KEY,
     name TEXT NOT NULL,
@@ -32,7 +21,6 @@ CREATE TABLE IF NOT EXISTS categories (
     sort_order INTEGER DEFAULT 0
 );
 
--- Create shops table
 CREATE TABLE IF NOT EXISTS shops (
     id SERIAL PRIMARY KEY,
     name TEXT NOT NULL,
@@ -44,10 +32,24 @@ CREATE TABLE IF NOT EXISTS shops (
     address TEXT,
     is_featured BOOLEAN DEFAULT FALSE,
     is_active BOOLEAN DEFAULT TRUE,
+    commission_rate DECIMAL(5,2) DEFAULT 10.0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    phone TEXT,
+    role TEXT DEFAULT 'customer',
+    password_hash TEXT NOT NULL,
+    avatar_url TEXT,
+    shop_id INTEGER REFERENCES shops(id),
     created_at TIMESTAMP DEFAULT NOW()
 );
 
--- Create products table
 CREATE TABLE IF NOT EXISTS products (
     id SERIAL PRIMARY KEY,
     shop_id INTEGER REFERENCES shops(id),
@@ -61,9 +63,19 @@ CREATE TABLE IF NOT EXISTS products (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
--- Create orders table
+-- Every order id is registered here once, by the orders_register_id trigger,
+-- so ids stay unique even though the partitioned orders key has to include
+-- created_at. orders, orders_archive and order_items all reference it.
+CREATE TABLE IF NOT EXISTS order_ids (
+    id TEXT PRIMARY KEY
+);
+
+-- Orders are range-partitioned by created_at month, so the customer, shop and
+-- rider listings, which only read recent orders by default, prune to the last
+-- few partitions. Rows outside every monthly partition land in orders_default
+-- until ensure_order_partitions() creates their month.
 CREATE TABLE IF NOT EXISTS orders (
-    id TEXT PRIMARY KEY,
+    id TEXT NOT NULL REFERENCES order_ids(id),
     subtotal DECIMAL(10,2) NOT NULL,
     delivery_fee DECIMAL(10,2) DEFAULT 15.0,
     total_amount DECIMAL(10,2) NOT NULL,
@@ -74,13 +86,42 @@ CREATE TABLE IF NOT EXISTS orders (
     payment_method TEXT,
     shop_id INTEGER REFERENCES shops(id),
     user_id TEXT,
-    created_at TIMESTAMP DEFAULT NOW()
-);
+    rider_id TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT;
 
--- Create order_items table
 CREATE TABLE IF NOT EXISTS order_items (
     id SERIAL PRIMARY KEY,
-    order_id TEXT REFERENCES orders(id),
+    order_id TEXT REFERENCES order_ids(id),
+    product_id INTEGER,
+    name TEXT,
+    price DECIMAL(10,2),
+    quantity INTEGER,
+    image_url TEXT
+);
+
+-- Cold storage for finished orders; archive_orders() moves them here.
+CREATE TABLE IF NOT EXISTS orders_archive (
+    id TEXT PRIMARY KEY REFERENCES order_ids(id),
+    subtotal DECIMAL(10,2) NOT NULL,
+    delivery_fee DECIMAL(10,2) DEFAULT 15.0,
+    total_amount DECIMAL(10,2) NOT NULL,
+    status TEXT DEFAULT 'Pending',
+    date TEXT,
+    time TEXT,
+    delivery_address TEXT,
+    payment_method TEXT,
+    shop_id INTEGER,
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    id INTEGER PRIMARY KEY,
+    order_id TEXT REFERENCES orders_archive(id),
     product_id INTEGER,
     name TEXT,
     price DECIMAL(10,2),
@@ -88,7 +129,6 @@ CREATE TABLE IF NOT EXISTS order_items (
     image_url TEXT
 );
 
--- Create riders table
 CREATE TABLE IF NOT EXISTS riders (
     id TEXT PRIMARY KEY,
     name TEXT NOT NULL,
@@ -96,10 +136,12 @@ CREATE TABLE IF NOT EXISTS riders (
     vehicle_type TEXT,
     status TEXT DEFAULT 'Offline',
     earnings DECIMAL(10,2) DEFAULT 0,
-    completed_orders INTEGER DEFAULT 0
+    completed_orders INTEGER DEFAULT 0,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
+    location_updated_at TIMESTAMP
 );
 
--- Create coupons table
 CREATE TABLE IF NOT EXISTS coupons (
     code TEXT PRIMARY KEY,
     discount DECIMAL(10,2),
@@ -108,7 +150,6 @@ CREATE TABLE IF NOT EXISTS coupons (
     is_active BOOLEAN DEFAULT TRUE
 );
 
--- Create addresses table
 CREATE TABLE IF NOT EXISTS addresses (
     id TEXT PRIMARY KEY,
     user_id TEXT,
@@ -117,7 +158,6 @@ CREATE TABLE IF NOT EXISTS addresses (
     phone TEXT
 );
 
--- Create payouts table
 CREATE TABLE IF NOT EXISTS payouts (
     id TEXT PRIMARY KEY,
     date TEXT,
@@ -128,6 +168,576 @@ CREATE TABLE IF NOT EXISTS payouts (
     status TEXT
 );
 
+-- Dashboard counters: one row per (day, shop) kept current by a trigger on
+-- orders. An order contributes to revenue unless it is Cancelled, and to
+-- delivered_revenue (its subtotal) once it is Delivered or Completed.
+CREATE TABLE IF NOT EXISTS shop_daily_stats (
+    day DATE NOT NULL,
+    shop_id INTEGER NOT NULL,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    delivered_count INTEGER NOT NULL DEFAULT 0,
+    delivered_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    cancelled_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, shop_id)
+);
+
+-- Revenue rollups per hour and per day, for each shop and platform-wide
+-- (shop_id 0), maintained by refresh_revenue_rollups().
+CREATE TABLE IF NOT EXISTS revenue_rollups (
+    granularity TEXT NOT NULL CHECK (granularity IN ('hour', 'day')),
+    shop_id INTEGER NOT NULL,
+    bucket TIMESTAMP NOT NULL,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    gmv DECIMAL(14,2) NOT NULL DEFAULT 0,
+    commission DECIMAL(14,2) NOT NULL DEFAULT 0,
+    delivery_fees DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, shop_id, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name TEXT PRIMARY KEY,
+    rolled_up_to TIMESTAMP NOT NULL
+);
+
+-- Hot-path indexes: one composite index per DatabaseManager query shape. The
+-- order listings filter on one column and page by (created_at, id) newest
+-- first, so the index order matches the ORDER BY and no sort is needed.
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_shop_created ON orders (shop_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_rider_created ON orders (rider_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders (status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_products_shop_available ON products (shop_id, id) WHERE is_available;
+CREATE INDEX IF NOT EXISTS idx_shops_category_active ON shops (category_slug, id) WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_orders_archive_created ON orders_archive (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_user_created ON orders_archive (user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_shop_created ON orders_archive (shop_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_rider_created ON orders_archive (rider_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_items_archive_order_id ON order_items_archive (order_id);
+
+CREATE OR REPLACE VIEW orders_all AS
+SELECT * FROM orders
+UNION ALL
+SELECT * FROM orders_archive;
+
+-- Storefront bootstrap: categories, active shops and available products in one
+-- round trip, projected to the columns the storefront cards render. The version
+-- is a hash of the document, so callers that pass the version they already hold
+-- get back {"unchanged": true} instead of the data.
+CREATE OR REPLACE FUNCTION storefront_bootstrap(known_version TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    payload JSONB;
+    payload_version TEXT;
+BEGIN
+    SELECT jsonb_build_object(
+        'categories', COALESCE((SELECT jsonb_agg(c ORDER BY c.sort_order, c.id) FROM categories c WHERE c.is_active), '[]'::jsonb),
+        'shops', COALESCE((SELECT jsonb_agg(to_jsonb(s) ORDER BY s.id) FROM (
+            SELECT id, name, category_slug, rating, delivery_time, distance, image_url, address, is_featured
+            FROM shops WHERE is_active) s), '[]'::jsonb),
+        'products', COALESCE((SELECT jsonb_agg(to_jsonb(p) ORDER BY p.id) FROM (
+            SELECT id, shop_id, name, price, original_price, image_url, unit, is_available
+            FROM products WHERE is_available) p), '[]'::jsonb)
+    ) INTO payload;
+    payload_version := md5(payload::text);
+    IF known_version IS NOT DISTINCT FROM payload_version THEN
+        RETURN jsonb_build_object('version', payload_version, 'unchanged', TRUE);
+    END IF;
+    RETURN payload || jsonb_build_object('version', payload_version, 'unchanged', FALSE);
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Rider settlement: credit earnings and completed deliveries in one atomic
+-- UPDATE. credits is a JSON array of {"rider_id", "amount", "deliveries"}
+-- objects; several credits for the same rider are summed first.
+CREATE OR REPLACE FUNCTION settle_rider_deliveries(credits JSONB)
+RETURNS SETOF riders AS $$
+    UPDATE riders r
+    SET earnings = COALESCE(r.earnings, 0) + c.amount,
+        completed_orders = COALESCE(r.completed_orders, 0) + c.deliveries
+    FROM (
+        SELECT rider_id, SUM(amount) AS amount, SUM(COALESCE(deliveries, 1))::INTEGER AS deliveries
+        FROM jsonb_to_recordset(credits) AS x(rider_id TEXT, amount NUMERIC, deliveries INTEGER)
+        GROUP BY rider_id
+    ) c
+    WHERE r.id = c.rider_id
+    RETURNING r.*;
+$$ LANGUAGE sql;
+
+-- Delivery settlement: mark orders Delivered and credit their riders in one
+-- statement. deliveries is a JSON array of {"order_id", "rider_id", "amount"}
+-- objects. Only orders still Out for Delivery with that rider change, and only
+-- those are credited, so a repeated or stale call pays nothing. Returns one row
+-- per delivered order with its routing columns and the rider's new totals.
+CREATE OR REPLACE FUNCTION deliver_orders(deliveries JSONB)
+RETURNS TABLE (
+    id TEXT,
+    status TEXT,
+    shop_id INTEGER,
+    user_id TEXT,
+    rider_id TEXT,
+    created_at TIMESTAMP,
+    earnings DECIMAL(10,2),
+    completed_orders INTEGER
+) AS $$
+    WITH delivered AS (
+        UPDATE orders o SET status = 'Delivered'
+        FROM jsonb_to_recordset(deliveries) AS d(order_id TEXT, rider_id TEXT, amount NUMERIC)
+        WHERE o.id = d.order_id AND o.rider_id = d.rider_id AND o.status = 'Out for Delivery'
+        RETURNING o.id, o.status, o.shop_id, o.user_id, o.rider_id, o.created_at, d.amount
+    ), credited AS (
+        UPDATE riders r
+        SET earnings = COALESCE(r.earnings, 0) + c.amount,
+            completed_orders = COALESCE(r.completed_orders, 0) + c.deliveries
+        FROM (
+            SELECT x.rider_id, SUM(x.amount) AS amount, COUNT(*)::INTEGER AS deliveries
+            FROM delivered x
+            GROUP BY x.rider_id
+        ) c
+        WHERE r.id = c.rider_id
+        RETURNING r.id, r.earnings, r.completed_orders
+    )
+    SELECT d.id, d.status, d.shop_id, d.user_id, d.rider_id, d.created_at,
+           c.earnings, c.completed_orders
+    FROM delivered d LEFT JOIN credited c ON c.id = d.rider_id;
+$$ LANGUAGE sql;
+
+-- Transactional checkout: insert every split order and all of its items in one
+-- statement, so a failure leaves no orphan orders. orders is a JSON array of
+-- order objects, each carrying its line items under "items". The first id that
+-- is taken or repeated is named instead of failing on the order_ids key.
+CREATE OR REPLACE FUNCTION place_orders(orders JSONB)
+RETURNS TABLE (order_id TEXT) AS $$
+#variable_conflict use_column
+DECLARE
+    taken TEXT;
+BEGIN
+    SELECT o.id INTO taken
+    FROM jsonb_to_recordset(place_orders.orders) AS o(id TEXT)
+    GROUP BY o.id
+    HAVING COUNT(*) > 1 OR EXISTS (SELECT 1 FROM order_ids r WHERE r.id = o.id)
+    LIMIT 1;
+    IF taken IS NOT NULL THEN
+        RAISE EXCEPTION 'order id % is already in use', taken USING ERRCODE = 'unique_violation';
+    END IF;
+    RETURN QUERY
+    WITH new_orders AS (
+        INSERT INTO orders (id, subtotal, delivery_fee, total_amount, status, date, time, delivery_address, payment_method, shop_id, user_id)
+        SELECT o.id, o.subtotal, o.delivery_fee, o.total_amount, COALESCE(o.status, 'Pending'), o.date, o.time, o.delivery_address, o.payment_method, o.shop_id, o.user_id
+        FROM jsonb_to_recordset(place_orders.orders) AS o(id TEXT, subtotal NUMERIC, delivery_fee NUMERIC, total_amount NUMERIC, status TEXT, date TEXT, time TEXT, delivery_address TEXT, payment_method TEXT, shop_id INTEGER, user_id TEXT)
+        RETURNING orders.id
+    ), new_items AS (
+        INSERT INTO order_items (order_id, product_id, name, price, quantity, image_url)
+        SELECT o->>'id', i.product_id, i.name, i.price, i.quantity, i.image_url
+        FROM jsonb_array_elements(place_orders.orders) AS o,
+             jsonb_to_recordset(o->'items') AS i(product_id INTEGER, name TEXT, price NUMERIC, quantity INTEGER, image_url TEXT)
+    )
+    SELECT n.id FROM new_orders n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- PostgREST embeds order_items(...) through this computed relationship, since
+-- order_items references order_ids rather than the partitioned orders table.
+CREATE OR REPLACE FUNCTION order_items(orders)
+RETURNS SETOF order_items ROWS 4 AS $$
+    SELECT * FROM order_items WHERE order_id = $1.id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION ensure_order_partitions(
+    from_month DATE DEFAULT NOW()::DATE, months_ahead INTEGER DEFAULT 2
+)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_month)::DATE;
+    last_month DATE := (date_trunc('month', NOW()) + make_interval(months => months_ahead))::DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Rows moved out of the default partition are not new orders.
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WHILE month_start <= last_month LOOP
+        partition_name := 'orders_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM orders_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, (month_start + INTERVAL '1 month')::DATE, partition_name
+            );
+            EXECUTE format(
+                'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_order_partitions();
+
+-- The business day of an order: its "date" text when it is an ISO date,
+-- otherwise the day it was created.
+CREATE OR REPLACE FUNCTION order_stats_day(order_date TEXT, created_at TIMESTAMP)
+RETURNS DATE AS $$
+    SELECT CASE WHEN order_date ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+                THEN order_date::DATE ELSE COALESCE(created_at, NOW())::DATE END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add (sign = 1) or remove (sign = -1) one order's contribution.
+CREATE OR REPLACE FUNCTION apply_order_stats(
+    order_date TEXT, created_at TIMESTAMP, shop_id INTEGER, status TEXT,
+    total_amount NUMERIC, subtotal NUMERIC, sign INTEGER
+)
+RETURNS VOID AS $$
+    INSERT INTO shop_daily_stats AS s (day, shop_id, orders_count, revenue, delivered_count, delivered_revenue, cancelled_count)
+    VALUES (
+        order_stats_day(order_date, created_at),
+        COALESCE(shop_id, 0),
+        sign,
+        sign * CASE WHEN status = 'Cancelled' THEN 0 ELSE COALESCE(total_amount, 0) END,
+        sign * CASE WHEN status IN ('Delivered', 'Completed') THEN 1 ELSE 0 END,
+        sign * CASE WHEN status IN ('Delivered', 'Completed') THEN COALESCE(subtotal, 0) ELSE 0 END,
+        sign * CASE WHEN status = 'Cancelled' THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (day, shop_id) DO UPDATE SET
+        orders_count = s.orders_count + EXCLUDED.orders_count,
+        revenue = s.revenue + EXCLUDED.revenue,
+        delivered_count = s.delivered_count + EXCLUDED.delivered_count,
+        delivered_revenue = s.delivered_revenue + EXCLUDED.delivered_revenue,
+        cancelled_count = s.cancelled_count + EXCLUDED.cancelled_count;
+$$ LANGUAGE sql;
+
+-- Archiving and partition maintenance set minidrop.skip_order_stats: moving
+-- an order between tables does not change what it contributed.
+CREATE OR REPLACE FUNCTION orders_daily_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('minidrop.skip_order_stats', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_order_stats(OLD.date, OLD.created_at, OLD.shop_id, OLD.status, OLD.total_amount, OLD.subtotal, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_order_stats(NEW.date, NEW.created_at, NEW.shop_id, NEW.status, NEW.total_amount, NEW.subtotal, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Publishes order changes on the order_changes channel for the app's LISTEN
+-- connection. The payload carries only the columns that decide which screens
+-- show an order, well under the 8000 byte NOTIFY limit; listeners fetch the
+-- rest. Bulk loads set minidrop.skip_order_feed and send one RESYNC instead,
+-- and archive moves (minidrop.skip_order_stats) are not changes to the order.
+CREATE OR REPLACE FUNCTION orders_notify_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('order_changes', '{"op": "TRUNCATE"}');
+        RETURN NULL;
+    END IF;
+    IF current_setting('minidrop.skip_order_stats', true) = 'on'
+       OR current_setting('minidrop.skip_order_feed', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+    PERFORM pg_notify('order_changes', json_build_object(
+        'op', TG_OP, 'id', r.id, 'status', r.status, 'shop_id', r.shop_id,
+        'user_id', r.user_id, 'rider_id', r.rider_id, 'created_at', r.created_at
+    )::TEXT);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION register_order_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO order_ids (id) VALUES (NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Changing created_at could move an order to another partition, which
+-- Postgres does as a delete plus an insert and would register the id again.
+CREATE OR REPLACE FUNCTION freeze_order_key()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'order % cannot change its id or created_at', OLD.id;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_register_id ON orders;
+CREATE TRIGGER orders_register_id BEFORE INSERT ON orders
+    FOR EACH ROW EXECUTE FUNCTION register_order_id();
+DROP TRIGGER IF EXISTS orders_freeze_key ON orders;
+CREATE TRIGGER orders_freeze_key BEFORE UPDATE OF id, created_at ON orders
+    FOR EACH ROW
+    WHEN (OLD.id IS DISTINCT FROM NEW.id OR OLD.created_at IS DISTINCT FROM NEW.created_at)
+    EXECUTE FUNCTION freeze_order_key();
+DROP TRIGGER IF EXISTS orders_daily_stats_write ON orders;
+CREATE TRIGGER orders_daily_stats_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_daily_stats_trigger();
+DROP TRIGGER IF EXISTS orders_daily_stats_update ON orders;
+CREATE TRIGGER orders_daily_stats_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.total_amount IS DISTINCT FROM NEW.total_amount
+          OR OLD.subtotal IS DISTINCT FROM NEW.subtotal
+          OR OLD.shop_id IS DISTINCT FROM NEW.shop_id
+          OR OLD.date IS DISTINCT FROM NEW.date)
+    EXECUTE FUNCTION orders_daily_stats_trigger();
+DROP TRIGGER IF EXISTS orders_notify_write ON orders;
+CREATE TRIGGER orders_notify_write AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION orders_notify_trigger();
+DROP TRIGGER IF EXISTS orders_notify_update ON orders;
+CREATE TRIGGER orders_notify_update AFTER UPDATE ON orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.rider_id IS DISTINCT FROM NEW.rider_id)
+    EXECUTE FUNCTION orders_notify_trigger();
+DROP TRIGGER IF EXISTS orders_notify_truncate ON orders;
+CREATE TRIGGER orders_notify_truncate AFTER TRUNCATE ON orders
+    FOR EACH STATEMENT EXECUTE FUNCTION orders_notify_trigger();
+
+-- Moves Delivered and Completed orders older than older_than, with their
+-- items, to the archive tables in batches, and checks that every moved order
+-- left nothing behind. Returns the number of orders moved, 0 when another
+-- worker holds the job lock.
+CREATE OR REPLACE FUNCTION archive_orders(
+    older_than INTERVAL DEFAULT '180 days', batch_size INTEGER DEFAULT 5000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved_ids TEXT[];
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(7316022) THEN
+        RETURN 0;
+    END IF;
+    PERFORM ensure_order_partitions();
+    PERFORM set_config('minidrop.skip_order_stats', 'on', true);
+    WITH batch AS (
+        SELECT id, created_at FROM orders
+        WHERE created_at < NOW() - older_than AND status IN ('Delivered', 'Completed')
+        ORDER BY created_at
+        LIMIT batch_size
+    ), moved_orders AS (
+        DELETE FROM orders o USING batch b
+        WHERE o.id = b.id AND o.created_at = b.created_at
+        RETURNING o.*
+    ), archived AS (
+        INSERT INTO orders_archive SELECT * FROM moved_orders
+        RETURNING id
+    ), moved_items AS (
+        DELETE FROM order_items i USING archived a
+        WHERE i.order_id = a.id
+        RETURNING i.*
+    ), archived_items AS (
+        INSERT INTO order_items_archive SELECT * FROM moved_items
+    )
+    SELECT COALESCE(array_agg(id), '{}') INTO moved_ids FROM archived;
+    IF EXISTS (SELECT 1 FROM orders WHERE id = ANY(moved_ids))
+       OR EXISTS (SELECT 1 FROM order_items WHERE order_id = ANY(moved_ids)) THEN
+        RAISE EXCEPTION 'archive_orders left rows behind for archived orders';
+    END IF;
+    PERFORM set_config('minidrop.skip_order_stats', 'off', true);
+    RETURN cardinality(moved_ids);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recomputes every rollup bucket from the start of the day before the
+-- watermark, so late status changes are picked up, and advances the watermark
+-- by at most max_span per call. rolled_up_to is the new watermark, or NULL
+-- when another worker holds the job lock or there are no orders yet;
+-- caught_up is false while older history is still waiting for another step.
+CREATE OR REPLACE FUNCTION refresh_revenue_rollups(
+    lookback INTERVAL DEFAULT '1 day',
+    max_span INTERVAL DEFAULT '31 days',
+    OUT rolled_up_to TIMESTAMP,
+    OUT caught_up BOOLEAN
+) AS $$
+DECLARE
+    done_to TIMESTAMP;
+    from_ts TIMESTAMP;
+    to_ts TIMESTAMP;
+BEGIN
+    caught_up := TRUE;
+    IF NOT pg_try_advisory_xact_lock(7316019) THEN
+        RETURN;
+    END IF;
+    SELECT w.rolled_up_to INTO done_to FROM rollup_watermarks w WHERE w.name = 'revenue';
+    IF done_to IS NULL THEN
+        SELECT MIN(created_at) + lookback INTO done_to FROM orders_all;
+        IF done_to IS NULL THEN
+            RETURN;
+        END IF;
+    END IF;
+    from_ts := date_trunc('day', done_to - lookback);
+    to_ts := LEAST(NOW()::TIMESTAMP, from_ts + max_span);
+
+    DELETE FROM revenue_rollups
+    WHERE granularity IN ('hour', 'day') AND bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'hour',
+           CASE WHEN GROUPING(o.shop_id) = 1 THEN 0 ELSE o.shop_id END,
+           date_trunc('hour', o.created_at),
+           COUNT(*),
+           COALESCE(SUM(o.total_amount), 0),
+           COALESCE(SUM(o.subtotal * COALESCE(s.commission_rate, 10) / 100), 0),
+           COALESCE(SUM(o.delivery_fee), 0)
+    FROM orders_all o LEFT JOIN shops s ON s.id = o.shop_id
+    WHERE o.created_at >= from_ts AND o.created_at < to_ts
+      AND o.status IS DISTINCT FROM 'Cancelled'
+    GROUP BY GROUPING SETS ((date_trunc('hour', o.created_at), o.shop_id), (date_trunc('hour', o.created_at)))
+    HAVING GROUPING(o.shop_id) = 1 OR o.shop_id IS NOT NULL;
+
+    INSERT INTO revenue_rollups (granularity, shop_id, bucket, orders_count, gmv, commission, delivery_fees)
+    SELECT 'day', r.shop_id, date_trunc('day', r.bucket),
+           SUM(r.orders_count), SUM(r.gmv), SUM(r.commission), SUM(r.delivery_fees)
+    FROM revenue_rollups r
+    WHERE r.granularity = 'hour' AND r.bucket >= from_ts AND r.bucket < to_ts
+    GROUP BY r.shop_id, date_trunc('day', r.bucket);
+
+    INSERT INTO rollup_watermarks (name, rolled_up_to) VALUES ('revenue', to_ts)
+    ON CONFLICT (name) DO UPDATE SET rolled_up_to = EXCLUDED.rolled_up_to;
+    rolled_up_to := to_ts;
+    caught_up := to_ts >= NOW()::TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row counts, sizes and dead-tuple bloat for every table in one round trip.
+-- Counts come from the planner's pg_class estimates (falling back to the
+-- statistics collector for never-analysed tables) unless exact is true, in
+-- which case each table is counted in full. Partitioned tables report the
+-- totals of their leaf partitions, and the partitions themselves are not
+-- listed.
+CREATE OR REPLACE FUNCTION table_stats(exact BOOLEAN DEFAULT FALSE)
+RETURNS TABLE (
+    table_name TEXT,
+    row_count BIGINT,
+    is_exact BOOLEAN,
+    table_bytes BIGINT,
+    index_bytes BIGINT,
+    dead_rows BIGINT,
+    bloat_ratio NUMERIC,
+    last_vacuum TIMESTAMPTZ,
+    last_analyze TIMESTAMPTZ
+) AS $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT c.oid, c.relname, c.relkind
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+        ORDER BY c.relname
+    LOOP
+        SELECT
+            COALESCE(SUM(CASE WHEN NOT tree.counted THEN 0
+                              WHEN pc.reltuples >= 0 THEN pc.reltuples::BIGINT
+                              ELSE COALESCE(s.n_live_tup, 0) END), 0),
+            SUM(pg_table_size(pc.oid)),
+            SUM(pg_indexes_size(pc.oid)),
+            SUM(CASE WHEN tree.counted THEN COALESCE(s.n_dead_tup, 0) ELSE 0 END),
+            ROUND(SUM(CASE WHEN tree.counted THEN COALESCE(s.n_dead_tup, 0) ELSE 0 END)::NUMERIC
+                  / NULLIF(SUM(CASE WHEN tree.counted
+                                    THEN COALESCE(s.n_live_tup, 0) + COALESCE(s.n_dead_tup, 0)
+                                    ELSE 0 END), 0), 4),
+            MAX(GREATEST(s.last_vacuum, s.last_autovacuum)),
+            MAX(GREATEST(s.last_analyze, s.last_autoanalyze))
+        INTO row_count, table_bytes, index_bytes, dead_rows, bloat_ratio, last_vacuum, last_analyze
+        FROM (
+            SELECT relid, TRUE AS counted FROM pg_partition_tree(t.oid) WHERE isleaf
+            UNION SELECT t.oid, t.relkind = 'r'
+        ) tree
+        JOIN pg_class pc ON pc.oid = tree.relid
+        LEFT JOIN pg_stat_user_tables s ON s.relid = pc.oid;
+        table_name := t.relname;
+        is_exact := exact;
+        IF exact THEN
+            EXECUTE format('SELECT COUNT(*) FROM %I', t.relname) INTO row_count;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Constant-time purges. TRUNCATE skips row triggers, so the order-derived
+-- stats and rollups are emptied alongside the orders they were built from.
+CREATE OR REPLACE FUNCTION purge_orders()
+RETURNS VOID AS $$
+    TRUNCATE order_items, orders, order_items_archive, orders_archive, order_ids,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION reset_app_data()
+RETURNS VOID AS $$
+    TRUNCATE order_items, payouts, addresses, orders, products, shops, categories,
+             coupons, riders, users, order_items_archive, orders_archive, order_ids,
+             shop_daily_stats, revenue_rollups, rollup_watermarks
+        RESTART IDENTITY CASCADE;
+$$ LANGUAGE sql;
+
+-- None of the maintenance functions may be callable through the public API
+-- roles.
+REVOKE EXECUTE ON FUNCTION purge_orders() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION reset_app_data() FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) FROM PUBLIC;
+REVOKE EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE EXECUTE ON FUNCTION purge_orders() FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION reset_app_data() FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) FROM anon, authenticated;
+        REVOKE EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) FROM anon, authenticated;
+        GRANT EXECUTE ON FUNCTION purge_orders() TO service_role;
+        GRANT EXECUTE ON FUNCTION reset_app_data() TO service_role;
+        GRANT EXECUTE ON FUNCTION ensure_order_partitions(DATE, INTEGER) TO service_role;
+        GRANT EXECUTE ON FUNCTION archive_orders(INTERVAL, INTEGER) TO service_role;
+    END IF;
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT NOW()
+);
+INSERT INTO schema_migrations (version, name, checksum) VALUES
+(1, 'base tables', 'fe385adfa4027cac23fdc5dce912a883e76a4be4986b3efe364f4fa1b38da580'),
+(2, 'storefront, settlement and checkout functions', '573c56ef83193616e692554ecdf133b0f67ba258fc1e5d7b6fbddc4a1748cd3c'),
+(3, 'hot path indexes', '6fbb3f2c351962162cb95d9186afab479d1d971efa7495a1a50adc777c1606b8'),
+(4, 'shop daily stats', 'b06d8a5fbdde9f0887f89741f9f3638f33236cd6afe95ce836ae75e89e847471'),
+(5, 'revenue rollups', 'e53359e7298f62043286bf7e7e3101f526ad6b783ed5e592bcc3f5814586047b'),
+(6, 'table stats function', '40b422f883aadcfbdfb192da5b2695c19f1cb481f5c50e86187be591df75a589'),
+(7, 'truncate fast paths', '0de0d4fced6f62ec172df11fb90d9312529e431ed880b32e7f55bbb7f4f10fc1'),
+(8, 'partition orders by month', '1f7ab2ea2dd6cd934701d8ee21bfacd3b38f0a4ba572cafaa6c672f821609bc1'),
+(9, 'order change feed', '0d83e760cefbbd55f699b7cc2fffb7b9a7a8c6390bb6508d351e00cec15860c1'),
+(10, 'shop and rider coordinates', 'da6045bd01efcf9dadb59a2799f7d36c452ef87ad6e8dd3a6dfda54602ae29c4'),
+(11, 'rollup catch-up status', '8c7f6c76f486cdfbc0a31f164289d64039659d15a140efde7269b8eaed9f4af7'),
+(12, 'partition-aware table stats', 'b7e347d928407eeb8fcd059fa2a0230682a3f53caeb36685d744ca59797b3195'),
+(13, 'delivery settlement', 'f93aa3823f9b283d0781367320c549b41bf47a0da3d30b96b8914ba0bc00614b'),
+(14, 'order id registry', 'f16ea87e49740666f0d86373010dc6b32f3406b219a50956b323e3f73a194751')
+ON CONFLICT (version) DO NOTHING;
+
 -- ============================================================
 -- STEP 2: INSERT SAMPLE DATA
 -- ============================================================
@@ -149,16 +759,20 @@ INSERT INTO categories (name, slug, icon, color_bg, sort_order) VALUES
 ('Bakery', 'bakery', 'croissant', 'bg-amber-100', 6)
 ON CONFLICT (slug) DO NOTHING;
 
--- Insert Shops
-INSERT INTO shops (name, category_slug, rating, delivery_time, distance, image_url, address, is_featured) VALUES
-('Fresh Mart Grocery', 'grocery', 4.8, '15-20 min', '0.8 km', 'https://images.unsplash.com/photo-1542838132-92c53300491e?auto=format&fit=crop&w=400&q=80', '12 Main St', TRUE),
-('City Medicos', 'medical', 4.5, '10-15 min', '0.5 km', 'https://images.unsplash.com/photo-1585435557343-3b092031a831?auto=format&fit=crop&w=400&q=80', '45 Park Ave', TRUE),
-('Daily Dairy Needs', 'dairy', 4.9, '10 min', '0.2 km', 'https://images.unsplash.com/photo-1628088062854-d1870b4553da?auto=format&fit=crop&w=400&q=80', '88 Market Rd', FALSE),
-('Student Stationers', 'stationery', 4.2, '25-30 min', '1.5 km', 'https://images.unsplash.com/photo-1550399105-c4db5fb85c18?auto=format&fit=crop&w=400&q=80', 'University Sq', FALSE),
-('Oven Fresh Bakery', 'bakery', 4.7, '20-25 min', '1.2 km', 'https://images.unsplash.com/photo-1509440159596-0249088772ff?auto=format&fit=crop&w=400&q=80', 'Baker St', TRUE);
+-- Insert Shops (only into an empty table: shops have no natural key)
+INSERT INTO shops (name, category_slug, rating, delivery_time, distance, image_url, address, is_featured, latitude, longitude)
+SELECT * FROM (VALUES
+('Fresh Mart Grocery', 'grocery', 4.8, '15-20 min', '0.8 km', 'https://images.unsplash.com/photo-1542838132-92c53300491e?auto=format&fit=crop&w=400&q=80', '12 Main St', TRUE, 12.9770, 77.5990),
+('City Medicos', 'medical', 4.5, '10-15 min', '0.5 km', 'https://images.unsplash.com/photo-1585435557343-3b092031a831?auto=format&fit=crop&w=400&q=80', '45 Park Ave', TRUE, 12.9690, 77.5985),
+('Daily Dairy Needs', 'dairy', 4.9, '10 min', '0.2 km', 'https://images.unsplash.com/photo-1628088062854-d1870b4553da?auto=format&fit=crop&w=400&q=80', '88 Market Rd', FALSE, 12.9730, 77.5930),
+('Student Stationers', 'stationery', 4.2, '25-30 min', '1.5 km', 'https://images.unsplash.com/photo-1550399105-c4db5fb85c18?auto=format&fit=crop&w=400&q=80', 'University Sq', FALSE, 12.9590, 77.5880),
+('Oven Fresh Bakery', 'bakery', 4.7, '20-25 min', '1.2 km', 'https://images.unsplash.com/photo-1509440159596-0249088772ff?auto=format&fit=crop&w=400&q=80', 'Baker St', TRUE, 12.9810, 77.5880)
+) AS v
+WHERE NOT EXISTS (SELECT 1 FROM shops);
 
 -- Insert Products (shop_id references the shops created above)
-INSERT INTO products (shop_id, name, price, original_price, image_url, description, unit) VALUES
+INSERT INTO products (shop_id, name, price, original_price, image_url, description, unit)
+SELECT * FROM (VALUES
 (1, 'Full Cream Milk', 32.00, 35.00, 'https://images.unsplash.com/photo-1563636619-e9143da7973b?auto=format&fit=crop&w=200&q=80', 'Fresh full cream milk', '1 L'),
 (1, 'Whole Wheat Bread', 45.00, 50.00, 'https://images.unsplash.com/photo-1598373182133-52452f7691ef?auto=format&fit=crop&w=200&q=80', 'Freshly baked brown bread', '400g'),
 (1, 'Farm Eggs', 65.00, 75.00, 'https://images.unsplash.com/photo-1506976785307-8732e854ad03?auto=format&fit=crop&w=200&q=80', 'Pack of 6 fresh eggs', '6 pcs'),
@@ -167,12 +781,14 @@ INSERT INTO products (shop_id, name, price, original_price, image_url, descripti
 (2, 'Cotton Bandage', 30.00, 35.00, 'https://images.unsplash.com/photo-1583947215259-38e31be8751f?auto=format&fit=crop&w=200&q=80', 'Sterile bandage', '1 Roll'),
 (1, 'Lays Classic Salted', 20.00, 20.00, 'https://images.unsplash.com/photo-1566478919030-2609e87011bc?auto=format&fit=crop&w=200&q=80', 'Classic potato chips', '50g'),
 (4, 'Ballpoint Pen Blue', 10.00, 12.00, 'https://images.unsplash.com/photo-1585336261022-680e295ce3fe?auto=format&fit=crop&w=200&q=80', 'Smooth writing pen', '1 pc'),
-(4, 'Spiral Notebook', 55.00, 60.00, 'https://images.unsplash.com/photo-1531346878377-a516a63156a5?auto=format&fit=crop&w=200&q=80', '100 pages ruled', '1 pc');
+(4, 'Spiral Notebook', 55.00, 60.00, 'https://images.unsplash.com/photo-1531346878377-a516a63156a5?auto=format&fit=crop&w=200&q=80', '100 pages ruled', '1 pc')
+) AS v
+WHERE NOT EXISTS (SELECT 1 FROM products);
 
 -- Insert Riders
-INSERT INTO riders (id, name, phone, vehicle_type, status, earnings, completed_orders) VALUES
-('r1', 'Rahul Kumar', '9876543210', 'Bike', 'Online', 1250.00, 45),
-('r2', 'Amit Singh', '9876543211', 'Scooter', 'Offline', 890.00, 32)
+INSERT INTO riders (id, name, phone, vehicle_type, status, earnings, completed_orders, latitude, longitude) VALUES
+('r1', 'Rahul Kumar', '9876543210', 'Bike', 'Online', 1250.00, 45, 12.9750, 77.5960),
+('r2', 'Amit Singh', '9876543211', 'Scooter', 'Offline', 890.00, 32, 12.9650, 77.5900)
 ON CONFLICT (id) DO NOTHING;
 
 -- Insert Coupons
@@ -0,0 +1,62 @@
+from app.utils import cache
+from app.utils.cache import TTLCache
+
+
+def test_invalidate_drops_only_the_matching_prefix():
+    products = TTLCache()
+    products.set(("products", 1, "public"), ["a"])
+    products.set(("products", 1, "owner"), ["a", "b"])
+    products.set(("products", 2, "public"), ["c"])
+    products.set(("shops",), ["s"])
+
+    products.invalidate("products", 1)
+    assert products.get(("products", 1, "public")) is None
+    assert products.get(("products", 1, "owner")) is None
+    assert products.get(("products", 2, "public")) == ["c"]
+
+    products.invalidate("products")
+    assert products.get(("products", 2, "public")) is None
+    assert products.get(("shops",)) == ["s"]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    shops = TTLCache(ttl=5)
+    shops.set(("shops",), ["s"])
+
+    now[0] += 4
+    assert shops.get(("shops",)) == ["s"]
+    now[0] += 2
+    assert shops.get(("shops",)) is None
+    assert shops.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    shops = TTLCache(maxsize=2)
+    shops.set(("shop", 1), {"id": 1})
+    shops.set(("shop", 2), {"id": 2})
+    shops.get(("shop", 1))
+    shops.set(("shop", 3), {"id": 3})
+
+    assert shops.get(("shop", 2)) is None
+    assert shops.get(("shop", 1)) == {"id": 1}
+    assert shops.get(("shop", 3)) == {"id": 3}
+
+
+def test_zero_ttl_disables_caching():
+    disabled = TTLCache(ttl=0)
+    disabled.set(("shops",), ["s"])
+    assert disabled.get(("shops",)) is None
+
+
+def test_values_are_copied_in_and_out():
+    products = TTLCache()
+    rows = [{"id": 1, "tags": ["fresh"]}]
+    products.set(("products",), rows)
+    rows[0]["tags"].append("stale")
+
+    cached = products.get(("products",))
+    assert cached == [{"id": 1, "tags": ["fresh"]}]
+    cached[0]["id"] = 2
+    assert products.get(("products",))[0]["id"] == 1
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import database
+from app.utils.metrics import QUERY_SECONDS, instrument
+from app.utils.order_feed import order_feed
+from app.utils.repository import MemoryRepository
+
+
+@pytest.fixture
+def no_supabase(monkeypatch):
+    monkeypatch.setattr(database, "get_supabase", lambda: None)
+    monkeypatch.setenv("REFLEX_DB_URL", "postgresql+psycopg://localhost/unused")
+
+
+def test_sql_backend_requires_supabase(no_supabase, monkeypatch):
+    monkeypatch.setattr(database, "DB_BACKEND", "sql")
+    with pytest.raises(RuntimeError, match="SUPABASE_URL"):
+        database._create_repository()
+
+
+@pytest.mark.parametrize("backend", ["supabase", "memory"])
+def test_falls_back_to_memory_without_supabase(no_supabase, monkeypatch, backend):
+    monkeypatch.setattr(database, "DB_BACKEND", backend)
+    assert isinstance(database._create_repository(), MemoryRepository)
+
+
+def test_run_blocking_uses_the_db_executor():
+    name = asyncio.run(database.run_blocking(lambda: threading.current_thread().name))
+    assert name.startswith("db-worker")
+
+
+def test_run_blocking_timeout_marks_the_call_as_failed():
+    @instrument("test_run_blocking_timeout")
+    async def slow():
+        return await database.run_blocking(time.sleep, 0.2, timeout=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(slow())
+    snapshot = QUERY_SECONDS.snapshot()
+    assert snapshot[("test_run_blocking_timeout", "error")]["count"] == 1
+    assert ("test_run_blocking_timeout", "ok") not in snapshot
+
+
+def test_order_cursor_round_trip():
+    cursor = database.encode_order_cursor(
+        {"id": "ORD-1|2", "created_at": "2024-05-01T10:00:00"}
+    )
+    assert database.decode_order_cursor(cursor) == ("2024-05-01T10:00:00", "ORD-1|2")
+
+
+def test_order_cursor_without_created_at():
+    cursor = database.encode_order_cursor({"id": "ORD-1", "created_at": None})
+    assert database.decode_order_cursor(cursor) == ("", "ORD-1")
+
+
+async def _failing_load():
+    try:
+        raise ConnectionError("shops unavailable")
+    except ConnectionError as e:
+        return database.load_failed("Error fetching shops", e, [])
+
+
+def test_load_failed_returns_default_outside_fan_out():
+    assert asyncio.run(_failing_load()) == []
+
+
+def test_fan_out_leaves_out_failed_and_slow_loads():
+    async def ok():
+        return ["order"]
+
+    async def slow():
+        await asyncio.sleep(1)
+        return ["late"]
+
+    results, timings = asyncio.run(
+        database.fan_out(
+            {"orders": ok(), "shops": _failing_load(), "riders": slow()},
+            timeout=0.05,
+        )
+    )
+    assert results == {"orders": ["order"]}
+    assert set(timings) == {"orders", "shops", "riders"}
+    assert timings["riders"] < 1000
+
+
+class OrdersTable:
+    """PostgREST ``orders`` builder answering the conditional assignment."""
+
+    def __init__(self, rows=None, error=None):
+        self.rows = rows or []
+        self.error = error
+        self.filters = []
+
+    def table(self, name):
+        assert name == "orders"
+        return self
+
+    def update(self, values):
+        self.values = values
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(("is", column, value))
+        return self
+
+    def execute(self):
+        if self.error:
+            raise self.error
+        return SimpleNamespace(data=self.rows)
+
+
+@pytest.fixture
+def manager(no_supabase, monkeypatch):
+    monkeypatch.delenv("REFLEX_DB_URL")
+    events = []
+    order_feed.add_listener(events.append)
+    yield database.DatabaseManager(), events
+    order_feed.remove_listener(events.append)
+
+
+def test_assignment_returns_the_claimed_order(manager):
+    db, events = manager
+    claimed = {"id": "ORD-1", "status": "Out for Delivery", "rider_id": "r1"}
+    db.supabase = OrdersTable([claimed])
+
+    assert asyncio.run(db.assign_order_to_rider("ORD-1", "r1")) == claimed
+    assert db.supabase.values == {"rider_id": "r1", "status": "Out for Delivery"}
+    assert db.supabase.filters == [
+        ("eq", "id", "ORD-1"),
+        ("eq", "status", "Ready"),
+        ("is", "rider_id", "null"),
+    ]
+    assert [(e["op"], e["id"], e["rider_id"]) for e in events] == [
+        ("UPDATE", "ORD-1", "r1")
+    ]
+
+
+@pytest.mark.parametrize(
+    "orders", [OrdersTable([]), OrdersTable(error=ConnectionError("down"))]
+)
+def test_lost_or_failed_assignment_returns_none(manager, orders):
+    db, events = manager
+    db.supabase = orders
+    assert asyncio.run(db.assign_order_to_rider("ORD-1", "r1")) is None
+    assert events == []
\ No newline at end of file
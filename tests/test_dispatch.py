@@ -0,0 +1,35 @@
+import asyncio
+
+from app.utils.dispatch import DispatchEngine
+from app.utils.repository import MemoryRepository
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_sync_rebuilds_busy_riders():
+    repo = MemoryRepository()
+    engine = DispatchEngine()
+    assert run(repo.toggle_rider_status("r2", "Online"))
+    run(engine.sync(repo))
+    assert "r1" in engine.grid and "r2" in engine.grid
+
+    # Picked up through another worker: this engine never saw the event.
+    run(
+        repo.create_order(
+            {"id": "ORD-D1", "user_id": "u_test", "shop_id": 1, "status": "Ready"}
+        )
+    )
+    assert run(repo.assign_order_to_rider("ORD-D1", "r1"))
+    engine.busy.add("r2")
+
+    run(engine.sync(repo))
+    assert engine.busy == {"r1"}
+    assert "r1" not in engine.grid
+    assert "r2" in engine.grid
+
+    assert run(repo.update_order_status("ORD-D1", "Delivered"))
+    run(engine.sync(repo))
+    assert engine.busy == set()
+    assert "r1" in engine.grid
\ No newline at end of file
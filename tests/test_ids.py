@@ -0,0 +1,67 @@
+import pytest
+
+from app.utils import ids
+from app.utils.ids import CROCKFORD_BASE32, SnowflakeGenerator, UlidGenerator
+
+
+@pytest.fixture
+def frozen_ms(monkeypatch):
+    """Clock stuck at one millisecond until the test advances it."""
+    now = [1_750_000_000_000]
+    monkeypatch.setattr(ids.time, "time_ns", lambda: now[0] * 1_000_000)
+    return now
+
+
+def test_ulids_increase_within_one_millisecond(frozen_ms):
+    generator = UlidGenerator()
+    issued = [generator.new_id() for _ in range(1000)]
+
+    assert all(len(i) == 26 and set(i) <= set(CROCKFORD_BASE32) for i in issued)
+    assert issued == sorted(issued)
+    assert len(set(issued)) == len(issued)
+    assert {i[:10] for i in issued} == {UlidGenerator._encode(frozen_ms[0], 10)}
+
+
+def test_ulids_sort_by_time(frozen_ms):
+    generator = UlidGenerator()
+    earlier = generator.new_id()
+    frozen_ms[0] += 1
+    assert generator.new_id() > earlier
+
+
+def test_snowflake_packs_worker_and_sequence(frozen_ms):
+    generator = SnowflakeGenerator(worker_id=5)
+    first, second = (int(generator.new_id()) for _ in range(2))
+
+    assert first >> 22 == frozen_ms[0] - SnowflakeGenerator.EPOCH_MS
+    assert (first >> 12) & 0x3FF == 5
+    assert second - first == 1
+
+
+def test_snowflake_waits_for_next_millisecond_when_sequence_wraps(monkeypatch):
+    calls = []
+
+    def time_ns():
+        # The clock only moves once all 4096 sequence numbers are issued and
+        # the generator has seen the wrap.
+        calls.append(None)
+        return (1_750_000_000_000 + (len(calls) > 4097)) * 1_000_000
+
+    monkeypatch.setattr(ids.time, "time_ns", time_ns)
+    generator = SnowflakeGenerator(worker_id=0)
+    issued = [int(generator.new_id()) for _ in range(4097)]
+
+    assert issued == sorted(issued)
+    assert len(set(issued)) == len(issued)
+    assert {i >> 22 for i in issued[:4096]} == {issued[0] >> 22}
+    assert issued[-1] >> 22 == (issued[0] >> 22) + 1
+    assert issued[-1] & 0xFFF == 0
+
+
+def test_snowflake_needs_a_worker_id_source(monkeypatch):
+    monkeypatch.delenv("SNOWFLAKE_WORKER_ID", raising=False)
+    monkeypatch.delenv("REFLEX_DB_URL", raising=False)
+    with pytest.raises(RuntimeError, match="SNOWFLAKE_WORKER_ID"):
+        SnowflakeGenerator()
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(worker_id=SnowflakeGenerator.WORKER_IDS)
\ No newline at end of file
@@ -0,0 +1,314 @@
+import asyncio
+
+import pytest
+
+from app.utils.database import projection
+from app.utils.order_feed import order_feed
+from app.utils.repository import MemoryRepository
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def repo():
+    return MemoryRepository()
+
+
+def order(order_id: str, shop_id: int = 1, status: str = "Ready", **extra) -> dict:
+    return {
+        "id": order_id,
+        "user_id": "u_test",
+        "shop_id": shop_id,
+        "status": status,
+        "subtotal": 10.0,
+        "total_amount": 12.0,
+        **extra,
+    }
+
+
+def test_products_lookup_by_shop(repo):
+    products = run(repo.get_products(1))
+    assert products
+    assert all(p["shop_id"] == 1 for p in products)
+    assert {p["id"] for p in products} < {p["id"] for p in run(repo.get_products())}
+
+
+def test_unavailable_products_only_for_owner_view(repo):
+    product_id = run(repo.get_products(1))[0]["id"]
+    assert run(repo.toggle_product_stock(product_id, False))
+
+    assert product_id not in {p["id"] for p in run(repo.get_products(1))}
+    owner_view = run(repo.get_products(1, include_unavailable=True))
+    hidden = next(p for p in owner_view if p["id"] == product_id)
+    assert hidden["is_available"] is False
+
+    assert run(repo.toggle_product_stock(product_id, True))
+    assert product_id in {p["id"] for p in run(repo.get_products(1))}
+
+
+def test_index_follows_updates(repo):
+    product_id = run(repo.get_products(1))[0]["id"]
+    assert run(repo.update_product(product_id, {"shop_id": 2}))
+    assert product_id not in {p["id"] for p in run(repo.get_products(1))}
+    assert product_id in {p["id"] for p in run(repo.get_products(2))}
+
+
+def test_reads_return_copies(repo):
+    shop = run(repo.get_shops())[0]
+    shop["name"] = "changed"
+    assert run(repo.get_shops())[0]["name"] != "changed"
+
+
+def test_delete_shop(repo):
+    shop = run(repo.create_shop({"name": "Test Shop", "category_slug": "grocery"}))
+    assert shop["id"] in {s["id"] for s in run(repo.get_shops("grocery"))}
+
+    assert run(repo.delete_shop(shop["id"]))
+    assert shop["id"] not in {s["id"] for s in run(repo.get_shops())}
+    assert shop["id"] not in {s["id"] for s in run(repo.get_shops("grocery"))}
+    assert not run(repo.delete_shop(shop["id"]))
+
+
+def test_ready_order_assignment(repo):
+    rider_id = run(repo.get_riders())[0]["id"]
+    assert run(repo.create_order(order("ORD-T1", status="Pending")))
+    assert "ORD-T1" not in {o["id"] for o in run(repo.get_available_orders())}
+
+    assert run(repo.update_order_status("ORD-T1", "Ready"))
+    assert "ORD-T1" in {o["id"] for o in run(repo.get_available_orders())}
+
+    assigned = run(repo.assign_order_to_rider("ORD-T1", rider_id))
+    assert assigned["status"] == "Out for Delivery"
+    assert assigned["rider_id"] == rider_id
+    assert "ORD-T1" not in {o["id"] for o in run(repo.get_available_orders())}
+    assert "ORD-T1" in {o["id"] for o in run(repo.get_rider_orders(rider_id))}
+
+
+def test_assignment_race_has_one_winner(repo):
+    first, second = (r["id"] for r in run(repo.get_riders())[:2])
+    assert run(repo.create_order(order("ORD-T2")))
+
+    assert run(repo.assign_order_to_rider("ORD-T2", first))
+    assert run(repo.assign_order_to_rider("ORD-T2", second)) is None
+    assert run(repo.get_order("ORD-T2"))["rider_id"] == first
+    assert "ORD-T2" not in {o["id"] for o in run(repo.get_rider_orders(second))}
+
+
+def test_assignment_requires_ready(repo):
+    rider_id = run(repo.get_riders())[0]["id"]
+    assert run(repo.create_order(order("ORD-T3", status="Packed")))
+    assert run(repo.assign_order_to_rider("ORD-T3", rider_id)) is None
+    assert run(repo.assign_order_to_rider("ORD-MISSING", rider_id)) is None
+
+
+def test_delivery_credits_rider_once(repo):
+    rider = run(repo.get_riders())[0]
+    assert run(repo.create_order(order("ORD-T4")))
+    assert run(repo.assign_order_to_rider("ORD-T4", rider["id"]))
+    delivery = [{"order_id": "ORD-T4", "rider_id": rider["id"], "amount": 40.0}]
+
+    (row,) = run(repo.deliver_orders(delivery))
+    assert row["status"] == "Delivered"
+    assert row["earnings"] == float(rider["earnings"] or 0) + 40.0
+    assert row["completed_orders"] == (rider["completed_orders"] or 0) + 1
+
+    assert run(repo.deliver_orders(delivery)) == []
+    credited = run(repo.get_rider_by_id(rider["id"]))
+    assert credited["earnings"] == row["earnings"]
+    assert credited["completed_orders"] == row["completed_orders"]
+
+
+def test_delivery_requires_assigned_rider(repo):
+    first, second = (r["id"] for r in run(repo.get_riders())[:2])
+    assert run(repo.create_order(order("ORD-T5")))
+    delivery = {"order_id": "ORD-T5", "rider_id": first, "amount": 40.0}
+    assert run(repo.deliver_orders([delivery])) == []
+
+    assert run(repo.assign_order_to_rider("ORD-T5", first))
+    assert run(repo.deliver_orders([{**delivery, "rider_id": second}])) == []
+    assert run(repo.get_order("ORD-T5"))["status"] == "Out for Delivery"
+
+
+def test_history_reaches_past_the_hot_window(repo):
+    rider_id = run(repo.get_riders())[0]["id"]
+    assert run(
+        repo.create_order(
+            order(
+                "ORD-T6",
+                status="Delivered",
+                rider_id=rider_id,
+                created_at="2000-01-01T00:00:00",
+            )
+        )
+    )
+
+    recent, _ = run(repo.get_orders_by_shop_page(1))
+    assert "ORD-T6" not in {o["id"] for o in recent}
+    assert "ORD-T6" not in {o["id"] for o in run(repo.get_rider_orders(rider_id))}
+
+    history, _ = run(repo.get_orders_by_shop_page(1, include_history=True))
+    assert "ORD-T6" in {o["id"] for o in history}
+    assert "ORD-T6" in {
+        o["id"] for o in run(repo.get_rider_orders(rider_id, include_history=True))
+    }
+
+
+def test_archived_order_ids_stay_taken(repo):
+    assert run(
+        repo.create_order(
+            order("ORD-T7", status="Delivered", created_at="2000-01-01T00:00:00")
+        )
+    )
+    assert run(repo.archive_orders(older_than_days=1)) == 1
+
+    assert run(repo.create_order(order("ORD-T7"))) is None
+    assert run(repo.place_orders([{**order("ORD-T7"), "items": []}])) == []
+    assert not run(repo.create_order_items([{"order_id": "ORD-MISSING"}]))
+
+
+def test_order_pages_follow_the_cursor(repo):
+    for n in range(5):
+        assert run(
+            repo.create_order(
+                order(f"ORD-P{n}", user_id="u_pages", created_at="2030-01-01T00:00:00")
+            )
+        )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = run(repo.get_orders_by_user_page("u_pages", cursor, limit=2))
+        seen.extend(o["id"] for o in page)
+        if cursor is None:
+            break
+    assert seen == [f"ORD-P{n}" for n in reversed(range(5))]
+
+
+def test_storefront_bootstrap_version_tracks_the_catalog(repo):
+    bootstrap = run(repo.get_storefront_bootstrap())
+    assert bootstrap["shops"] and bootstrap["products"]
+    assert not bootstrap["unchanged"]
+
+    version = bootstrap["version"]
+    assert run(repo.get_storefront_bootstrap(version)) == {
+        "version": version,
+        "unchanged": True,
+    }
+
+    assert run(repo.toggle_product_stock(bootstrap["products"][0]["id"], False))
+    changed = run(repo.get_storefront_bootstrap(version))
+    assert not changed["unchanged"]
+    assert changed["version"] != version
+
+
+def test_order_views_project_their_columns(repo):
+    assert run(
+        repo.place_orders(
+            [
+                {
+                    **order("ORD-V1", created_at="2030-01-01T00:00:00"),
+                    "items": [
+                        {"product_id": 1, "name": "Milk", "price": 5.0, "quantity": 2}
+                    ],
+                }
+            ]
+        )
+    )
+
+    row = run(repo.get_order("ORD-V1", view="row"))
+    assert "order_items" not in row and "subtotal" not in row
+    card = run(repo.get_order("ORD-V1", view="card"))
+    assert card["subtotal"] == 10.0
+    assert card["order_items"] == [
+        {"product_id": 1, "name": "Milk", "price": 5.0, "quantity": 2}
+    ]
+    detail = run(repo.get_order("ORD-V1"))
+    assert detail["order_items"][0]["order_id"] == "ORD-V1"
+
+    shop = run(repo.get_shops(view="card"))[0]
+    assert set(shop) == {c.strip() for c in projection("shops", "card").split(",")}
+
+
+def test_place_orders_is_all_or_nothing(repo):
+    batch = [{**order("ORD-B1"), "items": []}, {**order("ORD-B2"), "items": []}]
+    assert run(repo.place_orders(batch)) == ["ORD-B1", "ORD-B2"]
+    assert run(repo.get_order("ORD-B2"))["status"] == "Ready"
+
+    clash = [{**order("ORD-B3"), "items": []}, {**order("ORD-B1"), "items": []}]
+    assert run(repo.place_orders(clash)) == []
+    assert run(repo.get_order("ORD-B3")) is None
+
+    repeated = [{**order("ORD-B4"), "items": []}] * 2
+    assert run(repo.place_orders(repeated)) == []
+    assert run(repo.get_order("ORD-B4")) is None
+
+
+def test_daily_stats_follow_status_changes(repo):
+    day = "2030-03-01"
+    assert run(repo.create_order(order("ORD-S1", date=day, shop_id=2)))
+    assert run(repo.create_order(order("ORD-S2", date=day, shop_id=2)))
+
+    stats = run(repo.get_daily_stats(day, shop_id=2))
+    assert stats["orders_count"] == 2
+    assert stats["revenue"] == 24.0
+    assert stats["delivered_count"] == 0
+
+    assert run(repo.update_order_status("ORD-S1", "Delivered"))
+    assert run(repo.update_order_status("ORD-S2", "Cancelled"))
+    stats = run(repo.get_daily_stats(day, shop_id=2))
+    assert stats["orders_count"] == 2
+    assert stats["cancelled_count"] == 1
+    assert stats["revenue"] == 12.0
+    assert stats["delivered_count"] == 1
+    assert stats["delivered_revenue"] == 10.0
+    assert run(repo.get_daily_stats(day, shop_id=1))["orders_count"] == 0
+    assert run(repo.get_payout_days(2))[0] == {
+        "day": day,
+        "delivered_count": 1,
+        "delivered_revenue": 10.0,
+    }
+
+
+def test_revenue_rollups_bucket_by_hour_and_day(repo):
+    for order_id, created_at, status in (
+        ("ORD-R1", "2030-04-01T10:15:00", "Delivered"),
+        ("ORD-R2", "2030-04-01T10:45:00", "Ready"),
+        ("ORD-R3", "2030-04-01T11:05:00", "Delivered"),
+        ("ORD-R4", "2030-04-01T11:30:00", "Cancelled"),
+    ):
+        assert run(
+            repo.create_order(
+                order(order_id, shop_id=2, status=status, created_at=created_at)
+            )
+        )
+    assert run(repo.refresh_revenue_rollups())["caught_up"]
+
+    start, end = "2030-04-01T00:00:00", "2030-04-02T00:00:00"
+    hours = run(repo.get_revenue_rollups(start, end, "hour", shop_id=2))
+    assert [(h["bucket"], h["orders_count"], h["gmv"]) for h in hours] == [
+        ("2030-04-01T10:00:00", 2, 24.0),
+        ("2030-04-01T11:00:00", 1, 12.0),
+    ]
+    (day,) = run(repo.get_revenue_rollups(start, end, shop_id=2))
+    shop = next(s for s in run(repo.get_shops()) if s["id"] == 2)
+    rate = shop.get("commission_rate") or 10
+    assert day["orders_count"] == 3
+    assert day["commission"] == pytest.approx(30.0 * rate / 100)
+    (platform,) = run(repo.get_revenue_rollups(start, end))
+    assert platform["orders_count"] == 3
+
+
+def test_delete_all_orders_truncates_and_announces_it(repo):
+    events = []
+    order_feed.add_listener(events.append)
+    try:
+        assert run(repo.create_order(order("ORD-D1", date="2030-05-01")))
+        assert run(repo.delete_all_orders())
+    finally:
+        order_feed.remove_listener(events.append)
+
+    assert [e["op"] for e in events] == ["INSERT", "TRUNCATE"]
+    assert run(repo.get_all_orders(include_history=True)) == []
+    assert run(repo.get_daily_stats(None))["orders_count"] == 0
+    assert run(repo.create_order(order("ORD-D1")))
\ No newline at end of file
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.utils.metrics import Counter, Histogram, instrument, render_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    latency = Histogram("test_seconds", "Test latency.", ("method",), (0.1, 1.0))
+    latency.observe(("get",), 0.05)
+    latency.observe(("get",), 0.5)
+    latency.observe(("get",), 5.0)
+
+    assert latency.render() == [
+        "# HELP test_seconds Test latency.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{method="get",le="0.1"} 1',
+        'test_seconds_bucket{method="get",le="1"} 2',
+        'test_seconds_bucket{method="get",le="+Inf"} 3',
+        'test_seconds_sum{method="get"} 5.55',
+        'test_seconds_count{method="get"} 3',
+    ]
+
+
+def test_counter_escapes_label_values():
+    errors = Counter("test_errors_total", "Test errors.", ("error",))
+    errors.inc(('say "hi"\n',), 2)
+    assert errors.render()[-1] == 'test_errors_total{error="say \\"hi\\"\\n"} 2'
+
+
+def test_instrumented_calls_reach_the_endpoint_text():
+    @instrument("test_render_metrics")
+    async def lookup(fail: bool):
+        if fail:
+            raise ConnectionError("down")
+        return [{"id": 1}, {"id": 2}]
+
+    asyncio.run(lookup(False))
+    with pytest.raises(ConnectionError):
+        asyncio.run(lookup(True))
+    text = render_metrics(
+        {"size": 5, "ready": True, "catalog_cache": {"hits": 3, "misses": 1}}
+    )
+
+    assert text.endswith("\n")
+    assert (
+        'minidrop_db_call_duration_seconds_count{method="test_render_metrics",'
+        'outcome="ok"} 1'
+    ) in text
+    assert (
+        'minidrop_db_call_errors_total{method="test_render_metrics",'
+        'error="ConnectionError"} 1'
+    ) in text
+    assert 'minidrop_db_call_rows_sum{method="test_render_metrics"} 2' in text
+    assert 'minidrop_db_pool{name="size"} 5' in text
+    assert 'name="ready"' not in text
+    assert 'minidrop_catalog_cache{name="hits"} 3' in text
\ No newline at end of file
@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import database
+from app.utils.order_feed import follow_orders, order_feed, patch_order
+from app.utils.repository import MemoryRepository
+
+LISTS = {"open_orders": None, "orders": "orders_cursor"}
+
+
+class ShopOrders:
+    """The parts of a Reflex state that the order feed helpers use."""
+
+    def __init__(self, shop_id: int = 1):
+        self.shop_id = shop_id
+        self.open_orders: list[dict] = []
+        self.orders: list[dict] = []
+        self.orders_cursor = None
+        self.reloads = 0
+        self.router = SimpleNamespace(session=SimpleNamespace(client_token="tab-1"))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get_full_name(self) -> str:
+        return "shop_orders"
+
+    def _order_placement(self, order: dict):
+        if order.get("shop_id") != self.shop_id:
+            return None
+        return "orders" if order.get("status") == "Delivered" else "open_orders"
+
+    async def _reload_orders(self):
+        self.reloads += 1
+
+
+def row(order_id: str, status: str = "Pending", created_at: str = "2030-01-01"):
+    return {"id": order_id, "shop_id": 1, "status": status, "created_at": created_at}
+
+
+def test_patch_order_moves_the_order_between_lists():
+    state = ShopOrders()
+    state.open_orders = [row("ORD-2"), row("ORD-1")]
+
+    assert patch_order(state, LISTS, "ORD-1", status="Delivered")
+    assert [o["id"] for o in state.open_orders] == ["ORD-2"]
+    assert [(o["id"], o["status"]) for o in state.orders] == [("ORD-1", "Delivered")]
+
+    assert patch_order(state, LISTS, "ORD-2", rider_id="r1")
+    assert state.open_orders[0]["rider_id"] == "r1"
+    assert not patch_order(state, LISTS, "ORD-MISSING", status="Delivered")
+
+
+def test_patch_order_skips_rows_past_a_paged_list():
+    state = ShopOrders()
+    state.orders = [row("ORD-9", "Delivered", created_at="2030-02-01")]
+    state.orders_cursor = "more"
+    state.open_orders = [row("ORD-1", created_at="2030-01-01")]
+
+    assert patch_order(state, LISTS, "ORD-1", status="Delivered")
+    assert state.open_orders == []
+    assert [o["id"] for o in state.orders] == ["ORD-9"]
+
+
+async def _until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    repo = MemoryRepository()
+    monkeypatch.setattr(database, "get_db", lambda: repo)
+    return repo
+
+
+def test_follow_orders_applies_repository_writes(repo):
+    state = ShopOrders()
+
+    async def scenario():
+        watcher = asyncio.create_task(follow_orders(state, LISTS, view="card"))
+        await _until(lambda: order_feed._subscribers)
+
+        await repo.create_order({**row("ORD-F1"), "user_id": "u_feed"})
+        await repo.create_order({**row("ORD-F2"), "shop_id": 2, "user_id": "u_feed"})
+        await _until(lambda: state.open_orders)
+        assert [o["id"] for o in state.open_orders] == ["ORD-F1"]
+
+        await repo.update_order_status("ORD-F1", "Delivered")
+        await _until(lambda: state.orders)
+        assert state.open_orders == []
+        assert state.orders[0]["status"] == "Delivered"
+
+        await repo.delete_all_orders()
+        await _until(lambda: state.reloads)
+
+        watcher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await watcher
+
+    asyncio.run(scenario())
+    assert not order_feed._following
+    assert not order_feed._subscribers
\ No newline at end of file
@@ -0,0 +1,38 @@
+import collections
+import re
+
+from app.utils.migrate_db import (
+    MIGRATIONS,
+    SCHEMA_FILE,
+    SCHEMA_SQL,
+    SCHEMA_VERSION,
+    render_schema_file,
+)
+
+
+def test_schema_file_is_generated():
+    with open(SCHEMA_FILE) as f:
+        assert f.read() == render_schema_file(), (
+            "schema.sql is stale: run python -m app.utils.migrate_db --write-schema"
+        )
+
+
+def test_schema_covers_latest_migration():
+    assert SCHEMA_VERSION == MIGRATIONS[-1].version, (
+        "fold the new migration into SCHEMA_SQL and bump SCHEMA_VERSION"
+    )
+
+
+def test_schema_defines_each_function_once():
+    names = re.findall(r"CREATE (?:OR REPLACE )?FUNCTION (\w+)", SCHEMA_SQL)
+    repeated = [n for n, count in collections.Counter(names).items() if count > 1]
+    assert names and not repeated
+
+
+def test_schema_can_run_again():
+    assert not re.search(r"^CREATE (?:TABLE|INDEX) (?!IF NOT EXISTS)", SCHEMA_SQL, re.M)
+    assert not re.search(
+        r"\bCREATE FUNCTION\b|\bRENAME\b|\bADD (?:PRIMARY|CONSTRAINT)", SCHEMA_SQL
+    )
+    for trigger in re.findall(r"CREATE TRIGGER (\w+)", SCHEMA_SQL):
+        assert f"DROP TRIGGER IF EXISTS {trigger} ON" in SCHEMA_SQL
\ No newline at end of file